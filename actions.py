@@ -0,0 +1,355 @@
+import atexit
+import threading
+import time
+import logging
+from collections import deque
+
+from applog import emit_event
+
+logger = logging.getLogger(__name__)
+
+SCROLL_STEP = 120  # 使用 hand_gesture_reader.py 的标准滚动单位
+ACTION_TYPES = ("key", "combo", "mouse_scroll", "mouse_click", "pointer")
+MOUSE_BUTTONS = ("left", "right", "middle")
+POINTER_MODES = ("move", "scroll")
+
+
+# --- 预编译的动作 ---
+# 配置阶段把 finger_actions 中的字典校验一次并编译为可直接调用的对象，
+# 热路径上只需按手指数取下标并调用，不再逐次判断类型字符串、拆分组合键或去掉 'Button.' 前缀。
+# 调用时传入输入后端 (inputs.InputBackend)，动作本身不依赖具体的注入方式。
+
+class KeyAction:
+    coalescable = False
+    continuous = False  # True 表示连续控制动作，由 pointer.ContinuousController 逐帧驱动而不是入队执行
+    hold = False  # True 表示按住模式，见 HoldAction
+
+    def __init__(self, key, source):
+        self.key = key
+        self.source = source  # 原始配置字典，用于保存和比较
+
+    def __call__(self, backend, repeat=1):
+        backend.press(self.key, presses=repeat)
+
+    def describe(self, tr):
+        return tr["key"].format(self.key)
+
+
+class ComboAction:
+    coalescable = False
+    continuous = False
+    hold = False
+
+    def __init__(self, keys, source):
+        self.keys = tuple(keys)
+        self.released = tuple(reversed(self.keys))
+        self.source = source
+
+    def __call__(self, backend, repeat=1):
+        for _ in range(repeat):
+            for k_val in self.keys:
+                backend.key_down(k_val)
+            for k_val in self.released:
+                backend.key_up(k_val)
+
+    def describe(self, tr):
+        return tr["combo"].format('+'.join(self.keys))
+
+
+class HoldAction:
+    """按住模式 ({"hold": true})：手势确认时按下，手势变化或手离开时松开（由 ActionExecutor.hold()/release_held() 驱动）。
+
+    repeat_hz > 0 时按住期间以该频率重复发送最后一个键的按下事件（与键盘的自动重复相同）。
+    """
+    coalescable = False
+    continuous = False
+    hold = True
+
+    def __init__(self, keys, repeat_hz, source):
+        self.keys = tuple(keys)
+        self.released = tuple(reversed(self.keys))
+        self.repeat_interval = 1.0 / repeat_hz if repeat_hz > 0 else 0.0
+        self.source = source
+
+    def __call__(self, backend, repeat=1):
+        for _ in range(repeat):  # 直接调用时相当于按一次
+            self.down(backend)
+            self.up(backend)
+
+    def down(self, backend):
+        for k_val in self.keys:
+            backend.key_down(k_val)
+
+    def up(self, backend):
+        for k_val in self.released:
+            backend.key_up(k_val)
+
+    def repeat(self, backend):
+        backend.key_down(self.keys[-1])
+
+    def describe(self, tr):
+        keys = tr["key"].format(self.keys[0]) if len(self.keys) == 1 else tr["combo"].format('+'.join(self.keys))
+        return tr["hold_action"].format(keys)
+
+
+class ScrollAction:
+    coalescable = True  # 积压时可合并为一次多步滚动
+    continuous = False
+    hold = False
+
+    def __init__(self, delta, source):
+        self.delta = delta
+        self.source = source
+
+    def __call__(self, backend, repeat=1):
+        backend.scroll(self.delta * repeat)
+
+    def describe(self, tr):
+        return tr["mouse_scroll_up"] if self.delta > 0 else tr["mouse_scroll_down"]
+
+
+class ClickAction:
+    coalescable = False
+    continuous = False
+    hold = False
+
+    def __init__(self, button, source):
+        self.button = button
+        self.source = source
+
+    def __call__(self, backend, repeat=1):
+        backend.click(self.button, clicks=repeat)
+
+    def describe(self, tr):
+        return tr["mouse_click_" + self.button]
+
+
+class PointerAction:
+    """连续控制：手势保持期间按手的偏移移动光标 (mode = "move") 或滚动 (mode = "scroll")。"""
+    coalescable = False
+    continuous = True
+    hold = False
+
+    def __init__(self, mode, source):
+        self.mode = mode
+        self.source = source
+
+    def __call__(self, backend, repeat=1):
+        pass  # 不经过 ActionExecutor，见 pointer.py
+
+    def describe(self, tr):
+        return tr["pointer_" + self.mode]
+
+
+def compile_action(action):
+    """校验单个动作字典并编译为动作对象；action 为 None 或格式无效时返回 None。"""
+    if not isinstance(action, dict) or action.get("type") not in ACTION_TYPES:
+        return None
+    action_type = action["type"]
+    if action_type in ("key", "combo"):
+        value = action.get("value")
+        if not isinstance(value, str) or not value:
+            return None
+        if action.get("hold"):
+            repeat_hz = action.get("repeat_hz", 0)
+            if isinstance(repeat_hz, bool) or not isinstance(repeat_hz, (int, float)) or repeat_hz < 0:
+                return None
+            return HoldAction([value] if action_type == "key" else value.split('+'), float(repeat_hz), action)
+        if action_type == "key":
+            return KeyAction(value, action)
+        return ComboAction(value.split('+'), action)
+    if action_type == "mouse_scroll":
+        if action.get("value") == "scroll_up":
+            return ScrollAction(SCROLL_STEP, action)
+        if action.get("value") == "scroll_down":
+            return ScrollAction(-SCROLL_STEP, action)
+        return None
+    if action_type == "pointer":
+        mode = action.get("value", "move")
+        return PointerAction(mode, action) if mode in POINTER_MODES else None
+    button = action.get("button")
+    if not isinstance(button, str):
+        return None
+    button = button.replace('Button.', '')
+    if button not in MOUSE_BUTTONS:
+        return None
+    return ClickAction(button, action)
+
+
+def is_valid_action(action):
+    return action is None or compile_action(action) is not None
+
+
+def compile_actions(finger_actions):
+    """把 {1..5: dict} 编译为按手指数下标访问的元组 (下标 0 对应 0 根手指，恒为 None)。"""
+    plans = [None] * 6
+    for cnt in range(1, 6):
+        action = finger_actions.get(cnt)
+        plan = compile_action(action)
+        if action is not None and plan is None:
+            logger.warning(f"无效的设置项，手指 {cnt}: {action}")
+        plans[cnt] = plan
+    return tuple(plans)
+
+
+class ActionExecutor:
+    """异步动作执行线程，用给定的输入后端执行 compile_action() 生成的动作对象。
+
+    检测循环只调用 submit() 入队，永不阻塞在输入注入上（pyautogui 后端每次调用默认会 sleep PAUSE 秒）。
+    队列有界：排队中的相同滚动动作会被合并为一次多步滚动，队列满时新动作被丢弃并计数。
+    按住模式的按下/松开 (hold()/release_held()) 与普通动作在同一队列中按顺序执行，但不受队列上限限制，
+    松开永远不会被丢弃；停止线程或进程退出时会先松开仍按住的键。
+    """
+
+    def __init__(self, backend, max_queue=8, latency_window=256):
+        self.backend = backend
+        self.max_queue = max_queue
+        # 元素: [plan, repeat, enqueue_time, op, on_fail]，op 为 None（普通动作）、"down"、"up" 或 "repeat"
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._held = None  # 当前按住的 HoldAction
+        self._next_repeat = 0.0
+        self._latencies = deque(maxlen=latency_window)  # 入队到执行完成的耗时(秒)
+        self.submitted = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ActionExecutor", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)  # 异常退出时也不会留下按住的键
+        return self
+
+    def submit(self, plan, on_fail=None):
+        """非阻塞入队，返回动作是否被接受（入队或合并）；on_fail 在动作执行出错时于执行线程中调用。"""
+        with self._cond:
+            self.submitted += 1
+            if self._queue and plan.coalescable and self._queue[-1][0] is plan:
+                self._queue[-1][1] += 1  # 积压时合并连续的同向滚动
+                self.coalesced += 1
+                return True
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                logger.warning(f"动作队列已满 ({self.max_queue})，丢弃动作: {plan.source}")
+                return False
+            self._queue.append([plan, 1, time.monotonic(), None, on_fail])
+            self._cond.notify()
+            return True
+
+    @property
+    def held(self):
+        return self._held
+
+    def hold(self, plan, on_fail=None):
+        """按下 HoldAction 的键并保持；已按住其他键时先松开。on_fail 在按下出错时于执行线程中调用。
+
+        同一个动作已被按住时什么也不做：键仍处于按下状态，不会注入也就不会失败，on_fail 不会被调用，
+        手势状态机在确认时开始的冷却照常生效。
+        """
+        with self._cond:
+            if self._held is plan:
+                return
+            now = time.monotonic()
+            if self._held is not None:
+                self._queue.append([self._held, 1, now, "up", None])
+            self._queue.append([plan, 1, now, "down", on_fail])
+            self._held = plan
+            self._next_repeat = now + plan.repeat_interval
+            self.submitted += 1
+            self._cond.notify()
+
+    def release_held(self):
+        """松开当前按住的键（没有时什么也不做）。"""
+        with self._cond:
+            if self._held is None:
+                return
+            self._queue.append([self._held, 1, time.monotonic(), "up", None])
+            self._held = None
+            self._cond.notify()
+
+    def _next_item(self):
+        """取出下一项；按住的键到了自动重复时间时返回重复项，线程应退出时返回 None。调用方持有锁。"""
+        while True:
+            if self._queue:
+                return self._queue.popleft()
+            if not self._running:
+                return None
+            held = self._held
+            if held is None or not held.repeat_interval:
+                self._cond.wait()
+                continue
+            now = time.monotonic()
+            if now < self._next_repeat:
+                self._cond.wait(self._next_repeat - now)
+                continue
+            self._next_repeat = max(self._next_repeat + held.repeat_interval, now)
+            return [held, 1, now, "repeat", None]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                item = self._next_item()
+            if item is None:
+                break
+            plan, repeat, enqueued, op, on_fail = item
+            try:
+                if op is None:
+                    plan(self.backend, repeat)
+                else:
+                    getattr(plan, op)(self.backend)
+                self.executed += 1
+            except Exception as e:
+                self.errors += 1
+                if on_fail is not None:
+                    on_fail()
+                print(f"使用 {self.backend.name} 执行操作时出错: {e}")
+                logger.error(f"使用 {self.backend.name} 执行操作时出错: {e}")
+            if op == "repeat":
+                continue
+            latency = time.monotonic() - enqueued
+            self._latencies.append(latency)
+            emit_event("action_done", action=plan.source, repeat=repeat, op=op or "press",
+                       latency_ms=round(latency * 1000, 2))
+
+    def depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else 0.0
+
+        return {
+            "backend": self.backend.name,
+            "depth": self.depth(),
+            "submitted": self.submitted,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "latency_p50_ms": pct(0.50),
+            "latency_p95_ms": pct(0.95),
+            "latency_max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+
+    def stop(self, timeout=2.0):
+        """停止线程：先松开按住的键，已排队的动作会先执行完。重复调用无副作用。"""
+        if self._thread is None:
+            return
+        self.release_held()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info(f"动作执行线程已停止: {self.stats()}")
@@ -0,0 +1,189 @@
+"""非阻塞日志管线。
+
+所有日志记录只在调用线程里做一次入队（有界队列，满了直接丢弃并计数），格式化和写文件/控制台都在后台线程完成，
+磁盘慢或控制台输出突发时不会拖慢检测循环。包含三路输出：
+  - app.log：普通日志，按大小轮转；同一调用位置的消息按时间间隔限流，可用 extra={"sample_every": N} 只保留每 N 条中的 1 条；
+  - console：控制台提示（代替热路径上的 print）；
+  - events.jsonl：结构化事件流（手势、手、动作、延迟），每行一个 JSON 对象。
+"""
+import atexit
+import configparser
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s'
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+console = logging.getLogger("console")  # 控制台提示
+events = logging.getLogger("events")  # 结构化事件，用 emit_event() 记录
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """入队不阻塞：队列满时丢弃记录并计数。
+
+    与标准 QueueHandler 不同，这里不在调用线程中预先格式化消息（同一进程内无需序列化），
+    格式化工作全部留给后台写线程。
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # 停止标记不能因队列已满而丢失，最多等待 1 秒
+        try:
+            self.queue.put(self._sentinel, timeout=1.0)
+        except queue.Full:
+            pass
+
+
+class RateLimitFilter(logging.Filter):
+    """按调用位置 (logger 名, 行号) 限流：每个 interval 秒内最多放行 burst 条。
+
+    被抑制的条数会附加到该位置下一条放行的消息后面。记录带有 sample_every 属性
+    （通过 extra={"sample_every": N} 传入）时，只放行该位置每 N 条中的第 1 条，适合逐帧日志。
+    ERROR 及以上级别不限流。
+    """
+
+    def __init__(self, interval=1.0, burst=5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._sites = {}  # (name, lineno) -> [window_start, count_in_window, suppressed, seen]
+
+    def filter(self, record):
+        site = self._sites.get((record.name, record.lineno))
+        if site is None:
+            site = self._sites[(record.name, record.lineno)] = [0.0, 0, 0, 0]
+        site[3] += 1
+        sample_every = getattr(record, "sample_every", 0)
+        if sample_every and (site[3] - 1) % sample_every:
+            return False
+        if record.levelno >= logging.ERROR or self.interval <= 0:
+            return True
+        now = time.monotonic()
+        if now - site[0] >= self.interval:
+            site[0], site[1] = now, 0
+        if site[1] >= self.burst:
+            site[2] += 1
+            return False
+        site[1] += 1
+        if site[2]:
+            record.suppressed = site[2]
+            site[2] = 0
+        return True
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (此前抑制了 {suppressed} 条相同位置的日志)" if suppressed else text
+
+
+class JsonLineFormatter(logging.Formatter):
+    """事件记录 -> 一行 JSON：{"ts": 时间戳, "event": 类型, ...字段}。"""
+
+    def format(self, record):
+        payload = {"ts": round(record.created, 4), "event": record.msg}
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def emit_event(kind, **fields):
+    """记录一条结构化事件，例如 emit_event("action", fingers=3, action={...})。未启用事件流时几乎无开销。"""
+    if events.handlers:
+        events.info(kind, extra={"fields": fields})
+
+
+class LoggingPipeline:
+    def __init__(self):
+        self._listeners = []
+        self._handlers = []
+
+    def attach(self, target_logger, handler, queue_size, rate_filter=None):
+        q = queue.Queue(maxsize=queue_size)
+        queue_handler = DroppingQueueHandler(q)
+        if rate_filter is not None:
+            queue_handler.addFilter(rate_filter)
+        target_logger.addHandler(queue_handler)
+        listener = _Listener(q, handler)
+        listener.start()
+        self._listeners.append(listener)
+        self._handlers.append((target_logger, queue_handler, handler))
+
+    def stats(self):
+        return {logger_.name: handler.dropped for logger_, handler, _ in self._handlers}
+
+    def stop(self):
+        """刷新并停止所有后台写线程（程序退出时由 atexit 自动调用）。"""
+        listeners, self._listeners = self._listeners, []
+        for listener in listeners:
+            listener.stop()
+        for target_logger, queue_handler, handler in self._handlers:
+            target_logger.removeHandler(queue_handler)
+            handler.close()
+        dropped = {name: count for name, count in self.stats().items() if count}
+        self._handlers = []
+        if dropped:
+            sys.stderr.write(f"日志队列已满时丢弃的记录数: {dropped}\n")
+
+
+def setup_logging(config_path="config.ini"):
+    """按 config.ini 的 [Logging] 段建立日志管线，返回 LoggingPipeline。
+
+    level / log_file / max_bytes / backup_count 控制 app.log；rate_limit_interval / rate_limit_burst 控制限流；
+    events_file 为空时关闭结构化事件流；queue_size 为每路队列的容量。
+    """
+    config = configparser.ConfigParser()
+    if os.path.exists(config_path):
+        config.read(config_path, encoding="utf-8")
+    level = config.get("Logging", "level", fallback="DEBUG").upper()
+    max_bytes = config.getint("Logging", "max_bytes", fallback=5 * 1024 * 1024)
+    backup_count = config.getint("Logging", "backup_count", fallback=3)
+    queue_size = config.getint("Logging", "queue_size", fallback=10000)
+    rate_filter = RateLimitFilter(config.getfloat("Logging", "rate_limit_interval", fallback=1.0),
+                                  config.getint("Logging", "rate_limit_burst", fallback=5))
+    pipeline = LoggingPipeline()
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level, logging.DEBUG))
+    file_handler = logging.handlers.RotatingFileHandler(
+        config.get("Logging", "log_file", fallback="app.log"), maxBytes=max_bytes, backupCount=backup_count,
+        encoding="utf-8")
+    file_handler.setFormatter(SuppressedCountFormatter(LOG_FORMAT, LOG_DATEFMT))
+    pipeline.attach(root, file_handler, queue_size, rate_filter)
+
+    console.setLevel(logging.INFO)
+    console.propagate = False
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    pipeline.attach(console, console_handler, queue_size, rate_filter)
+
+    events.setLevel(logging.INFO)
+    events.propagate = False
+    events_file = config.get("Logging", "events_file", fallback="events.jsonl").strip()
+    if events_file:
+        events_handler = logging.handlers.RotatingFileHandler(
+            events_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        events_handler.setFormatter(JsonLineFormatter())
+        pipeline.attach(events, events_handler, queue_size)
+
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -1,28 +1,28 @@
-import cv2
-import mediapipe as mp
-import pyautogui
 import time
+
+STARTUP_T0 = time.perf_counter()  # 启动耗时统计的起点
+
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-import numpy as np
-from PIL import ImageFont, ImageDraw, Image
-from pynput import keyboard, mouse
+import functools
 import json
 import os
-from PIL import Image, ImageTk
 import locale
 import configparser
 import logging
 import sys
-
-#配置全局日志
-logging.basicConfig(
-    filename='app.log',  # 日志文件路径
-    level=logging.DEBUG,  # 日志级别（DEBUG/INFO/WARNING/ERROR）
-    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    encoding='utf-8'
-)
+import argparse
+import signal
+import threading
+from actions import compile_action, compile_actions
+from startup import StartupReport, DetectionWarmup
+from applog import setup_logging, console, emit_event
+
+# cv2、mediapipe、pyautogui、PIL、pynput 导入较慢，只在用到时导入（或由 DetectionWarmup 在后台预先导入），
+# 配置界面只依赖 tkinter，可以尽快出现
+
+#配置全局日志：队列 + 后台写线程，app.log 按大小轮转，另有 events.jsonl 结构化事件流（见 applog.py 与 [Logging] 配置段）
+log_pipeline = setup_logging("config.ini")
 logger = logging.getLogger(__name__)
 
 # --- 加载语言文件 ---
@@ -39,67 +39,6 @@ except json.JSONDecodeError:
     exit(1)
 
 
-def count_fingers(lst, handedness_label="Unknown"):  # 接收手的左右标签
-    cnt = 0
-    if not lst or not lst.landmark:
-        return 0
-
-    try:
-        # 垂直阈值：基于手腕到中指指根的Y轴距离的比例，判断手指是否向上伸直
-        # landmark[0] 是 WRIST, landmark[9] 是 MIDDLE_FINGER_MCP
-        # TIP.y < MCP.y (因为Y轴向下为正，所以 TIP.y 较小表示手指向上)
-        # (MCP.y - TIP.y) > vertical_thresh
-        vertical_thresh = abs(lst.landmark[0].y - lst.landmark[9].y) / 2.8  # 可调整分母
-
-        # 食指 (MCP:5, TIP:8)
-        if (lst.landmark[5].y - lst.landmark[8].y) > vertical_thresh:
-            cnt += 1
-        # 中指 (MCP:9, TIP:12)
-        if (lst.landmark[9].y - lst.landmark[12].y) > vertical_thresh:
-            cnt += 1
-        # 无名指 (MCP:13, TIP:16)
-        if (lst.landmark[13].y - lst.landmark[16].y) > vertical_thresh:
-            cnt += 1
-        # 小指 (MCP:17, TIP:20)
-        if (lst.landmark[17].y - lst.landmark[20].y) > vertical_thresh:
-            cnt += 1
-
-        # 拇指逻辑 (基于手的左右和X轴坐标)
-        # landmark[2] 是 THUMB_MCP (拇指掌骨关节)
-        # landmark[4] 是 THUMB_TIP (拇指指尖)
-        # landmark[5] 是 INDEX_FINGER_MCP
-        # landmark[17] 是 PINKY_MCP
-
-        # 水平阈值参考：基于食指指根到小指指根的X轴距离（近似手掌宽度）的比例
-        # 调整这个比例因子可以改变拇指判断的灵敏度
-        thumb_horizontal_ref_dist = abs(lst.landmark[5].x - lst.landmark[17].x)
-        thumb_thresh = thumb_horizontal_ref_dist * 0.3  # 例如，拇指伸出超过手掌宽度的30%
-
-        # 图像已经水平翻转 (frm = cv2.flip(frm, 1))
-        # MediaPipe报告的 "Left" 指的是物理上的左手, "Right" 指的是物理上的右手
-
-        if handedness_label == "Left":  # 物理左手 (在翻转的屏幕上显示为右手)
-            # 拇指伸出时，指尖(4)的x坐标会大于其MCP(2)的x坐标 (在屏幕上向右)
-            if (lst.landmark[4].x - lst.landmark[2].x) > thumb_thresh:
-                cnt += 1
-        elif handedness_label == "Right":  # 物理右手 (在翻转的屏幕上显示为左手)
-            # 拇指伸出时，指尖(4)的x坐标会小于其MCP(2)的x坐标 (在屏幕上向左)
-            if (lst.landmark[2].x - lst.landmark[4].x) > thumb_thresh:
-                cnt += 1
-        # 如果handedness_label是"Unknown", 则不特意判断拇指或使用一个通用但不一定准确的规则
-        # 为简单起见，这里未知手型时不计数拇指，依赖上面四个手指的计数
-
-    except IndexError:
-        logger.warning("手指关键点索引错误", exc_info=True)
-        print("手指关键点索引错误。")  # Landmarks可能不完整
-        return 0
-    except Exception as e:
-        logger.error(f"手指计数错误: {str(e)}", exc_info=True)
-        print(f"手指计数错误: {e}")
-        return 0
-    return cnt
-
-
 # 颜色配置
 primary_color = "#3B82F6"
 secondary_color = "#64748B"
@@ -112,6 +51,9 @@ card_bg = "#FFFFFF"
 # 保存绑定状态
 capturing_for_finger = None
 finger_actions = {i: None for i in range(1, 6)}
+action_plans = compile_actions(finger_actions)  # finger_actions 的预编译形式，按手指数下标访问
+gesture_actions = {}  # 模板手势名 -> 动作字典（settings.json 中的 "gestures"，见 classifier.py）
+gesture_plans = {}  # gesture_actions 的预编译形式
 action_labels = {}
 set_buttons = {}
 status_label = None
@@ -134,6 +76,17 @@ gesture_labels = {}
 
 # 当前语言，默认为简体中文
 current_language = "zh-CN"
+# 无界面运行模式 (--headless 或 config.ini 中 [Runtime] headless = true)
+headless_mode = False
+startup_report = StartupReport(STARTUP_T0)
+
+
+# --- 读取 config.ini ---
+def load_app_config():
+    config = configparser.ConfigParser()
+    if os.path.exists("config.ini"):
+        config.read("config.ini", encoding="utf-8")
+    return config
 
 
 # --- 保存设置到文件 ---
@@ -141,6 +94,8 @@ def save_settings():
     global finger_actions
     try:
         settings = {str(i): finger_actions[i] for i in range(1, 6)}
+        if gesture_actions:
+            settings["gestures"] = gesture_actions
         with open("settings.json", "w", encoding="utf-8") as f:
             json.dump(settings, f, indent=4, ensure_ascii=False)
         print(translations[current_language]["export_success"].format("settings.json"))
@@ -152,11 +107,10 @@ def save_settings():
 
 # --- 从文件加载设置 ---
 def load_settings():
-    global finger_actions, current_language
-    config = configparser.ConfigParser()
+    global finger_actions, action_plans, gesture_actions, gesture_plans, current_language
     # 尝试加载 config.ini 文件
     if os.path.exists("config.ini"):
-        config.read("config.ini", encoding="utf-8")
+        config = load_app_config()
         if "Settings" in config and "language" in config["Settings"]:
             lang = config["Settings"]["language"]
             language_map = {
@@ -181,17 +135,19 @@ def load_settings():
                 key = str(i)
                 if key in settings:
                     action = settings[key]
-                    if action is None or (
-                            isinstance(action, dict) and
-                            "type" in action and
-                            action["type"] in ["key", "combo", "mouse_scroll", "mouse_click"] and
-                            (("value" in action and isinstance(action["value"], str)) or
-                             ("button" in action and isinstance(action["button"], str)))
-                    ):
+                    if action is None or compile_action(action) is not None:
                         finger_actions[i] = action
                     else:
                         print(f"无效的设置项，手指 {i}: {action}")
                         finger_actions[i] = None
+            gesture_actions = {}
+            for name, action in (settings.get("gestures") or {}).items():
+                if compile_action(action) is not None:
+                    gesture_actions[name] = action
+                else:
+                    print(f"无效的设置项，手势 {name}: {action}")
+            action_plans = compile_actions(finger_actions)
+            gesture_plans = {name: compile_action(action) for name, action in gesture_actions.items()}
             print(translations[current_language]["import_success"].format("settings.json"))
         else:
             print("未找到 settings.json，使用默认设置")
@@ -199,6 +155,16 @@ def load_settings():
     except Exception as e:
         logger.error(f"加载配置失败: {str(e)}", exc_info=True)  # exc_info=True 记录完整堆栈
         finger_actions = {i: None for i in range(1, 6)}
+        action_plans = compile_actions(finger_actions)
+
+
+# --- 动作描述 ---
+def describe_action(action):
+    """返回 (描述文本, 前景色)；未设置或格式无效的动作显示为 "未设置"。"""
+    plan = compile_action(action)
+    if plan is None:
+        return translations[current_language]["not_set"], error_color
+    return plan.describe(translations[current_language]), success_color
 
 
 # --- 重置设置 ---
@@ -319,10 +285,17 @@ def on_click(x, y, button, pressed):
     stop_capture_mode()
 
 
+def same_binding(a, b):
+    """两个绑定是否指向同一个键/组合键/鼠标动作；hold、repeat_hz 等选项不影响冲突判断。"""
+    if not isinstance(a, dict) or not isinstance(b, dict):
+        return a == b and a is not None
+    return a.get("type") == b.get("type") and a.get("value") == b.get("value")
+
+
 def update_action_display_and_clear_conflicts(finger_num, new_action):
     global finger_actions, action_labels, set_buttons
     for f_idx, existing_action in finger_actions.items():
-        if f_idx != finger_num and existing_action == new_action:
+        if f_idx != finger_num and same_binding(existing_action, new_action):
             finger_actions[f_idx] = None
             if f_idx in action_labels and action_labels[f_idx].winfo_exists():
                 action_labels[f_idx].config(text=translations[current_language]["not_set"], foreground=error_color)
@@ -330,21 +303,9 @@ def update_action_display_and_clear_conflicts(finger_num, new_action):
                 set_buttons[f_idx].config(text=translations[current_language]["set_action"],
                                           command=lambda i=f_idx: set_action_mode(i))
     finger_actions[finger_num] = new_action
-    desc = ''
-    if new_action['type'] == 'key':
-        desc = translations[current_language]["key"].format(new_action['value'])
-    elif new_action['type'] == 'combo':
-        desc = translations[current_language]["combo"].format(new_action['value'])
-    elif new_action['type'] == 'mouse_scroll':
-        desc = translations[current_language]["mouse_scroll_up"] if new_action['value'] == 'scroll_up' else \
-            translations[current_language]["mouse_scroll_down"]
-    elif new_action['type'] == 'mouse_click':
-        btn_name = new_action['button'].replace('Button.', '')
-        desc = translations[current_language]["mouse_click_left"] if btn_name == 'left' else \
-            translations[current_language]["mouse_click_right"] if btn_name == 'right' else \
-                translations[current_language]["mouse_click_middle"]
+    desc, foreground = describe_action(new_action)
     if finger_num in action_labels and action_labels[finger_num].winfo_exists():
-        action_labels[finger_num].config(text=desc, foreground=success_color)
+        action_labels[finger_num].config(text=desc, foreground=foreground)
     if finger_num in set_buttons and finger_num in set_buttons and set_buttons[finger_num].winfo_exists():
         set_buttons[finger_num].config(text=translations[current_language]["cancel_action"],
                                        command=lambda i=finger_num: cancel_action(i))
@@ -405,6 +366,7 @@ def set_action_mode(finger_num):
     for i in range(1, 6):
         if i in set_buttons and set_buttons[i].winfo_exists():
             set_buttons[i].config(state=tk.DISABLED)
+    from pynput import keyboard, mouse
     listener_keyboard = keyboard.Listener(on_press=on_key_press, on_release=on_key_release)
     listener_mouse = mouse.Listener(on_scroll=on_scroll, on_click=on_click)
     listener_keyboard.start()
@@ -412,7 +374,7 @@ def set_action_mode(finger_num):
 
 
 def start_camera_detection():
-    global config_done_and_start, gui_root
+    global config_done_and_start, gui_root, action_plans
     all_set = True
     for i in range(1, 6):
         if finger_actions.get(i) is None:
@@ -423,6 +385,7 @@ def start_camera_detection():
                                    translations[current_language]["confirm_start_message"]):
             return
     config_done_and_start = True
+    action_plans = compile_actions(finger_actions)  # 配置完成时一次性校验并编译绑定
     save_settings()
     if gui_root:
         gui_root.quit()
@@ -437,6 +400,8 @@ def export_settings():
     if file_path:
         try:
             settings = {str(i): finger_actions[i] for i in range(1, 6)}
+            if gesture_actions:
+                settings["gestures"] = gesture_actions
             with open(file_path, "w", encoding="utf-8") as f:
                 json.dump(settings, f, indent=4, ensure_ascii=False)
             print(translations[current_language]["export_success"].format(file_path))
@@ -448,62 +413,25 @@ def export_settings():
 
 # --- 加载配置 ---
 def import_settings():
-    global finger_actions, action_labels
+    global finger_actions, action_labels, gesture_actions, gesture_plans
     file_path = tk.filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
     if file_path:
         original_finger_actions = finger_actions.copy()
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 settings = json.load(f)
-            valid = True
             expected_keys = {"1", "2", "3", "4", "5"}
-            if not isinstance(settings, dict) or set(settings.keys()) != expected_keys:
-                valid = False
-            else:
-                for key in expected_keys:
-                    value = settings.get(key)
-                    if value is None:
-                        continue
-                    if not isinstance(value, dict) or "type" not in value:
-                        valid = False
-                        break
-                    action_type = value["type"]
-                    if action_type not in ["key", "combo", "mouse_scroll", "mouse_click"]:
-                        valid = False
-                        break
-                    if action_type in ["key", "combo"]:
-                        if "value" not in value or not isinstance(value["value"], str):
-                            valid = False
-                            break
-                    elif action_type == "mouse_scroll":
-                        if "value" not in value or value["value"] not in ["scroll_up", "scroll_down"]:
-                            valid = False
-                            break
-                    elif action_type == "mouse_click":
-                        if "button" not in value or not isinstance(value["button"], str):
-                            valid = False
-                            break
+            valid = (isinstance(settings, dict) and set(settings.keys()) - {"gestures"} == expected_keys and
+                     all(settings[k] is None or compile_action(settings[k]) is not None for k in expected_keys) and
+                     isinstance(settings.get("gestures", {}), dict) and
+                     all(compile_action(v) is not None for v in settings.get("gestures", {}).values()))
             if not valid:
                 raise ValueError(translations[current_language]["import_format_error"])
             finger_actions = {i: settings.get(str(i), None) for i in range(1, 6)}
+            gesture_actions = dict(settings.get("gestures", {}))
+            gesture_plans = {name: compile_action(action) for name, action in gesture_actions.items()}
             for i in range(1, 6):
-                action = finger_actions.get(i)
-                desc = translations[current_language]["not_set"]
-                foreground = error_color
-                if action:
-                    if action['type'] == 'key':
-                        desc = translations[current_language]["key"].format(action['value'])
-                    elif action['type'] == 'combo':
-                        desc = translations[current_language]["combo"].format(action['value'])
-                    elif action['type'] == 'mouse_scroll':
-                        desc = translations[current_language]["mouse_scroll_up"] if action['value'] == 'scroll_up' else \
-                            translations[current_language]["mouse_scroll_down"]
-                    elif action['type'] == 'mouse_click':
-                        btn_name = action['button'].replace('Button.', '')
-                        desc = translations[current_language]["mouse_click_left"] if btn_name == 'left' else \
-                            translations[current_language]["mouse_click_right"] if btn_name == 'right' else \
-                                translations[current_language]["mouse_click_middle"]
-                    foreground = success_color
+                desc, foreground = describe_action(finger_actions.get(i))
                 if i in action_labels and action_labels[i].winfo_exists():
                     action_labels[i].config(text=desc, foreground=foreground)
             print(translations[current_language]["import_success"].format(file_path))
@@ -559,23 +487,7 @@ def switch_language(lang):
             gesture_labels[i].config(text=translations[current_language]["finger_gesture"].format(i))
         # 更新动作标签
         if i in action_labels and action_labels[i].winfo_exists():
-            action = finger_actions.get(i)
-            desc = translations[current_language]["not_set"]
-            foreground = error_color
-            if action:
-                if action['type'] == 'key':
-                    desc = translations[current_language]["key"].format(action['value'])
-                elif action['type'] == 'combo':
-                    desc = translations[current_language]["combo"].format(action['value'])
-                elif action['type'] == 'mouse_scroll':
-                    desc = translations[current_language]["mouse_scroll_up"] if action['value'] == 'scroll_up' else \
-                        translations[current_language]["mouse_scroll_down"]
-                elif action['type'] == 'mouse_click':
-                    btn_name = action['button'].replace('Button.', '')
-                    desc = translations[current_language]["mouse_click_left"] if btn_name == 'left' else \
-                        translations[current_language]["mouse_click_right"] if btn_name == 'right' else \
-                            translations[current_language]["mouse_click_middle"]
-                foreground = success_color
+            desc, foreground = describe_action(finger_actions.get(i))
             action_labels[i].config(text=desc, foreground=foreground)
         if i in set_buttons and set_buttons[i].winfo_exists():
             if finger_actions.get(i) is not None:
@@ -637,6 +549,7 @@ def show_contact_us():
     # 加载微信图片（请替换为实际路径）
     wechat_image_path = "./images/wechat.png"  # 占位符，需替换为你的微信二维码图片路径
     try:
+        from PIL import Image, ImageTk
         image = Image.open(wechat_image_path)
         image = image.resize((250, 350), Image.Resampling.LANCZOS)
         photo = ImageTk.PhotoImage(image)
@@ -790,23 +703,7 @@ def setup_gui():
                           wraplength=150)
         label.pack(side=tk.LEFT, padx=(0, 10))
         gesture_labels[i] = label  # 保存引用
-        action = finger_actions.get(i)
-        desc = translations[current_language]["not_set"]
-        foreground = error_color
-        if action:
-            if action['type'] == 'key':
-                desc = translations[current_language]["key"].format(action['value'])
-            elif action['type'] == 'combo':
-                desc = translations[current_language]["combo"].format(action['value'])
-            elif action['type'] == 'mouse_scroll':
-                desc = translations[current_language]["mouse_scroll_up"] if action['value'] == 'scroll_up' else \
-                    translations[current_language]["mouse_scroll_down"]
-            elif action['type'] == 'mouse_click':
-                btn_name = action['button'].replace('Button.', '')
-                desc = translations[current_language]["mouse_click_left"] if btn_name == 'left' else \
-                    translations[current_language]["mouse_click_right"] if btn_name == 'right' else \
-                        translations[current_language]["mouse_click_middle"]
-            foreground = success_color
+        desc, foreground = describe_action(finger_actions.get(i))
         label = ttk.Label(gesture_frame, text=desc, foreground=foreground, width=40, anchor="w",
                           relief="solid", borderwidth=1, padding="5")
         label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
@@ -831,6 +728,7 @@ def setup_gui():
     )
     start_button.pack(fill=tk.X)
     gui_root.protocol("WM_DELETE_WINDOW", on_gui_close)
+    gui_root.after_idle(startup_report.mark, "gui_ready")
     gui_root.mainloop()
 
 
@@ -850,224 +748,503 @@ def on_gui_close():
         logger.error(f"关闭GUI时出错: {str(e)}", exc_info=True)
 
 
-def draw_chinese_text(img_cv, text, pos, font_size=30, color=(255, 0, 0)):
-    img_pil = Image.fromarray(cv2.cvtColor(img_cv, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(img_pil)
-    try:
-        font = ImageFont.truetype("./fonts/simhei.ttf", font_size)
-    except IOError:
-        logger.error("IO Exception")
-        try:
-            font = ImageFont.truetype("arial.ttf", font_size)
-            if text != translations[current_language]["font_fallback"]:
-                print(translations[current_language]["font_fallback"])
-                logger.error("font_fallback")
-        except IOError:
-            print(translations[current_language]["font_missing"])
-            logger.error("font_missing")
-            cv2.putText(img_cv, translations[current_language]["font_error"], (pos[0], pos[1] + font_size // 2),
-                        cv2.FONT_HERSHEY_SIMPLEX, font_size / 30, color, 2)
-            return img_cv
-    draw.text(pos, text, font=font, fill=color)
-    return cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+def reconfigure_bindings():
+    """检测暂停时重新打开配置界面。返回 True 表示用户确认了新绑定，False 表示取消。
 
+    绑定在界面中编辑，start_camera_detection() 确认时一次性编译为新的 action_plans，
+    检测循环恢复后直接使用新表，不会读到编辑到一半的绑定。
+    """
+    global finger_actions, config_done_and_start
+    finger_actions = {i: None for i in range(1, 6)}
+    action_labels.clear()
+    set_buttons.clear()
+    gesture_labels.clear()  # 清空 gesture_labels
+    config_done_and_start = False
 
-if __name__ == "__main__":
-    try:
-        setup_gui()
-        if not config_done_and_start:
-            print(translations[current_language]["config_canceled"])
-            exit()
-
-        print(translations[current_language]["config_done"])
-        print("已配置的操作:", finger_actions)
-
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            print(translations[current_language]["camera_error"])
-            exit()
-
-        drawing = mp.solutions.drawing_utils
-        hands_module = mp.solutions.hands
-        hand_obj = hands_module.Hands(max_num_hands=2, min_detection_confidence=0.7,
-                                      min_tracking_confidence=0.6)  # 使用 hand_gesture_reader.py 的更高置信度
-
-        start_init = False
-        prev_cnt = -1
-        last_action_time = 0
-        action_hold_time = 0.25
-        min_action_interval = 0.4
-        action_gesture_start_time = 0
-        two_hands_detected_start_time = 0.0
-        exit_countdown_duration = 3.0
+    if listener_keyboard or listener_mouse:
+        stop_capture_mode()
+
+    setup_gui()
+    return config_done_and_start
+
+
+def apply_settings_update(update):
+    """在检测循环的两帧之间应用 SettingsReloader 发布的热更新。返回是否需要按新配置重建手势状态机。"""
+    global finger_actions, action_plans, gesture_actions, gesture_plans, current_language
+    rebuild = update.config is not None  # config.ini 变化时 [Gesture] 时序可能也变了
+    if update.language is not None and update.language != current_language:
+        current_language = update.language
+        console.info(f"已热更新界面语言: {current_language}")
+        logger.info(f"已热更新界面语言: {current_language}")
+    if update.finger_actions is not None and update.finger_actions != finger_actions:
+        # finger_actions 与 action_plans 一起整体替换，检测循环不会看到新旧混合的绑定表
+        finger_actions, action_plans = update.finger_actions, update.action_plans
+        console.info(f"已热更新手势绑定: {finger_actions}")
+        logger.info(f"已热更新手势绑定: {finger_actions}")
+        rebuild = True
+    if update.gesture_actions is not None and update.gesture_actions != gesture_actions:
+        gesture_actions, gesture_plans = update.gesture_actions, update.gesture_plans
+        console.info(f"已热更新模板手势绑定: {gesture_actions}")
+        logger.info(f"已热更新模板手势绑定: {gesture_actions}")
+        rebuild = True
+    return rebuild
+
+
+def create_gesture_state_machine(config):
+    """按当前绑定（手指数与模板手势）的时序构建手势状态机。"""
+    from gestures import GestureStateMachine
+    return GestureStateMachine.from_config(config, {**finger_actions, **gesture_actions})
+
+
+# 文字叠加渲染器：缓存字体和预渲染的文字图块，只在文字区域内混合；首次绘制时创建
+overlay_renderer = None
 
+
+def draw_chinese_text(img_cv, text, pos, font_size=30, color=(255, 0, 0)):
+    global overlay_renderer
+    if overlay_renderer is None:
+        from overlay import TextOverlayRenderer
+        overlay_renderer = TextOverlayRenderer(
+            font_paths=("./fonts/simhei.ttf", "arial.ttf"),
+            notify=lambda event: print(translations[current_language][event]))
+    if not overlay_renderer.draw(img_cv, text, pos, font_size=font_size, color=color):
+        import cv2
+        cv2.putText(img_cv, translations[current_language]["font_error"], (pos[0], pos[1] + font_size // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_size / 30, color, 2)
+    return img_cv
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="基于 MediaPipe 的手势控制")
+    parser.add_argument("--headless", action="store_true",
+                        help="无界面运行：不打开配置 GUI 和预览窗口，直接使用 settings.json 中的绑定")
+    parser.add_argument("--max-fps", type=float, default=None, help="检测循环的帧率上限，0 表示不限制")
+    parser.add_argument("--profile", action="store_true", help="开启分阶段耗时统计（等同于 [Profiler] enabled = true）")
+    parser.add_argument("--record", action="store_true",
+                        help="启动后立即录制关键点会话（也可在预览窗口按 L 键、无界面模式下发送 SIGUSR2 开关）")
+    return parser.parse_args(argv)
+
+
+def install_signal_handlers(stop_event, profiler=None, record_toggle=None):
+    """SIGINT / SIGTERM 触发干净退出（无界面模式下代替 ESC 键）；SIGUSR1 抓取 cProfile 快照（代替 P 键）；
+    SIGUSR2 开关关键点录制（代替 L 键）。"""
+    def handler(signum, frame):
+        logger.info(f"收到信号 {signum}，准备退出")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, handler)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handler)
+    if profiler is not None and profiler.enabled and hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.request_cprofile())
+    if record_toggle is not None and hasattr(signal, "SIGUSR2"):
+        signal.signal(signal.SIGUSR2, lambda signum, frame: record_toggle.set())
+
+
+def run_detection_loop(headless=False, max_fps=0.0, stop_event=None, profiler=None, warmup=None, record=False,
+                       record_toggle=None):
+    """摄像头检测主循环。headless 为 True 时跳过所有绘制、预览窗口和按键处理。
+
+    profiler 为 profiler.StageProfiler 时记录各阶段耗时；预览窗口中按 P 抓取接下来 N 帧的 cProfile 快照。
+    warmup 为 DetectionWarmup 时直接使用其预先打开的摄像头和已预热的检测器。
+    按 R 重新配置时只暂停流水线：摄像头和检测器保持运行，确认后替换绑定表并从下一帧继续。
+    record 为 True 时从第一帧开始录制关键点会话；按 L 键或 record_toggle 被置位时开关录制。
+    """
+    import cv2
+    import numpy as np
+    from capture import LatestFrameCapture
+    from overlay import draw_hand_landmarks
+    from actions import ActionExecutor
+    from detectors import create_hand_detector, NO_HANDS_RESULT
+    from idle import IdleGate
+    from landmarks import (NUM_LANDMARKS, landmarks_to_array, handedness_labels, handedness_codes,
+                           count_fingers_hands, mirror_hands)
+    from frames import FrameBuffers
+    from profiler import create_profiler
+    from hotreload import SettingsReloader
+    from classifier import GestureClassifier, normalize_landmarks
+    from smoothing import HandStabilizer
+    from pointer import ContinuousController, palm_center
+    from inputs import create_input_backend
+    from recording import LandmarkRecorder
+    from camera import CameraProfile
+
+    stop_event = stop_event or threading.Event()
+    profiler = profiler or create_profiler(load_app_config())
+    show_preview = not headless
+
+    cap, hand_obj, input_backend = warmup.take() if warmup is not None else (None, None, None)
+    if cap is None:
+        cap = CameraProfile.from_config(load_app_config()).open()
+    if not cap.isOpened():
+        print(translations[current_language]["camera_error"])
+        if hand_obj is not None:
+            hand_obj.close()
+        if input_backend is not None:
+            input_backend.close()
+        return
+    grabber = LatestFrameCapture(cap).start()  # 后台采集线程，只保留最新帧
+
+    if hand_obj is None:
+        hand_obj = create_hand_detector(load_app_config())
+    detector_stats = getattr(hand_obj, "stats", None)  # ROI 跟踪的 ROI / 整帧推理次数等，显示在性能统计中
+    idle_gate = IdleGate.from_config(load_app_config())  # 无手时降低推理频率，None 表示关闭
+    frame_buffers = FrameBuffers.from_config(load_app_config())  # 翻转/颜色转换复用预分配缓冲区
+    landmark_buffer = np.empty((2, NUM_LANDMARKS, 3), dtype=np.float32)
+
+    gesture_sm = create_gesture_state_machine(load_app_config())
+    classifier = GestureClassifier.from_config(load_app_config())  # 模板手势分类器，None 表示只用手指计数
+    stabilizer = HandStabilizer.from_config(load_app_config())  # 关键点平滑 + 手指判定滞回，None 表示关闭
+    # 轮询 settings.json / config.ini，变化后在后台校验编译，这里只在帧间整体替换
+    reloader = SettingsReloader.from_config(load_app_config(), languages=translations.keys())
+    if reloader is not None:
+        reloader.start()
+    if input_backend is None:
+        input_backend = create_input_backend(load_app_config())  # [Input] backend 选择 pyautogui / pynput / uinput
+    action_executor = ActionExecutor(input_backend).start()  # 动作在独立线程执行，输入注入的停顿不再阻塞视频循环
+    # 每 stats_interval 秒把执行线程的队列深度、丢弃数与延迟分位数写入事件流，运行中即可发现积压
+    stats_interval = load_app_config().getfloat("Logging", "stats_interval", fallback=10.0)
+    next_stats_time = time.monotonic() + stats_interval
+    pointer_control = ContinuousController.from_config(load_app_config(), input_backend)  # pointer 绑定的连续控制，输出线程按需启动
+    two_hands_detected_start_time = 0.0
+    exit_countdown_duration = 3.0
+    last_hand_labels = []  # 用于只在手的数量/左右或手指数变化时记录事件
+    last_gesture = -1
+    held_key = None  # 按住模式下当前按住的手势
+    held_mismatches = 0  # 按住期间连续识别为其他手势的帧数
+    # 连续 hold_release_frames 帧识别为其他手势才松开；默认 1，即手势一变化就松开
+    hold_release_frames = load_app_config().getint("Gesture", "hold_release_frames", fallback=1)
+    recorder = None  # 关键点录制，见 recording.py
+    record_toggle = record_toggle or threading.Event()
+    if record:
+        record_toggle.set()
+
+    min_frame_interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+    next_frame_time = time.monotonic()
+
+    if show_preview:
         cv2.namedWindow("Gesture Control", cv2.WINDOW_NORMAL)
 
-        while True:
-            current_time = time.time()
-            ret, frm = cap.read()
-            if not ret:
-                print(translations[current_language]["frame_error"])
+    while not stop_event.is_set():
+        if min_frame_interval:
+            # 帧率上限：等待到下一个时间片，等待期间收到退出信号则立即结束
+            delay = next_frame_time - time.monotonic()
+            if delay > 0 and stop_event.wait(delay):
                 break
-
-            frm = cv2.flip(frm, 1)
-            rgb_frm = cv2.cvtColor(frm, cv2.COLOR_BGR2RGB)
+            next_frame_time = max(next_frame_time + min_frame_interval, time.monotonic())
+
+        profiler.begin_frame()
+        ret, frame_seq, frame_timestamp, raw_frm = grabber.read()
+        current_time = time.time()
+        if stats_interval > 0 and time.monotonic() >= next_stats_time:
+            emit_event("action_stats", **action_executor.stats())
+            next_stats_time = time.monotonic() + stats_interval
+        if not ret:
+            print(translations[current_language]["frame_error"])
+            break
+        startup_report.mark("first_frame")
+        if reloader is not None:
+            settings_update = reloader.take()
+            if settings_update is not None and apply_settings_update(settings_update):
+                gesture_sm = create_gesture_state_machine(settings_update.config or load_app_config())
+                if pointer_control is not None:
+                    pointer_control.release()  # 绑定可能已变化
+                action_executor.release_held()
+                held_key = None
+            if settings_update is not None and settings_update.config is not None:
+                classifier = GestureClassifier.from_config(settings_update.config)
+                stabilizer = HandStabilizer.from_config(settings_update.config)
+                hold_release_frames = settings_update.config.getint("Gesture", "hold_release_frames", fallback=1)
+                if pointer_control is not None:
+                    pointer_control.stop()
+                pointer_control = ContinuousController.from_config(settings_update.config, input_backend)
+        profiler.mark("read")
+
+        frm = frame_buffers.inference_frame(raw_frm)  # flip_mode = landmarks 时不翻转
+        profiler.mark("flip")
+        if idle_gate is None or idle_gate.should_infer(frm):
+            rgb_frm = frame_buffers.to_rgb(frm)
+            profiler.mark("cvtColor")
             res = hand_obj.process(rgb_frm)
+            startup_report.mark("first_detection")
+            if idle_gate is not None:
+                idle_gate.observe(bool(res.multi_hand_landmarks))
+        else:
+            res = NO_HANDS_RESULT  # 空闲模式下跳过本帧推理
+        profiler.mark("process")
+        if profiler.enabled and detector_stats is not None:
+            profiler.set_counters(detector_stats())
+
+        finger_count_display = translations[current_language]["fingers_na"]
+        hands_label_display = translations[current_language]["no_hands"]
+        exit_countdown_text = ""
+
+        # 每帧只构建一次关键点数组 (n_hands, 21, 3)，计数与绘制共用
+        hands_xyz = landmarks_to_array(res.multi_hand_landmarks, out=landmark_buffer)
+        num_hands_detected = len(hands_xyz)
+        hand_labels = handedness_labels(res.multi_handedness, num_hands_detected)
+        if frame_buffers.mirror_landmarks and num_hands_detected:
+            hand_labels = mirror_hands(hands_xyz, hand_labels)  # 在关键点空间镜像，结果与翻转整帧后推理一致
+        hand_codes = handedness_codes(hand_labels)
+        if record_toggle.is_set():
+            record_toggle.clear()
+            if recorder is None:
+                recorder = LandmarkRecorder.start_session(load_app_config(), frm.shape[1] / frm.shape[0])
+                console.info(translations[current_language]["recording_started"].format(recorder.path))
+            else:
+                recorder.close()
+                console.info(translations[current_language]["recording_stopped"].format(recorder.path))
+                recorder = None
+        if recorder is not None:
+            recorder.write(frame_timestamp, hands_xyz, hand_codes)  # 记录检测器的原始输出（平滑之前）
+        if stabilizer is not None:
+            finger_counts = stabilizer.count(hands_xyz, hand_labels, hand_codes, frame_timestamp)
+        else:
+            finger_counts = count_fingers_hands(hands_xyz, hand_codes)  # 每帧只有 1~2 只手，标量路径更快
+        profiler.mark("count_fingers")
+        if hand_labels != last_hand_labels:
+            emit_event("hand", hands=num_hands_detected, labels=hand_labels)
+            last_hand_labels = hand_labels
+        gesture = int(finger_counts[0]) if num_hands_detected == 1 else -1
+        if gesture != last_gesture:
+            if gesture >= 0:
+                emit_event("gesture", fingers=gesture, hand=hand_labels[0])
+            last_gesture = gesture
+        if num_hands_detected:
+            if num_hands_detected == 2:
+                hands_label_display = translations[current_language]["both_hands"]
+                if two_hands_detected_start_time == 0.0:
+                    two_hands_detected_start_time = current_time
+                elapsed_two_hands_time = current_time - two_hands_detected_start_time
+                remaining_time_for_exit = exit_countdown_duration - elapsed_two_hands_time
+                if remaining_time_for_exit > 0:
+                    exit_countdown_text = translations[current_language]["exit_countdown"].format(
+                        remaining_time_for_exit)
+                else:
+                    exit_countdown_text = translations[current_language]["exiting"]
+                if elapsed_two_hands_time >= exit_countdown_duration:
+                    print("检测到双手持续3秒，程序退出。")
+                    break
+                finger_count_display = translations[current_language]["fingers_na_both"]
+                gesture_sm.reset()
+                action_executor.release_held()
+                held_key = None
+                if pointer_control is not None:
+                    pointer_control.release()
+            elif num_hands_detected == 1:
+                two_hands_detected_start_time = 0.0
 
-            finger_count_display = translations[current_language]["fingers_na"]
-            hands_label_display = translations[current_language]["no_hands"]
-            exit_countdown_text = ""
-            current_handedness_label = "Unknown"  # 用于传递给 count_fingers
-
-            num_hands_detected = 0
-            if res.multi_hand_landmarks:
-                num_hands_detected = len(res.multi_hand_landmarks)
-
-                for i, hand_landmarks in enumerate(res.multi_hand_landmarks):
-                    drawing.draw_landmarks(frm, hand_landmarks, hands_module.HAND_CONNECTIONS)
-
-                if num_hands_detected == 2:
-                    hands_label_display = translations[current_language]["both_hands"]
-                    if two_hands_detected_start_time == 0.0:
-                        two_hands_detected_start_time = current_time
-                    elapsed_two_hands_time = current_time - two_hands_detected_start_time
-                    remaining_time_for_exit = exit_countdown_duration - elapsed_two_hands_time
-                    if remaining_time_for_exit > 0:
-                        exit_countdown_text = translations[current_language]["exit_countdown"].format(
-                            remaining_time_for_exit)
+                if res.multi_handedness and len(res.multi_handedness) > 0:
+                    current_handedness_label = hand_labels[0]  # "Left" or "Right"
+                    if current_handedness_label == "Left":
+                        hands_label_display = translations[current_language]["left_hand"]
+                    elif current_handedness_label == "Right":
+                        hands_label_display = translations[current_language]["right_hand"]
                     else:
-                        exit_countdown_text = translations[current_language]["exiting"]
-                    if elapsed_two_hands_time >= exit_countdown_duration:
-                        print("检测到双手持续3秒，程序退出。")
-                        break
-                    finger_count_display = translations[current_language]["fingers_na_both"]
-                    start_init = False
-                    prev_cnt = -1
-                    action_gesture_start_time = 0
-                elif num_hands_detected == 1:
-                    two_hands_detected_start_time = 0.0
-                    hand_keyPoints = res.multi_hand_landmarks[0]
-
-                    if res.multi_handedness and len(res.multi_handedness) > 0:
-                        handedness_info = res.multi_handedness[0].classification[0]
-                        current_handedness_label = handedness_info.label  # "Left" or "Right"
-                        if current_handedness_label == "Left":
-                            hands_label_display = translations[current_language]["left_hand"]
-                        elif current_handedness_label == "Right":
-                            hands_label_display = translations[current_language]["right_hand"]
-                        else:
-                            hands_label_display = current_handedness_label
+                        hands_label_display = current_handedness_label
+                else:
+                    hands_label_display = translations[current_language]["unknown_hand"]
+
+                cnt = int(finger_counts[0])
+                finger_count_display = translations[current_language]["fingers_count"].format(cnt)
+
+                # 模板手势识别出已绑定的手势时优先使用，否则回退到手指计数
+                gesture_key, action_plan = cnt, action_plans[cnt]
+                if classifier is not None:
+                    gesture_name, _ = classifier.classify(normalize_landmarks(
+                        hands_xyz[:1], hand_codes[:1], frm.shape[1] / frm.shape[0]))[0]
+                    if gesture_name is not None:
+                        finger_count_display = translations[current_language]["gesture_template"].format(gesture_name)
+                        if gesture_plans.get(gesture_name) is not None:
+                            gesture_key, action_plan = gesture_name, gesture_plans[gesture_name]
+                profiler.mark("classify")
+
+                # 按住模式：连续 hold_release_frames 帧识别为其他手势才松开
+                if held_key is not None:
+                    if gesture_key == held_key:
+                        held_mismatches = 0
                     else:
-                        hands_label_display = translations[current_language]["unknown_hand"]
-
-                    cnt = count_fingers(hand_keyPoints, current_handedness_label)
-                    finger_count_display = translations[current_language]["fingers_count"].format(cnt)
-
-                    if prev_cnt != cnt:
-                        action_gesture_start_time = current_time
-                        prev_cnt = cnt
-                        start_init = True
-
-                    if start_init and (current_time - action_gesture_start_time) > action_hold_time:
-                        action_to_perform = finger_actions.get(cnt)
-                        if action_to_perform:
-                            if (current_time - last_action_time) > min_action_interval:
-                                print(translations[current_language]["execute_action"].format(cnt, hands_label_display,
-                                                                                              action_to_perform))
-                                logger.error("execute_action")
-                                try:
-                                    if action_to_perform['type'] == 'key':
-                                        pyautogui.press(action_to_perform['value'])
-                                    elif action_to_perform['type'] == 'combo':
-                                        keys_to_press = action_to_perform['value'].split('+')
-                                        for k_val in keys_to_press:
-                                            pyautogui.keyDown(k_val)
-                                        # time.sleep(0.05)  # 小延迟以确保组合键生效
-                                        for k_val in reversed(keys_to_press):
-                                            pyautogui.keyUp(k_val)
-                                    elif action_to_perform['type'] == 'mouse_scroll':
-                                        if action_to_perform['value'] == 'scroll_up':
-                                            pyautogui.scroll(120)  # 使用 hand_gesture_reader.py 的标准滚动单位
-                                        elif action_to_perform['value'] == 'scroll_down':
-                                            pyautogui.scroll(-120)
-                                    elif action_to_perform['type'] == 'mouse_click':
-                                        button_val = action_to_perform['button'].replace('Button.', '')
-                                        pyautogui.click(button=button_val)
-                                    last_action_time = current_time
-                                except Exception as e:
-                                    print(f"使用 pyautogui 执行操作时出错: {e}")
-                                    logger.error(f"使用 pyautogui 执行操作时出错: {e}")
-                        start_init = False
-            else:
-                two_hands_detected_start_time = 0.0
-                hands_label_display = translations[current_language]["no_hands"]
-                if prev_cnt != 0:
-                    prev_cnt = 0
-                    start_init = False
-                    action_gesture_start_time = 0
-                finger_count_display = translations[current_language]["fingers_count"].format(0)
-
-            frm = draw_chinese_text(frm, finger_count_display, pos=(10, 30), font_size=28, color=(255, 0, 0))
-            frm = draw_chinese_text(frm, hands_label_display, pos=(10, 70), font_size=28, color=(0, 255, 0))
-            if exit_countdown_text:
-                frm = draw_chinese_text(frm, exit_countdown_text, pos=(10, 110), font_size=28, color=(0, 0, 255))
-
-            try:
-                if cv2.getWindowProperty("Gesture Control", cv2.WND_PROP_VISIBLE) <= 0:
-                    print(translations[current_language]["window_closed"])
-                    break
-            except cv2.error:
-                print(translations[current_language]["window_destroyed"])
+                        held_mismatches += 1
+                        if held_mismatches >= hold_release_frames:
+                            action_executor.release_held()
+                            held_key = None
+                if gesture_sm.update(gesture_key, has_action=action_plan is not None):
+                    profiler.mark("decision")
+                    if held_key is not None and gesture_key != held_key:
+                        action_executor.release_held()  # 新手势已被确认，不再等待
+                        held_key = None
+                    # 控制台提示与日志都只是入队，由后台线程输出，不会阻塞检测循环
+                    if gesture_key == cnt:
+                        console.info(translations[current_language]["execute_action"].format(
+                            cnt, hands_label_display, action_plan.describe(translations[current_language])))
+                    else:
+                        console.info(translations[current_language]["execute_gesture_action"].format(
+                            gesture_key, hands_label_display, action_plan.describe(translations[current_language])))
+                    logger.info(f"execute_action: {gesture_key} -> {action_plan.source}")
+                    emit_event("action", fingers=cnt, gesture=gesture_key, hand=hand_labels[0],
+                               action=action_plan.source,
+                               frame_age_ms=round((time.monotonic() - frame_timestamp) * 1000, 2))
+                    # 冷却已从确认时开始；注入失败或被丢弃时撤销本次冷却（失败回调只入队，由本线程处理）
+                    on_fail = functools.partial(gesture_sm.action_failed, gesture_sm.fire_id)
+                    if action_plan.hold:
+                        action_executor.hold(action_plan, on_fail)  # 按下并保持，直到手势变化或手离开
+                        held_key = gesture_key
+                        held_mismatches = 0
+                    elif not action_plan.continuous:
+                        if not action_executor.submit(action_plan, on_fail):  # 只入队，由执行线程注入输入
+                            on_fail()
+                    elif pointer_control is not None:
+                        pointer_control.engage(gesture_key, action_plan)  # 之后每帧按手的位置更新速度
+                    profiler.mark("dispatch")
+                if pointer_control is not None and pointer_control.engaged:
+                    if gesture_key == pointer_control.key:
+                        pointer_control.update(palm_center(hands_xyz[0], frm.shape[1] / frm.shape[0]), frame_timestamp)
+                    else:
+                        pointer_control.mismatch()
+        else:
+            two_hands_detected_start_time = 0.0
+            hands_label_display = translations[current_language]["no_hands"]
+            gesture_sm.no_hands()
+            action_executor.release_held()
+            held_key = None
+            if pointer_control is not None:
+                pointer_control.mismatch()  # 短暂丢失检测不立即释放
+            finger_count_display = translations[current_language]["fingers_count"].format(0)
+        profiler.mark("decision")
+
+        if not show_preview:
+            profiler.end_frame()
+            continue
+
+        frm = frame_buffers.display_frame(raw_frm, frm)
+        profiler.mark("flip")
+        if num_hands_detected:
+            draw_hand_landmarks(frm, hands_xyz)
+        profiler.mark("drawing")
+
+        frm = draw_chinese_text(frm, finger_count_display, pos=(10, 30), font_size=28, color=(255, 0, 0))
+        frm = draw_chinese_text(frm, hands_label_display, pos=(10, 70), font_size=28, color=(0, 255, 0))
+        if exit_countdown_text:
+            frm = draw_chinese_text(frm, exit_countdown_text, pos=(10, 110), font_size=28, color=(0, 0, 255))
+        if recorder is not None:
+            frm = draw_chinese_text(frm, translations[current_language]["recording_hud"], pos=(frm.shape[1] - 90, 10),
+                                    font_size=24, color=(0, 0, 255))
+        if profiler.show_hud:
+            hud_y = frm.shape[0] - 18 * len(profiler.hud_lines()) - 10
+            for line in profiler.hud_lines():
+                frm = draw_chinese_text(frm, line, pos=(10, hud_y), font_size=16, color=(255, 255, 0))
+                hud_y += 18
+        profiler.mark("text_overlay")
+
+        try:
+            if cv2.getWindowProperty("Gesture Control", cv2.WND_PROP_VISIBLE) <= 0:
+                print(translations[current_language]["window_closed"])
                 break
+        except cv2.error:
+            print(translations[current_language]["window_destroyed"])
+            break
 
-            cv2.imshow("Gesture Control", frm)
+        cv2.imshow("Gesture Control", frm)
 
-            key_input = cv2.waitKey(1) & 0xFF
-            if key_input == 27:
-                break
-            elif key_input == ord('r') or key_input == ord('R'):
-                print(translations[current_language]["reconfig"])
-                if cap.isOpened(): cap.release()
-                cv2.destroyAllWindows()
-
-                finger_actions = {i: None for i in range(1, 6)}
-                action_labels.clear()
-                set_buttons.clear()
-                gesture_labels.clear()  # 清空 gesture_labels
-                config_done_and_start = False
-                two_hands_detected_start_time = 0.0
+        key_input = cv2.waitKey(1) & 0xFF
+        profiler.mark("display")
+        profiler.end_frame()
+        if key_input == 27:
+            break
+        elif key_input == ord('p') or key_input == ord('P'):
+            profiler.request_cprofile()
+        elif key_input == ord('l') or key_input == ord('L'):
+            record_toggle.set()
+        elif key_input == ord('r') or key_input == ord('R'):
+            print(translations[current_language]["reconfig"])
+            # 暂停而不是重建：摄像头继续出流、检测器保持加载，只隐藏预览窗口
+            grabber.pause()
+            action_executor.release_held()
+            held_key = None
+            if pointer_control is not None:
+                pointer_control.release()
+            cv2.destroyWindow("Gesture Control")
+            cv2.waitKey(1)
+
+            if not reconfigure_bindings():
+                print(translations[current_language]["config_canceled"])
+                break  # 走下面的统一清理流程
+
+            print(translations[current_language]["reconfig_done"])
+            print("已配置的操作:", finger_actions)
+            # action_plans 已在确认配置时整体替换，这里按新绑定的时序重建手势状态机
+            gesture_sm = create_gesture_state_machine(load_app_config())
+            if stabilizer is not None:
+                stabilizer.reset()  # 暂停期间的时间间隔不参与滤波
+            if reloader is not None:
+                reloader.sync()  # 配置界面刚保存的文件不再作为热更新重复应用
+            two_hands_detected_start_time = 0.0
+            cv2.namedWindow("Gesture Control", cv2.WINDOW_NORMAL)
+            grabber.resume()
+            next_frame_time = time.monotonic()
+
+    grabber.stop()
+    action_executor.stop()
+    if pointer_control is not None:
+        pointer_control.stop()
+    input_backend.close()
+    if recorder is not None:
+        recorder.close()
+        console.info(translations[current_language]["recording_stopped"].format(recorder.path))
+    hand_obj.close()
+    profiler.close()
+    if reloader is not None:
+        reloader.stop()
+    if idle_gate is not None:
+        logger.info(f"空闲模式统计: {idle_gate.stats()}")
+    if cap.isOpened():
+        cap.release()
+    if show_preview:
+        cv2.destroyAllWindows()
 
-                if listener_keyboard or listener_mouse:
-                    stop_capture_mode()
 
-                setup_gui()
+def main(argv=None):
+    global headless_mode
+    startup_report.mark("import")
+    args = parse_args(argv)
+    config = load_app_config()
+    headless_mode = args.headless or config.getboolean("Runtime", "headless", fallback=False)
+    max_fps = args.max_fps if args.max_fps is not None else config.getfloat("Runtime", "max_fps", fallback=0.0)
 
-                if not config_done_and_start:
-                    print(translations[current_language]["config_canceled"])
-                    exit()
+    # 配置界面显示期间在后台打开摄像头并预热检测器
+    warmup = DetectionWarmup(config).start()
+    if headless_mode:
+        load_settings()  # 无界面模式：直接使用 settings.json 中的绑定
+    else:
+        setup_gui()
+        if not config_done_and_start:
+            warmup.close()
+            print(translations[current_language]["config_canceled"])
+            return
 
-                print(translations[current_language]["reconfig_done"])
-                print("已配置的操作:", finger_actions)
-                cap = cv2.VideoCapture(0)
-                if not cap.isOpened():
-                    print(translations[current_language]["camera_error"])
-                    exit()
-                hand_obj = hands_module.Hands(max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.6)
-                cv2.namedWindow("Gesture Control", cv2.WINDOW_NORMAL)
+    print(translations[current_language]["config_done"])
+    print("已配置的操作:", finger_actions)
 
-                start_init = False
-                prev_cnt = -1
-                last_action_time = 0
-                action_gesture_start_time = 0
+    from profiler import create_profiler
+    stop_event = threading.Event()
+    profiler = create_profiler(config, force=args.profile)
+    record_toggle = threading.Event()
+    install_signal_handlers(stop_event, profiler, record_toggle)
+    run_detection_loop(headless=headless_mode, max_fps=max_fps, stop_event=stop_event, profiler=profiler,
+                       warmup=warmup, record=args.record or config.getboolean("Recorder", "record_on_start",
+                                                                              fallback=False),
+                       record_toggle=record_toggle)
 
-        if cap.isOpened():
-            cap.release()
-        cv2.destroyAllWindows()
+    if listener_keyboard or listener_mouse:
+        stop_capture_mode()
+    print(translations[current_language]["app_end"])
 
-        if listener_keyboard or listener_mouse:
-            stop_capture_mode()
-        print(translations[current_language]["app_end"])
+
+if __name__ == "__main__":
+    try:
+        main()
     except Exception as e:
         logger.critical(f"全局未处理异常: {str(e)}", exc_info=True)
-        messagebox.showerror("系统错误", "程序发生严重错误，已记录日志到 app.log")
+        if not headless_mode:
+            messagebox.showerror("系统错误", "程序发生严重错误，已记录日志到 app.log")
         sys.exit(1)
@@ -0,0 +1,428 @@
+"""手势识别离线基准测试（无需摄像头）。
+
+生成与 MediaPipe 结果结构一致的合成关键点流（0–5 根手指、左/右/未知手、单手/双手、可选抖动），
+用假时钟和 hands.Hands 的替身驱动手指计数与防抖/冷却决策逻辑，
+输出吞吐量 (frames/s)、单帧延迟分位数以及每秒决策数。
+
+用法:
+    python benchmark.py --frames 20000 --fps 30 --jitter 0.005
+    python benchmark.py --input-backends null,pynput,uinput --input-events 2000   # 会真实注入输入
+"""
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from gestures import GestureStateMachine, GestureTiming, DEFAULT_TIMING
+from landmarks import (NUM_LANDMARKS, landmarks_to_array, handedness_labels, handedness_codes, mirror_hands,
+                       count_fingers_array, count_fingers_hands)
+from classifier import normalize_landmarks, GestureTemplates, GestureClassifier
+from smoothing import HandStabilizer
+from inputs import BACKENDS, PyAutoGUIBackend
+
+HANDEDNESS_LABELS = ("Left", "Right", "Unknown")
+
+# 单手模板关键点 (x, y)：物理左手、手心朝向摄像头、画面已水平翻转，拇指位于 +x 一侧
+_WRIST = (0.50, 0.80)
+_MCP = {2: (0.63, 0.70), 5: (0.58, 0.60), 9: (0.52, 0.60), 13: (0.47, 0.60), 17: (0.42, 0.62)}
+# 每根手指: (MCP, PIP, DIP, TIP)
+_FINGERS = {
+    "index": (5, 6, 7, 8),
+    "middle": (9, 10, 11, 12),
+    "ring": (13, 14, 15, 16),
+    "pinky": (17, 18, 19, 20),
+}
+# n 根手指时伸出哪些手指（5 指时加上拇指）
+_RAISED_ORDER = ("index", "middle", "ring", "pinky")
+
+
+class FakeClock:
+    def __init__(self, start=0.0):
+        self.t = start
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, dt):
+        self.t += dt
+
+
+def make_hand(fingers, handedness_label="Left", jitter=0.0, offset=(0.0, 0.0), rng=None):
+    """构造一只 MediaPipe 结构的手：返回 (landmarks, 期望的手指数)。"""
+    rng = rng or random
+    points = [None] * 21
+    points[0] = _WRIST
+    points[1] = (0.58, 0.76)
+    thumb_up = fingers >= 5
+    # 拇指：伸出时指尖沿 +x 远离手掌，收起时贴向手掌
+    points[2] = _MCP[2]
+    points[3], points[4] = ((0.68, 0.66), (0.74, 0.62)) if thumb_up else ((0.62, 0.64), (0.58, 0.63))
+    raised = set(_RAISED_ORDER[:min(fingers, 4)])
+    for name, (mcp, pip, dip, tip) in _FINGERS.items():
+        mx, my = _MCP[mcp]
+        points[mcp] = (mx, my)
+        if name in raised:
+            points[pip], points[dip], points[tip] = (mx, my - 0.08), (mx, my - 0.14), (mx, my - 0.20)
+        else:
+            points[pip], points[dip], points[tip] = (mx, my - 0.04), (mx, my + 0.01), (mx, my + 0.03)
+    if handedness_label == "Right":
+        points = [(1.0 - x, y) for x, y in points]  # 右手为左手的镜像
+    landmarks = [
+        SimpleNamespace(x=x + offset[0] + rng.gauss(0.0, jitter) if jitter else x + offset[0],
+                        y=y + offset[1] + rng.gauss(0.0, jitter) if jitter else y + offset[1],
+                        z=0.0)
+        for x, y in points
+    ]
+    expected = min(fingers, 4) + (1 if thumb_up and handedness_label != "Unknown" else 0)
+    return SimpleNamespace(landmark=landmarks), expected
+
+
+def make_result(hands):
+    """hands: [(landmarks, handedness_label)]，返回与 Hands.process() 结果结构一致的对象。"""
+    if not hands:
+        return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+    handedness = []
+    for _, label in hands:
+        if label == "Unknown":
+            handedness = None  # 与真实结果缺少 multi_handedness 的情况一致
+            break
+        handedness.append(SimpleNamespace(classification=[SimpleNamespace(label=label, score=0.95)]))
+    return SimpleNamespace(multi_hand_landmarks=[lm for lm, _ in hands], multi_handedness=handedness)
+
+
+def generate_stream(n_frames, fps=30.0, jitter=0.0, seed=0):
+    """生成分段保持的手势流：每段随机选择手数、手指数与左右手，持续 0.1–1.2 秒。"""
+    rng = random.Random(seed)
+    stream = []
+    while len(stream) < n_frames:
+        n_hands = rng.choices((0, 1, 2), weights=(2, 12, 1))[0]
+        fingers = rng.randint(0, 5)
+        label = rng.choice(HANDEDNESS_LABELS)
+        segment = max(1, int(rng.uniform(0.1, 1.2) * fps))
+        for _ in range(min(segment, n_frames - len(stream))):
+            hands = []
+            expected = None
+            for h in range(n_hands):
+                lm, exp = make_hand(fingers, label, jitter=jitter, offset=(0.3 * h - 0.15 * (n_hands - 1), 0.0),
+                                    rng=rng)
+                hands.append((lm, label))
+                expected = exp
+            stream.append((make_result(hands), expected if n_hands == 1 else None))
+    return stream
+
+
+class StubHands:
+    """hands.Hands 的替身：process() 依次返回预先生成的结果。"""
+
+    def __init__(self, results):
+        self._results = results
+        self._idx = 0
+
+    def process(self, image):
+        res = self._results[self._idx % len(self._results)]
+        self._idx += 1
+        return res
+
+    def close(self):
+        pass
+
+
+def _percentiles(samples_s):
+    arr = np.asarray(samples_s, dtype=np.float64) * 1e6
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50_us": round(float(p50), 2), "p95_us": round(float(p95), 2), "p99_us": round(float(p99), 2),
+            "max_us": round(float(arr.max()), 2)}
+
+
+def bench_count_fingers_array(stream, count=count_fingers_array):
+    """数组版计数：逐帧构建 (n_hands, 21, 3) 数组并用 count 计数（只计计数本身的耗时），再对整段做一次批量计数。
+
+    count 为 count_fingers_array（向量化）或 count_fingers_hands（检测循环使用的标量逐帧路径）。
+    """
+    cases = [(res, expected) for res, expected in stream if expected is not None]
+    latencies = []
+    matches = 0
+    frames_xyz = []
+    frames_codes = []
+    start = time.perf_counter()
+    for res, expected in cases:
+        hands_xyz = landmarks_to_array(res.multi_hand_landmarks)
+        codes = handedness_codes(handedness_labels(res.multi_handedness, len(hands_xyz)))
+        t0 = time.perf_counter()
+        cnt = int(count(hands_xyz, codes)[0])
+        latencies.append(time.perf_counter() - t0)
+        matches += cnt == expected
+        frames_xyz.append(hands_xyz)
+        frames_codes.append(codes)
+    elapsed = time.perf_counter() - start
+
+    batch_s = 0.0
+    if cases:
+        batch_xyz = np.stack(frames_xyz)  # (n_frames, 1, 21, 3)
+        batch_codes = np.stack(frames_codes)
+        t0 = time.perf_counter()
+        count_fingers_array(batch_xyz, batch_codes)
+        batch_s = time.perf_counter() - t0
+    return {
+        "calls": len(cases),
+        "calls_per_s": round(len(cases) / elapsed, 1) if elapsed else 0.0,
+        "accuracy": round(matches / len(cases), 4) if cases else 0.0,
+        "batch_frames_per_s": round(len(cases) / batch_s, 1) if batch_s else 0.0,
+        **_percentiles(latencies or [0.0]),
+    }
+
+
+def bench_decision_loop(stream, fps=30.0, finger_actions=None, timing=DEFAULT_TIMING, mirror=False):
+    """用假时钟和 StubHands 运行与 __main__ 相同的逐帧决策流程。
+
+    与检测循环走同一条路径：复用缓冲区构建关键点数组、取左右手标签、mirror 为 True 时在关键点空间镜像
+    （对应 [Detection] flip_mode = landmarks），再用标量的 count_fingers_hands 按左右手编码计数。
+    """
+    finger_actions = finger_actions or {i: {"type": "key", "value": str(i)} for i in range(1, 6)}
+    clock = FakeClock()
+    hand_obj = StubHands([res for res, _ in stream])
+    gesture_sm = GestureStateMachine(default_timing=timing, clock=clock)
+    frame = np.zeros((1, 1, 3), dtype=np.uint8)
+    landmark_buffer = np.zeros((2, NUM_LANDMARKS, 3), dtype=np.float32)
+    decisions = 0
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(len(stream)):
+        t0 = time.perf_counter()
+        res = hand_obj.process(frame)
+        hands_xyz = landmarks_to_array(res.multi_hand_landmarks, out=landmark_buffer)
+        num_hands = len(hands_xyz)
+        labels = handedness_labels(res.multi_handedness, num_hands)
+        if mirror and num_hands:
+            labels = mirror_hands(hands_xyz, labels)
+        codes = handedness_codes(labels)
+        counts = count_fingers_hands(hands_xyz, codes)
+        if num_hands == 2:
+            gesture_sm.reset()
+        elif num_hands == 1:
+            cnt = int(counts[0])
+            action_to_perform = finger_actions.get(cnt)
+            if gesture_sm.update(cnt, has_action=bool(action_to_perform)):
+                decisions += 1
+        else:
+            gesture_sm.no_hands()
+        latencies.append(time.perf_counter() - t0)
+        clock.advance(1.0 / fps)
+    elapsed = time.perf_counter() - start
+    simulated = clock() or 1.0
+    return {
+        "frames": len(stream),
+        "frames_per_s": round(len(stream) / elapsed, 1) if elapsed else 0.0,
+        "decisions": decisions,
+        "decisions_per_simulated_s": round(decisions / simulated, 3),
+        "decisions_per_wall_s": round(decisions / elapsed, 1) if elapsed else 0.0,
+        **_percentiles(latencies or [0.0]),
+    }
+
+
+def bench_classifier(stream, n_gestures=36, samples_per_gesture=20, k=0, seed=0):
+    """模板分类器：0–5 指的合成手势各录 samples_per_gesture 个样本，再补充随机模板到 n_gestures 个，
+    逐帧对单手做归一化 + 分类，统计单手延迟与识别正确率。"""
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    templates = GestureTemplates()
+    for fingers in range(6):
+        labels = [rng.choice(("Left", "Right")) for _ in range(samples_per_gesture)]
+        xyz = landmarks_to_array([make_hand(fingers, label, jitter=0.005, rng=rng)[0] for label in labels])
+        templates.add(f"fingers{fingers}", normalize_landmarks(xyz, handedness_codes(labels)))
+    for extra in range(max(0, n_gestures - 6)):
+        templates.add(f"random{extra}", np_rng.normal(0.0, 1.0, (samples_per_gesture, 60)))
+    classifier = GestureClassifier(templates, k=k, reject_distance=0.25)
+
+    cases = [(res, expected) for res, expected in stream
+             if expected is not None and res.multi_handedness and
+             res.multi_handedness[0].classification[0].label != "Unknown"]
+    latencies = []
+    matches = 0
+    for res, expected in cases:
+        hands_xyz = landmarks_to_array(res.multi_hand_landmarks)
+        codes = handedness_codes(handedness_labels(res.multi_handedness, len(hands_xyz)))
+        t0 = time.perf_counter()
+        name, _ = classifier.classify(normalize_landmarks(hands_xyz[:1], codes[:1]))[0]
+        latencies.append(time.perf_counter() - t0)
+        matches += name == f"fingers{expected}"
+    return {
+        "gestures": len(templates),
+        "templates": len(templates.features),
+        "k": k,
+        "calls": len(cases),
+        "accuracy": round(matches / len(cases), 4) if cases else 0.0,
+        **_percentiles(latencies or [0.0]),
+    }
+
+
+# (名称, HandStabilizer 参数)；None 表示不平滑、无滞回的原始计数
+SMOOTHING_CONFIGS = (
+    ("raw", None),
+    ("hysteresis", dict(hysteresis=0.15, smoothing=False)),
+    ("one_euro", dict(min_cutoff=1.0, beta=5.0, hysteresis=0.0)),
+    ("one_euro+hysteresis", dict(min_cutoff=1.0, beta=5.0, hysteresis=0.15)),
+    ("one_euro_strong+hysteresis", dict(min_cutoff=0.5, beta=2.0, hysteresis=0.15)),
+)
+
+
+def bench_smoothing(stream, fps=30.0, configs=SMOOTHING_CONFIGS):
+    """平滑/滞回的延迟–稳定性权衡：在单手帧上比较各配置的计数。
+
+    每次期望手势变化（或手重新出现）开始一段；计数第一次等于新手势之前是稳定窗口，不计入跳变。
+    accuracy: 计数与期望值一致的帧比例；flicker_per_s: 稳定之后计数再次变化的次数（每模拟秒稳定帧）；
+    settle_ms / settle_p95_ms: 每段从开始到计数等于期望值的平均 / 95 分位时间；
+    unsettled: 直到结束都没有稳定的段数（其时长不计入 settle_ms）；us_per_frame: 每帧处理耗时。
+    """
+    frames = []
+    for res, expected in stream:
+        hands_xyz = landmarks_to_array(res.multi_hand_landmarks)
+        labels = handedness_labels(res.multi_handedness, len(hands_xyz))
+        frames.append((hands_xyz, labels, handedness_codes(labels), expected))
+
+    report = {}
+    for name, params in configs:
+        stabilizer = HandStabilizer(**params) if params is not None else None
+        matches = flickers = single_frames = stable_frames = unsettled = 0
+        settle_frames = []
+        prev_expected = prev_output = None
+        segment_start = None  # 当前段尚未稳定时为段起始帧号，稳定后为 None
+        elapsed = 0.0
+        for i, (hands_xyz, labels, codes, expected) in enumerate(frames):
+            hands_xyz = hands_xyz.copy()  # 平滑会原地修改关键点
+            t0 = time.perf_counter()
+            if stabilizer is not None:
+                counts = stabilizer.count(hands_xyz, labels, codes, i / fps)
+            else:
+                counts = count_fingers_array(hands_xyz, codes)
+            elapsed += time.perf_counter() - t0
+            if expected != prev_expected:
+                unsettled += segment_start is not None  # 上一段到结束都没有稳定
+                segment_start = i if expected is not None else None
+            if expected is None:
+                prev_expected = prev_output = None
+                continue
+            output = int(counts[0])
+            single_frames += 1
+            matches += output == expected
+            if segment_start is None:
+                stable_frames += 1
+                flickers += output != prev_output
+            elif output == expected:
+                settle_frames.append(i - segment_start)
+                segment_start = None
+            prev_expected, prev_output = expected, output
+        unsettled += segment_start is not None
+        settle_ms = np.asarray(settle_frames, dtype=np.float64) * 1000.0 / fps
+        report[name] = {
+            "accuracy": round(matches / single_frames, 4) if single_frames else 0.0,
+            "flicker_per_s": round(flickers / (stable_frames / fps), 3) if stable_frames else 0.0,
+            "settle_ms": round(float(settle_ms.mean()), 1) if len(settle_ms) else 0.0,
+            "settle_p95_ms": round(float(np.percentile(settle_ms, 95)), 1) if len(settle_ms) else 0.0,
+            "unsettled": unsettled,
+            "us_per_frame": round(elapsed / len(frames) * 1e6, 2) if frames else 0.0,
+        }
+    return report
+
+
+def bench_input_backends(names=("null",), events=2000):
+    """输入注入后端的微基准：每个后端分别测量鼠标相对移动（+1/-1 像素交替，光标最终不动）与单次按键 (shift)。
+
+    除 null 外都会真实注入输入；pyautogui 以 pause=False 测量（否则每次调用固定 sleep PAUSE 秒）。
+    无法创建的后端（缺少依赖、无权限等）记录错误信息。
+    """
+    report = {}
+    for name in names:
+        try:
+            backend = PyAutoGUIBackend(pause=False) if name == "pyautogui" else BACKENDS[name]()
+        except Exception as e:
+            report[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        result = {}
+        try:
+            for workload, call in (("move_rel", lambda i: backend.move_rel(1 if i % 2 == 0 else -1, 0)),
+                                   ("press", lambda i: backend.press("shift"))):
+                latencies = []
+                start = time.perf_counter()
+                for i in range(events):
+                    t0 = time.perf_counter()
+                    call(i)
+                    latencies.append(time.perf_counter() - t0)
+                elapsed = time.perf_counter() - start
+                result[workload] = {"events_per_s": round(events / elapsed, 1), **_percentiles(latencies)}
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            backend.close()
+        report[name] = result
+    return report
+
+
+def run_benchmarks(frames=20000, fps=30.0, jitter=0.0, seed=0, timing=DEFAULT_TIMING, input_backends=("null",),
+                   input_events=2000, flip_mode="image"):
+    stream = generate_stream(frames, fps=fps, jitter=jitter, seed=seed)
+    return {
+        "config": {"frames": frames, "fps": fps, "jitter": jitter, "seed": seed, "timing": timing._asdict(),
+                   "flip_mode": flip_mode},
+        "count_fingers_array": bench_count_fingers_array(stream),
+        "count_fingers_hands": bench_count_fingers_array(stream, count=count_fingers_hands),
+        "decision_loop": bench_decision_loop(stream, fps=fps, timing=timing, mirror=flip_mode == "landmarks"),
+        "classifier_centroid": bench_classifier(stream, seed=seed),
+        "classifier_knn": bench_classifier(stream, k=5, seed=seed),
+        "smoothing": bench_smoothing(stream, fps=fps),
+        "input_backends": bench_input_backends(input_backends, input_events),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="手指计数与手势决策循环的离线基准测试")
+    parser.add_argument("--frames", type=int, default=20000, help="合成帧数")
+    parser.add_argument("--fps", type=float, default=30.0, help="假时钟模拟的帧率")
+    parser.add_argument("--jitter", type=float, default=0.0, help="关键点高斯抖动标准差（归一化坐标）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hold-ms", type=float, default=DEFAULT_TIMING.hold * 1000, help="手势确认保持时长")
+    parser.add_argument("--hold-frames", type=int, default=DEFAULT_TIMING.hold_frames,
+                        help="手势确认所需连续帧数（<=0 只按时长）")
+    parser.add_argument("--cooldown-ms", type=float, default=DEFAULT_TIMING.cooldown * 1000, help="触发后冷却时长")
+    parser.add_argument("--input-backends", default="null",
+                        help=f"逗号分隔的输入后端 ({', '.join(BACKENDS)})；null 以外会真实移动鼠标、按下 Shift")
+    parser.add_argument("--input-events", type=int, default=2000, help="每个输入后端每项测量的事件数")
+    parser.add_argument("--flip-mode", choices=("image", "landmarks"), default="image",
+                        help="决策循环模拟的 [Detection] flip_mode；landmarks 时每帧在关键点空间镜像")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    input_backends = [name.strip() for name in args.input_backends.split(",") if name.strip()]
+    unknown = [name for name in input_backends if name not in BACKENDS]
+    if unknown:
+        parser.error(f"未知的输入后端: {', '.join(unknown)}")
+    timing = GestureTiming(args.hold_ms / 1000.0, args.cooldown_ms / 1000.0, args.hold_frames)
+    report = run_benchmarks(args.frames, args.fps, args.jitter, args.seed, timing, input_backends, args.input_events,
+                            args.flip_mode)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return report
+    print(f"配置: {report['config']}")
+    for name in ("count_fingers_array", "count_fingers_hands", "decision_loop", "classifier_centroid",
+                 "classifier_knn"):
+        print(f"[{name}]")
+        for key, value in report[name].items():
+            print(f"  {key:>26}: {value}")
+    print("[smoothing]")
+    for name, result in report["smoothing"].items():
+        print(f"  {name:>26}: " + ", ".join(f"{key} {value}" for key, value in result.items()))
+    print("[input_backends]")
+    for name, result in report["input_backends"].items():
+        if "error" in result and len(result) == 1:
+            print(f"  {name:>26}: {result['error']}")
+            continue
+        for workload, stats in result.items():
+            print(f"  {name + '.' + workload:>26}: {stats}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""摄像头采集参数（config.ini 的 [Camera] 段）与最低延迟采集模式的探测。
+
+默认的 cv2.VideoCapture(0) 由 OpenCV 自选后端、分辨率和像素格式，在 Linux 上常常协商为低帧率的 YUYV，
+驱动还会缓冲多帧，读到的画面比实际晚好几帧。[Camera] 段可以指定：
+  - source：摄像头序号，或视频文件 / 设备路径（例如 v4l2loopback 的 /dev/video10，用于测试）；
+  - backend：auto / v4l2 / ffmpeg / gstreamer / dshow / msmf；
+  - width、height、fps：请求的分辨率和帧率，0 表示不设置；
+  - fourcc：像素格式，例如 MJPG（USB 2.0 摄像头在高分辨率下通常只有 MJPG 能跑满帧率），留空表示不设置；
+  - buffer_size：CAP_PROP_BUFFERSIZE，1 表示驱动只保留最新一帧，0 表示不设置。
+驱动不支持的值会被忽略，打开后实际协商到的模式写入日志。
+
+探测命令逐个尝试候选模式，测量实际交付帧率、cap.read() 耗时和驱动缓冲的旧帧数，估计延迟最低的模式可以写回 config.ini:
+    python camera.py probe --save
+    python camera.py probe --source /dev/video10 --frames 60
+    python camera.py show
+"""
+import argparse
+import configparser
+import itertools
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {
+    "auto": "CAP_ANY",
+    "v4l2": "CAP_V4L2",
+    "ffmpeg": "CAP_FFMPEG",
+    "gstreamer": "CAP_GSTREAMER",
+    "dshow": "CAP_DSHOW",
+    "msmf": "CAP_MSMF",
+}
+
+
+def fourcc_to_str(code):
+    code = int(code)
+    if code <= 0:
+        return ""
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\0 ")
+
+
+class CameraProfile:
+    """一组采集参数；open() 按参数打开 cv2.VideoCapture 并依次设置像素格式、分辨率、帧率和缓冲区。"""
+
+    def __init__(self, source=0, backend="auto", width=0, height=0, fps=0.0, fourcc="", buffer_size=1):
+        self.source = source
+        self.backend = backend
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+
+    @property
+    def is_file(self):
+        """视频文件：设置项无效，read() 不等待新帧。"""
+        return isinstance(self.source, str) and os.path.isfile(self.source)
+
+    def replace(self, **changes):
+        params = dict(self.as_dict(), **changes)
+        return CameraProfile(**params)
+
+    def as_dict(self):
+        return {"source": self.source, "backend": self.backend, "width": self.width, "height": self.height,
+                "fps": self.fps, "fourcc": self.fourcc, "buffer_size": self.buffer_size}
+
+    def __str__(self):
+        size = f"{self.width}x{self.height}" if self.width and self.height else "默认分辨率"
+        fps = f"{self.fps:g} fps" if self.fps else "默认帧率"
+        return f"{size} {fps} {self.fourcc or '默认格式'} buffer={self.buffer_size or '默认'}"
+
+    def open(self):
+        """打开摄像头；失败时返回的 cap.isOpened() 为 False，由调用方处理。"""
+        import cv2
+
+        backend = self.backend.strip().lower()
+        if backend not in BACKENDS:
+            logger.warning(f"未知的摄像头后端 {self.backend}，改用 auto")
+            backend = "auto"
+        api = getattr(cv2, BACKENDS[backend], cv2.CAP_ANY)
+        cap = cv2.VideoCapture(self.source, api)
+        if not cap.isOpened():
+            logger.error(f"无法打开摄像头 {self.source} (backend={backend})")
+            return cap
+        if self.fourcc:
+            # V4L2 需要先设置像素格式，再设置分辨率，否则分辨率会按旧格式协商
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc.ljust(4)[:4]))
+        if self.width and self.height:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        logger.info(f"摄像头 {self.source} 已打开: 请求 {self} -> 实际 {negotiated_mode(cap)}")
+        return cap
+
+    @classmethod
+    def from_config(cls, config):
+        """由 config.ini 的 [Camera] 段构建；缺省时与原来的 cv2.VideoCapture(0) 相同，只额外设置 buffer_size = 1。"""
+        source = config.get("Camera", "source", fallback="0").strip()
+        return cls(
+            source=int(source) if source.isdigit() else source,
+            backend=config.get("Camera", "backend", fallback="auto"),
+            width=config.getint("Camera", "width", fallback=0),
+            height=config.getint("Camera", "height", fallback=0),
+            fps=config.getfloat("Camera", "fps", fallback=0.0),
+            fourcc=config.get("Camera", "fourcc", fallback="").strip(),
+            buffer_size=config.getint("Camera", "buffer_size", fallback=1),
+        )
+
+    def save(self, path="config.ini"):
+        """把后端、分辨率、帧率、像素格式和缓冲区写回 config.ini 的 [Camera] 段（保留其他段和原有换行符）。"""
+        config = configparser.ConfigParser()
+        newline = None
+        if os.path.exists(path):
+            config.read(path, encoding="utf-8")
+            with open(path, "rb") as f:
+                newline = "\r\n" if b"\r\n" in f.read() else None
+        if not config.has_section("Camera"):
+            config.add_section("Camera")
+        config.set("Camera", "backend", self.backend)
+        for key in ("width", "height", "buffer_size"):
+            config.set("Camera", key, str(getattr(self, key)))
+        config.set("Camera", "fps", f"{self.fps:g}")
+        config.set("Camera", "fourcc", self.fourcc)
+        with open(path, "w", encoding="utf-8", newline=newline) as configfile:
+            config.write(configfile)
+
+
+def negotiated_mode(cap):
+    """驱动实际协商到的模式：分辨率、帧率、像素格式与缓冲区大小。"""
+    import cv2
+
+    return {
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": round(cap.get(cv2.CAP_PROP_FPS), 2),
+        "fourcc": fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        "buffer_size": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        "backend": cap.getBackendName() if hasattr(cap, "getBackendName") else "",
+    }
+
+
+def measure_profile(profile, frames=90, warmup_frames=10, stall=0.25):
+    """打开一个模式并测量：
+
+    - fps：连续读取 frames 帧的实际交付帧率；
+    - read_ms：单次 cap.read() 耗时的 p50/p95；
+    - buffered：停顿 stall 秒后，不等待就能立即读到的旧帧数（驱动缓冲的帧，每一帧都会让画面晚一个帧间隔）；
+    - latency_ms：估计的画面延迟 = (buffered + 1) 个帧间隔；视频文件没有缓冲，取 read_ms 的 p50。
+    失败时返回带 error 字段的结果。
+    """
+    result = {"profile": profile.as_dict()}
+    start = time.perf_counter()
+    cap = profile.open()
+    try:
+        if not cap.isOpened():
+            result["error"] = "无法打开"
+            return result
+        result["open_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result["mode"] = negotiated_mode(cap)
+        for _ in range(warmup_frames):  # 跳过自动曝光收敛、格式切换后的前几帧
+            if not cap.read()[0]:
+                break
+        read_times = []
+        begin = time.perf_counter()
+        for _ in range(frames):
+            t0 = time.perf_counter()
+            ok = cap.read()[0]
+            if not ok:
+                break
+            read_times.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - begin
+        if len(read_times) < 2:
+            result["error"] = "读不到帧"
+            return result
+        read_times = np.array(read_times) * 1000
+        fps = len(read_times) / elapsed
+        result["frames"] = len(read_times)
+        result["fps"] = round(fps, 2)
+        result["read_ms"] = {"p50": round(float(np.percentile(read_times, 50)), 3),
+                             "p95": round(float(np.percentile(read_times, 95)), 3)}
+        if profile.is_file:
+            result["buffered"] = 0
+            result["latency_ms"] = result["read_ms"]["p50"]
+            return result
+        # 停顿期间新帧在驱动中排队；之后耗时远小于帧间隔的读取都来自缓冲
+        period_ms = 1000.0 / fps
+        time.sleep(stall)
+        buffered = 0
+        for _ in range(int(stall * fps) + 2):
+            t0 = time.perf_counter()
+            if not cap.read()[0]:
+                break
+            if (time.perf_counter() - t0) * 1000 >= period_ms * 0.25:
+                break
+            buffered += 1
+        result["buffered"] = buffered
+        result["latency_ms"] = round((buffered + 1) * period_ms, 1)
+        return result
+    finally:
+        cap.release()
+
+
+def candidate_profiles(base, resolutions, fps_values, fourccs, buffer_sizes):
+    """base 的 source/backend 与各候选参数的笛卡尔积。"""
+    return [base.replace(width=w, height=h, fps=fps, fourcc=fourcc, buffer_size=buffer_size)
+            for (w, h), fps, fourcc, buffer_size in itertools.product(resolutions, fps_values, fourccs, buffer_sizes)]
+
+
+def choose_best(results, min_fps):
+    """实际帧率不低于 min_fps 的模式中估计延迟最低者（相同时取帧率更高者）；都不达标时在全部成功的模式中选。"""
+    measured = [r for r in results if "error" not in r and "skipped" not in r]
+    qualified = [r for r in measured if r["fps"] >= min_fps] or measured
+    if not qualified:
+        return None
+    return min(qualified, key=lambda r: (r["latency_ms"], -r["fps"]))
+
+
+def probe(base, candidates, frames=90, min_fps=20.0, stall=0.25, report=print):
+    """依次测量候选模式并返回 (results, best)。驱动协商到相同实际模式的候选只测一次。"""
+    results = []
+    seen = {}
+    for profile in candidates:
+        result = measure_profile(profile, frames=frames, stall=stall)
+        if "mode" in result:
+            mode = json.dumps(result["mode"], sort_keys=True)
+            if mode in seen:
+                result = {"profile": profile.as_dict(), "mode": result["mode"], "skipped": seen[mode]}
+            else:
+                seen[mode] = str(profile)
+        results.append(result)
+        report(format_result(profile, result))
+    return results, choose_best(results, min_fps)
+
+
+def format_result(profile, result):
+    if "error" in result:
+        return f"{profile}: {result['error']}"
+    mode = result["mode"]
+    actual = f"{mode['width']}x{mode['height']} {mode['fps']:g} fps {mode['fourcc'] or '?'} buffer={mode['buffer_size']}"
+    if "skipped" in result:
+        return f"{profile}: 实际 {actual}，与 {result['skipped']} 相同，跳过"
+    return (f"{profile}: 实际 {actual} | {result['fps']:.1f} fps, read p50 {result['read_ms']['p50']:.2f} ms "
+            f"p95 {result['read_ms']['p95']:.2f} ms, 缓冲 {result['buffered']} 帧, 估计延迟 {result['latency_ms']:.1f} ms")
+
+
+def parse_resolutions(text):
+    return [tuple(int(v) for v in item.lower().split("x")) for item in text.split(",") if item.strip()]
+
+
+def parse_list(text, cast=str):
+    return [cast(item.strip()) for item in text.split(",") if item.strip() or cast is str]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="摄像头采集模式查看与最低延迟模式探测")
+    parser.add_argument("--config", default="config.ini")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="按 [Camera] 段打开摄像头并显示实际协商到的模式")
+    show.add_argument("--source", help="摄像头序号或视频文件 / 设备路径，默认取 [Camera] source")
+    run = sub.add_parser("probe", help="逐个尝试候选模式，测量实际帧率和读取延迟")
+    run.add_argument("--source", help="摄像头序号或视频文件 / 设备路径，默认取 [Camera] source")
+    run.add_argument("--backend", help="默认取 [Camera] backend")
+    run.add_argument("--resolutions", help="候选分辨率，例如 640x480,1280x720，默认取 [Camera] probe_resolutions")
+    run.add_argument("--fps", help="候选帧率，例如 30,60，默认取 [Camera] probe_fps")
+    run.add_argument("--fourcc", help="候选像素格式，例如 MJPG,YUYV（空项表示不设置），默认取 [Camera] probe_fourcc")
+    run.add_argument("--buffer-sizes", help="候选 CAP_PROP_BUFFERSIZE，默认取 [Camera] probe_buffer_sizes")
+    run.add_argument("--frames", type=int, default=90, help="每个模式测量的帧数")
+    run.add_argument("--min-fps", type=float, default=None, help="可接受的最低实际帧率，默认取 [Camera] probe_min_fps")
+    run.add_argument("--save", action="store_true", help="把最佳模式写回 config.ini 的 [Camera] 段")
+    run.add_argument("--json", action="store_true", help="以 JSON 输出全部测量结果")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    config = configparser.ConfigParser()
+    if os.path.exists(args.config):
+        config.read(args.config, encoding="utf-8")
+    base = CameraProfile.from_config(config)
+    if args.source is not None:
+        base.source = int(args.source) if args.source.isdigit() else args.source
+
+    if args.command == "show":
+        cap = base.open()
+        if not cap.isOpened():
+            print(f"无法打开摄像头 {base.source}")
+            return 1
+        print(f"请求: {base}")
+        print(f"实际: {json.dumps(negotiated_mode(cap), ensure_ascii=False)}")
+        cap.release()
+        return 0
+
+    if args.backend:
+        base.backend = args.backend
+    resolutions = parse_resolutions(
+        args.resolutions or config.get("Camera", "probe_resolutions", fallback="640x480,1280x720"))
+    fps_values = parse_list(args.fps or config.get("Camera", "probe_fps", fallback="30,60"), float)
+    fourccs = parse_list(args.fourcc if args.fourcc is not None
+                         else config.get("Camera", "probe_fourcc", fallback="MJPG,YUYV"))
+    buffer_sizes = parse_list(args.buffer_sizes or config.get("Camera", "probe_buffer_sizes", fallback="1"), int)
+    min_fps = args.min_fps if args.min_fps is not None else config.getfloat("Camera", "probe_min_fps", fallback=20.0)
+    candidates = candidate_profiles(base, resolutions, fps_values, fourccs, buffer_sizes)
+    report = (lambda line: None) if args.json else print
+    report(f"探测 {base.source} 的 {len(candidates)} 个候选模式，每个 {args.frames} 帧...")
+    results, best = probe(base, candidates, frames=args.frames, min_fps=min_fps,
+                          report=report)
+    if args.json:
+        print(json.dumps({"results": results, "best": best}, ensure_ascii=False, indent=2))
+    if best is None:
+        print("没有可用的模式")
+        return 1
+    best_profile = base.replace(**{k: v for k, v in best["profile"].items() if k != "source"})  # 包括 --backend 覆盖的后端
+    report(f"最佳模式: {best_profile}（{best['fps']:.1f} fps，估计延迟 {best['latency_ms']:.1f} ms）")
+    if args.save:
+        best_profile.save(args.config)
+        report(f"已写入 {args.config} 的 [Camera] 段")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class LatestFrameCapture:
+    """后台采集线程：持续调用 cap.read()，缓冲区中只保留最新的几帧。
+
+    检测循环通过 read() 取走最新一帧，未被取走就被覆盖/跳过的旧帧计入 dropped_frames，
+    这样推理变慢时摄像头缓冲区里不会堆积过期画面。
+    """
+
+    def __init__(self, cap, buffer_size=1):
+        self.cap = cap
+        self._slots = deque(maxlen=max(1, int(buffer_size)))  # 元素: (seq, timestamp, frame)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.failed = False  # cap.read() 失败后置为 True，read() 将返回 ok=False
+        self._paused = False
+        self.frames_captured = 0  # 已采集的帧数（下一帧的序号）
+        self.frames_delivered = 0  # 被检测循环取走的帧数
+        self.dropped_frames = 0  # 未被处理就被丢弃的帧数
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="LatestFrameCapture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while self._running:
+            ret, frm = self.cap.read()
+            timestamp = time.monotonic()
+            with self._cond:
+                if not ret:
+                    self.failed = True
+                    self._cond.notify_all()
+                    break
+                if self._paused:
+                    continue  # 暂停期间继续读取以保持摄像头出流，但不缓存、不计数
+                if len(self._slots) == self._slots.maxlen:
+                    self.dropped_frames += 1  # 最旧的一帧将被覆盖
+                self._slots.append((self.frames_captured, timestamp, frm))
+                self.frames_captured += 1
+                self._cond.notify_all()
+        self._running = False
+
+    def read(self, timeout=5.0):
+        """等待并取走最新一帧。
+
+        返回 (ok, seq, timestamp, frame)。缓冲区中比最新帧更旧的帧会被丢弃并计数；
+        采集失败、线程已停止或超时时 ok 为 False。
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._slots:
+                if self.failed or not self._running:
+                    return False, -1, 0.0, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"等待摄像头帧超时 ({timeout}s)")
+                    return False, -1, 0.0, None
+                self._cond.wait(remaining)
+            seq, timestamp, frm = self._slots.pop()
+            self.dropped_frames += len(self._slots)
+            self._slots.clear()
+            self.frames_delivered += 1
+        return True, seq, timestamp, frm
+
+    def pause(self):
+        """暂停交付帧（例如重新配置期间），摄像头保持打开，恢复后第一次 read() 即可拿到新画面。"""
+        with self._cond:
+            self._paused = True
+            self._slots.clear()
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+
+    def stats(self):
+        with self._cond:
+            return {
+                "captured": self.frames_captured,
+                "delivered": self.frames_delivered,
+                "dropped": self.dropped_frames,
+            }
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info(f"采集线程已停止: {self.stats()}")
@@ -0,0 +1,248 @@
+"""基于模板的手势分类器。
+
+与手指计数并存：用户为每个手势录制若干样本，关键点经过平移、缩放、旋转归一化（并把左右手统一镜像）
+得到特征向量，存成一个紧凑的 float32 矩阵；分类时用矩阵乘法一次算出到所有质心（或所有样本，kNN）的距离，
+超过拒识阈值则视为未知手势，回退到手指计数。
+
+录制与管理模板:
+    python classifier.py record peace --samples 40
+    python classifier.py list
+    python classifier.py remove peace
+"""
+import argparse
+import logging
+import os
+
+import numpy as np
+
+from landmarks import HAND_RIGHT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES = "gesture_templates.npz"
+FEATURE_DIM = 20 * 3  # 手腕归一化后恒为原点，只保留其余 20 个关键点的 (x, y, z)
+
+
+def normalize_landmarks(hands_xyz, codes, aspect=1.0):
+    """(..., 21, 3) 关键点 -> (..., 60) float32 特征向量。
+
+    - 平移：以手腕 (0) 为原点；
+    - 旋转：把手腕->中指指根 (9) 的方向转到图像上方 (-y)；
+    - 缩放：除以手腕到中指指根的长度；
+    - 镜像：右手的 x 取反，与左手使用同一套模板（未知手不镜像）。
+    aspect 为画面宽高比，用于在旋转前把归一化坐标还原成等比例坐标。
+    """
+    pts = np.asarray(hands_xyz, dtype=np.float32)
+    p = pts[..., 1:, :] - pts[..., :1, :]
+    if aspect != 1.0:
+        p = p * np.array((aspect, 1.0, aspect), dtype=np.float32)
+    ref = p[..., 8, :2]  # 中指指根 (9) 相对手腕
+    length = np.maximum(np.sqrt((ref * ref).sum(axis=-1)), 1e-6)
+    ux = (ref[..., 0] / length)[..., None]
+    uy = (ref[..., 1] / length)[..., None]
+    x, y = p[..., 0], p[..., 1]
+    codes = np.asarray(codes)
+    mirror = np.where(codes == HAND_RIGHT, -1.0, 1.0).astype(np.float32)
+    inv = (1.0 / length)[..., None]
+    features = np.empty(p.shape, dtype=np.float32)
+    features[..., 0] = (x * -uy + y * ux) * inv * mirror[..., None]
+    features[..., 1] = -(x * ux + y * uy) * inv
+    features[..., 2] = p[..., 2] * inv
+    return features.reshape(p.shape[:-2] + (FEATURE_DIM,))
+
+
+class GestureTemplates:
+    """模板样本库：names 为手势名列表，features 为 (N, 60) float32，labels 为每个样本所属手势的下标。"""
+
+    def __init__(self, names=(), features=None, labels=None):
+        self.names = list(names)
+        self.features = np.zeros((0, FEATURE_DIM), dtype=np.float32) if features is None else \
+            np.ascontiguousarray(features, dtype=np.float32)
+        self.labels = np.zeros(0, dtype=np.int32) if labels is None else np.asarray(labels, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, features):
+        features = np.asarray(features, dtype=np.float32).reshape(-1, FEATURE_DIM)
+        if name not in self.names:
+            self.names.append(name)
+        label = self.names.index(name)
+        self.features = np.concatenate([self.features, features])
+        self.labels = np.concatenate([self.labels, np.full(len(features), label, dtype=np.int32)])
+
+    def remove(self, name):
+        if name not in self.names:
+            return False
+        label = self.names.index(name)
+        keep = self.labels != label
+        self.features, self.labels = self.features[keep], self.labels[keep]
+        self.labels[self.labels > label] -= 1
+        del self.names[label]
+        return True
+
+    def counts(self):
+        return dict(zip(self.names, np.bincount(self.labels, minlength=len(self.names)).tolist()))
+
+    def centroids(self):
+        sums = np.zeros((len(self.names), FEATURE_DIM), dtype=np.float64)
+        np.add.at(sums, self.labels, self.features)
+        return (sums / np.maximum(np.bincount(self.labels, minlength=len(self.names)), 1)[:, None]).astype(np.float32)
+
+    def save(self, path):
+        np.savez_compressed(path, names=np.array(self.names, dtype=str), features=self.features, labels=self.labels)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["names"].tolist(), data["features"], data["labels"])
+
+
+class GestureClassifier:
+    """向量化的最近质心 (k = 0) / kNN (k > 0) 分类器。
+
+    距离用 |x|^2 - 2 x·c + |c|^2 一次矩阵乘法算出，再换算为每个关键点的均方根距离（单位：手掌长度），
+    最近距离超过 reject_distance 时拒识。
+    """
+
+    def __init__(self, templates, k=0, reject_distance=0.25):
+        self.names = list(templates.names)
+        self.k = k
+        self.reject_distance = reject_distance
+        if k > 0:
+            self._refs, self._ref_labels = templates.features, templates.labels
+        else:
+            self._refs, self._ref_labels = templates.centroids(), np.arange(len(self.names), dtype=np.int32)
+        self._ref_sq = (self._refs.astype(np.float32) ** 2).sum(axis=1)
+        self._refs_t = np.ascontiguousarray(self._refs.T)
+
+    def distances(self, features):
+        """(n, 60) -> (n, n_refs) 每关键点的均方根距离。"""
+        features = np.asarray(features, dtype=np.float32).reshape(-1, FEATURE_DIM)
+        d2 = (features * features).sum(axis=1)[:, None] - 2.0 * (features @ self._refs_t) + self._ref_sq
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2 / (FEATURE_DIM // 3))
+
+    def classify(self, features):
+        """返回每个特征向量的 (手势名或 None, 距离) 列表。"""
+        if not self.names:
+            return [(None, float("inf"))] * len(np.atleast_2d(features))
+        dist = self.distances(features)
+        results = []
+        for row in dist:
+            if self.k > 0 and len(row) > self.k:
+                nearest = np.argpartition(row, self.k)[:self.k]
+                votes = np.bincount(self._ref_labels[nearest], minlength=len(self.names))
+                label = int(votes.argmax())
+                best = float(row[nearest][self._ref_labels[nearest] == label].min())
+            else:
+                idx = int(row.argmin())
+                label, best = int(self._ref_labels[idx]), float(row[idx])
+            results.append((self.names[label] if best <= self.reject_distance else None, best))
+        return results
+
+    @classmethod
+    def from_config(cls, config):
+        """由 config.ini 的 [Classifier] 段构建；未启用或没有模板文件时返回 None。"""
+        if not config.getboolean("Classifier", "enabled", fallback=False):
+            return None
+        path = config.get("Classifier", "templates", fallback=DEFAULT_TEMPLATES)
+        if not os.path.exists(path):
+            logger.warning(f"未找到手势模板文件 {path}，模板分类器未启用")
+            return None
+        templates = GestureTemplates.load(path)
+        logger.info(f"已加载手势模板 {path}: {templates.counts()}")
+        return cls(templates, k=config.getint("Classifier", "k", fallback=0),
+                   reject_distance=config.getfloat("Classifier", "reject_distance", fallback=0.25))
+
+
+def record_samples(name, n_samples, templates_path, config, show_preview=True):
+    """打开摄像头，采集 n_samples 帧单手的特征向量并追加到模板文件。"""
+    import time
+    import cv2
+    from camera import CameraProfile
+    from detectors import create_hand_detector
+    from landmarks import landmarks_to_array, handedness_labels, handedness_codes
+    from overlay import draw_hand_landmarks
+
+    cap = CameraProfile.from_config(config).open()
+    if not cap.isOpened():
+        print("错误: 无法打开摄像头。")
+        return False
+    detector = create_hand_detector(config)
+    collected = []
+    start_after = time.monotonic() + 2.0  # 给用户 2 秒摆好手势
+    print(f"请对着摄像头保持手势 '{name}'，2 秒后开始采集 {n_samples} 个样本（ESC 取消）")
+    try:
+        while len(collected) < n_samples:
+            ret, frame = cap.read()
+            if not ret:
+                print("错误: 无法抓取帧。")
+                return False
+            frame = cv2.flip(frame, 1)
+            res = detector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            hands_xyz = landmarks_to_array(res.multi_hand_landmarks)
+            if len(hands_xyz) == 1 and time.monotonic() >= start_after:
+                codes = handedness_codes(handedness_labels(res.multi_handedness, 1))
+                collected.append(normalize_landmarks(hands_xyz, codes, frame.shape[1] / frame.shape[0])[0])
+            if show_preview:
+                draw_hand_landmarks(frame, hands_xyz)
+                cv2.putText(frame, f"{name}: {len(collected)}/{n_samples}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.9, (0, 255, 0), 2)
+                cv2.imshow("Record Gesture", frame)
+                if cv2.waitKey(1) & 0xFF == 27:
+                    print("已取消采集。")
+                    return False
+    finally:
+        detector.close()
+        cap.release()
+        if show_preview:
+            cv2.destroyAllWindows()
+
+    templates = GestureTemplates.load(templates_path) if os.path.exists(templates_path) else GestureTemplates()
+    templates.add(name, np.stack(collected))
+    templates.save(templates_path)
+    print(f"已保存 {len(collected)} 个 '{name}' 样本到 {templates_path}: {templates.counts()}")
+    return True
+
+
+def main(argv=None):
+    import configparser
+
+    parser = argparse.ArgumentParser(description="录制和管理模板手势")
+    parser.add_argument("--templates", default=None, help="模板文件，默认取 [Classifier] templates")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="用摄像头录制一个手势的样本")
+    record.add_argument("name", help="手势名，在 settings.json 的 \"gestures\" 中按该名字绑定动作")
+    record.add_argument("--samples", type=int, default=30, help="采集的样本帧数")
+    record.add_argument("--headless", action="store_true", help="不显示预览窗口")
+    sub.add_parser("list", help="列出已录制的手势及样本数")
+    remove = sub.add_parser("remove", help="删除一个手势的全部样本")
+    remove.add_argument("name")
+    args = parser.parse_args(argv)
+
+    config = configparser.ConfigParser()
+    if os.path.exists("config.ini"):
+        config.read("config.ini", encoding="utf-8")
+    path = args.templates or config.get("Classifier", "templates", fallback=DEFAULT_TEMPLATES)
+
+    if args.command == "record":
+        return 0 if record_samples(args.name, args.samples, path, config, show_preview=not args.headless) else 1
+    if not os.path.exists(path):
+        print(f"未找到模板文件 {path}")
+        return 1
+    templates = GestureTemplates.load(path)
+    if args.command == "list":
+        for gesture, count in templates.counts().items():
+            print(f"{gesture}: {count}")
+        return 0
+    if not templates.remove(args.name):
+        print(f"模板中没有手势 '{args.name}'")
+        return 1
+    templates.save(path)
+    print(f"已删除手势 '{args.name}'")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""手部检测后端。
+
+所有后端都提供与 mp.solutions.hands.Hands 相同的接口：process(rgb_frame) 返回带有
+multi_hand_landmarks / multi_handedness 的结果对象，close() 释放资源。
+"""
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import mediapipe as mp
+
+from tracking import RoiHandTracker
+
+logger = logging.getLogger(__name__)
+
+# 跳过推理的帧使用的空结果，结构与 Hands.process() 的返回值一致
+NO_HANDS_RESULT = SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+
+DEFAULT_TASKS_MODEL = "./models/hand_landmarker.task"
+
+
+class LiveStreamHandDetector:
+    """基于 MediaPipe Tasks HandLandmarker (LIVE_STREAM 模式) 的异步检测后端。
+
+    process() 用单调时间戳提交当前帧后返回最近一次完成的结果（通常是上一帧的），
+    推理与采集/绘制流水线并行；推理繁忙时 MediaPipe 会自行丢弃来不及处理的帧。
+    还没有比上次更新的结果时最多等待 result_wait 秒（约一帧间隔，0 表示从不等待），之后照样返回已有的结果，
+    不会拖住采集循环；重复返回旧结果的次数记在 stats() 的 stale 中。
+    结果在回调线程中转换为 Hands.process() 的结构，下游的手势逻辑无需改动。
+    """
+
+    def __init__(self, model_path, num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.6,
+                 result_wait=0.033):
+        from mediapipe.tasks import python as mp_tasks
+        from mediapipe.tasks.python import vision
+
+        options = vision.HandLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=num_hands,
+            min_hand_detection_confidence=min_detection_confidence,
+            min_hand_presence_confidence=min_tracking_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            result_callback=self._on_result)
+        self._landmarker = vision.HandLandmarker.create_from_options(options)
+        self.result_wait = result_wait
+        self._cond = threading.Condition()
+        self._latest = NO_HANDS_RESULT
+        self._latest_ts = -1  # 最近一次完成推理的帧时间戳 (ms)
+        self._returned_ts = -1  # 上次 process() 返回的结果对应的时间戳
+        self._last_submitted_ts = -1
+        self.frames_submitted = 0
+        self.results_received = 0
+        self.stale_returns = 0
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        if result.hand_landmarks:
+            res = SimpleNamespace(
+                multi_hand_landmarks=[SimpleNamespace(landmark=hand) for hand in result.hand_landmarks],
+                multi_handedness=[
+                    SimpleNamespace(classification=[SimpleNamespace(label=cats[0].category_name, score=cats[0].score)])
+                    for cats in result.handedness
+                ] or None)
+        else:
+            res = NO_HANDS_RESULT
+        with self._cond:
+            if timestamp_ms > self._latest_ts:
+                self._latest, self._latest_ts = res, timestamp_ms
+                self.results_received += 1
+                self._cond.notify_all()
+
+    def process(self, rgb_frame):
+        # LIVE_STREAM 要求时间戳严格递增
+        timestamp_ms = max(int(time.monotonic() * 1000), self._last_submitted_ts + 1)
+        self._last_submitted_ts = timestamp_ms
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+        self._landmarker.detect_async(image, timestamp_ms)
+        self.frames_submitted += 1
+
+        # 最多等待约一帧间隔，看能否拿到比上次返回的更新的结果；首帧不等待
+        deadline = time.monotonic() + self.result_wait
+        with self._cond:
+            while self._latest_ts <= self._returned_ts and self._returned_ts >= 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stale_returns += 1
+                    break
+                self._cond.wait(remaining)
+            self._returned_ts = max(self._latest_ts, 0)
+            return self._latest
+
+    def stats(self):
+        return {"submitted": self.frames_submitted, "results": self.results_received, "stale": self.stale_returns}
+
+    def close(self):
+        logger.info(f"LIVE_STREAM 检测统计: {self.stats()}")
+        self._landmarker.close()
+
+
+def create_hand_detector(config):
+    """按 config.ini 的 [Detection] 段构建手部检测器。
+
+    backend = solutions 使用同步的 mp.solutions.hands.Hands（默认），可再由 roi_tracking 包装为 ROI 跟踪推理；
+    backend = tasks 使用 Tasks HandLandmarker 的 LIVE_STREAM 异步后端，模型文件由 tasks_model 指定。
+    """
+    backend = config.get("Detection", "backend", fallback="solutions").strip().lower()
+    if backend == "tasks":
+        model_path = config.get("Detection", "tasks_model", fallback=DEFAULT_TASKS_MODEL)
+        if os.path.exists(model_path):
+            if config.getboolean("Detection", "roi_tracking", fallback=False):
+                logger.warning("LIVE_STREAM 后端的结果滞后一帧，不支持 roi_tracking，已忽略该选项")
+            return LiveStreamHandDetector(
+                model_path, result_wait=config.getfloat("Detection", "result_wait_ms", fallback=33.0) / 1000.0)
+        print(f"未找到 HandLandmarker 模型文件 {model_path}，改用 mp.solutions.hands")
+        logger.error(f"未找到 HandLandmarker 模型文件 {model_path}，改用 mp.solutions.hands")
+    elif backend != "solutions":
+        logger.warning(f"未知的检测后端 {backend}，改用 mp.solutions.hands")
+
+    if config.getboolean("Detection", "roi_tracking", fallback=False):
+        # ROI 跟踪自己维护帧间包围盒，整帧与裁剪图各用一个不保留状态的静态图像检测器
+        return RoiHandTracker(
+            mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=2, min_detection_confidence=0.7),
+            mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=1, min_detection_confidence=0.6),
+            input_size=config.getint("Detection", "roi_input_size", fallback=256),
+            padding=config.getfloat("Detection", "roi_padding", fallback=0.25),
+            redetect_interval=config.getint("Detection", "roi_redetect_interval", fallback=15),
+            max_roi_fraction=config.getfloat("Detection", "roi_max_fraction", fallback=0.9))
+    return mp.solutions.hands.Hands(max_num_hands=2, min_detection_confidence=0.7,
+                                    min_tracking_confidence=0.6)  # 使用 hand_gesture_reader.py 的更高置信度
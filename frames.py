@@ -0,0 +1,54 @@
+import logging
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+FLIP_MODES = ("image", "landmarks")
+
+
+class FrameBuffers:
+    """复用预分配的输出缓冲区完成镜像翻转与 BGR->RGB 转换（cv2 的 dst= 参数），每帧不再新分配图像。
+
+    flip_mode = image：与以前一样先翻转整帧再推理，预览画面与推理输入都是镜像后的图像。
+    flip_mode = landmarks：推理直接使用未翻转的原始帧，由 landmarks.mirror_hands() 在关键点空间镜像
+    x 坐标并交换左右手标签；只有预览时才翻转显示用的图像，无界面模式下完全不翻转。
+    """
+
+    def __init__(self, flip_mode="image"):
+        if flip_mode not in FLIP_MODES:
+            logger.warning(f"未知的 flip_mode {flip_mode}，改用 image")
+            flip_mode = "image"
+        self.flip_mode = flip_mode
+        self.mirror_landmarks = flip_mode == "landmarks"
+        self._flipped = None
+        self._rgb = None
+
+    @staticmethod
+    def _reuse(buf, frame):
+        # 分辨率或类型变化时丢弃旧缓冲区，由 cv2 重新分配
+        if buf is None or buf.shape != frame.shape or buf.dtype != frame.dtype:
+            return None
+        return buf
+
+    def flip(self, frame):
+        """水平翻转到复用的缓冲区。返回的数组在下一次调用 flip() 时会被覆盖。"""
+        self._flipped = cv2.flip(frame, 1, dst=self._reuse(self._flipped, frame))
+        return self._flipped
+
+    def to_rgb(self, frame):
+        """BGR -> RGB 到复用的缓冲区。返回的数组在下一次调用 to_rgb() 时会被覆盖。"""
+        self._rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._reuse(self._rgb, frame))
+        return self._rgb
+
+    def inference_frame(self, frame):
+        """推理使用的 BGR 帧：landmarks 模式下为原始帧，否则为翻转后的帧。"""
+        return frame if self.mirror_landmarks else self.flip(frame)
+
+    def display_frame(self, frame, inference_frame):
+        """预览显示用的镜像 BGR 帧；image 模式下直接复用已翻转的推理帧。"""
+        return self.flip(frame) if self.mirror_landmarks else inference_frame
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("Detection", "flip_mode", fallback="image").strip().lower())
@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+# 单个手势的时序参数：hold 为确认所需保持时长(秒)，cooldown 为触发后的冷却时长(秒)，
+# hold_frames 为确认所需的连续一致帧数；时长与帧数先满足者生效，hold_frames <= 0 表示只按时长确认。
+GestureTiming = namedtuple("GestureTiming", ["hold", "cooldown", "hold_frames"])
+
+DEFAULT_TIMING = GestureTiming(hold=0.25, cooldown=0.4, hold_frames=8)
+
+_HOLD_TIMER = "hold"
+_COOLDOWN_TIMER = "cooldown"
+
+
+def gesture_timings_from_actions(finger_actions, default=DEFAULT_TIMING):
+    """从 finger_actions 中读取每个手指数的可选时序覆盖项 hold_ms / cooldown_ms / hold_frames。"""
+    timings = {}
+    for cnt, action in finger_actions.items():
+        if not isinstance(action, dict):
+            continue
+        hold, cooldown, hold_frames = default
+        try:
+            if "hold_ms" in action:
+                hold = max(0.0, float(action["hold_ms"]) / 1000.0)
+            if "cooldown_ms" in action:
+                cooldown = max(0.0, float(action["cooldown_ms"]) / 1000.0)
+            if "hold_frames" in action:
+                hold_frames = int(action["hold_frames"])
+        except (TypeError, ValueError):
+            logger.warning(f"手指 {cnt} 的时序参数无效，使用默认值: {action}")
+            continue
+        timings[cnt] = GestureTiming(hold, cooldown, hold_frames)
+    return timings
+
+
+class GestureStateMachine:
+    """手势确认与冷却状态机（取代 __main__ 中的 prev_cnt / start_init / last_action_time 等变量）。
+
+    - 时钟可注入（默认 time.monotonic），基准测试和回放可使用假时钟；
+    - 每个手指数可有独立的保持时长、冷却时长和确认帧数，连续 N 帧一致或保持 T 秒先满足者即确认；
+    - 保持计时与冷却计时放在一个小顶堆中，冷却期间确认的手势会推迟到冷却计时器到期后（若仍保持）再触发；
+    - 冷却在 update() 确认手势时立即开始，动作排队或执行期间同样处于冷却中；动作执行失败时由 action_failed()
+      撤销本次冷却，注入失败的动作不会阻挡下一个手势。
+    """
+
+    def __init__(self, timings=None, default_timing=DEFAULT_TIMING, clock=time.monotonic):
+        self.clock = clock
+        self.default_timing = default_timing
+        self.timings = dict(timings or {})
+        self._timers = []  # 小顶堆: (deadline, seq, kind, generation)
+        self._timer_seq = itertools.count()
+        self.generation = 0  # 每开始一个新手势加一，用于丢弃过期的计时器
+        self.cooldown_until = float("-inf")
+        self.last_fired = None  # (手指数, 时间)
+        self.fire_id = 0  # 每次确认加一，action_failed() 据此只撤销最近一次确认的冷却
+        self._undo = None  # (fire_id, 确认前的 cooldown_until, 确认前的 last_fired)
+        self._failed = deque()  # 执行线程报告的失败 fire_id，由检测线程在 update() 中处理
+        self.reset()
+
+    def timing(self, cnt):
+        return self.timings.get(cnt, self.default_timing)
+
+    def _push_timer(self, deadline, kind):
+        heapq.heappush(self._timers, (deadline, next(self._timer_seq), kind, self.generation))
+
+    def _expire_timers(self, now):
+        while self._timers and self._timers[0][0] <= now:
+            _, _, kind, generation = heapq.heappop(self._timers)
+            if generation != self.generation:
+                continue
+            if kind == _HOLD_TIMER:
+                self.hold_reached = True
+            elif kind == _COOLDOWN_TIMER:
+                self.deferred = False  # 冷却结束，推迟的手势在本帧重新检查
+
+    def next_deadline(self):
+        """最近一个待处理计时器的截止时间，没有时返回 None。"""
+        while self._timers and self._timers[0][3] != self.generation:
+            heapq.heappop(self._timers)
+        return self._timers[0][0] if self._timers else None
+
+    def _start_gesture(self, cnt, now):
+        self.generation += 1
+        self.current = cnt
+        self.gesture_start = now
+        self.stable_frames = 1
+        self.hold_reached = False
+        self.armed = True
+        self.deferred = False
+        self._push_timer(now + self.timing(cnt).hold, _HOLD_TIMER)
+
+    def _clear(self, current):
+        self.generation += 1
+        self.current = current
+        self.gesture_start = 0
+        self.stable_frames = 0
+        self.hold_reached = False
+        self.armed = False
+        self.deferred = False
+
+    def reset(self):
+        """双手模式或重新配置：清空当前手势。"""
+        self._clear(-1)
+
+    def no_hands(self):
+        if self.current != 0:
+            self._clear(0)
+
+    def update(self, cnt, has_action=True, now=None):
+        """输入当前帧的手指数，返回是否应当执行该手指数绑定的操作。
+
+        返回 True 时即开始该手势的冷却计时（fire_id 标识本次确认）；同一次保持只会触发一次，手指数变化后重新计时。
+        """
+        now = self.clock() if now is None else now
+        while self._failed:
+            self._rollback(self._failed.popleft())
+        if cnt != self.current:
+            self._start_gesture(cnt, now)
+        else:
+            self.stable_frames += 1
+        self._expire_timers(now)
+        if not self.armed:
+            return False
+
+        timing = self.timing(cnt)
+        if not self.hold_reached and not (0 < timing.hold_frames <= self.stable_frames):
+            return False
+        if not has_action:
+            self.armed = False
+            return False
+        if self.deferred:
+            return False  # 等待冷却计时器到期
+        if now < self.cooldown_until:
+            self.deferred = True
+            self._push_timer(self.cooldown_until, _COOLDOWN_TIMER)
+            return False
+
+        self.armed = False
+        self.fire_id += 1
+        self._undo = (self.fire_id, self.cooldown_until, self.last_fired)
+        self.cooldown_until = now + timing.cooldown
+        self.last_fired = (cnt, now)
+        return True
+
+    def action_failed(self, fire_id):
+        """fire_id 对应的动作执行失败或被丢弃。可以在动作执行线程中调用：只入队，由检测线程在下一次 update() 中撤销冷却。"""
+        self._failed.append(fire_id)
+
+    def _rollback(self, fire_id):
+        if self._undo is None or self._undo[0] != fire_id:
+            return  # 之后又有新的确认，冷却已属于新手势
+        _, self.cooldown_until, self.last_fired = self._undo
+        self._undo = None
+        self.deferred = False  # 推迟中的手势在本帧按恢复后的冷却重新检查
+
+    @classmethod
+    def from_config(cls, config, finger_actions, clock=time.monotonic):
+        """由 config.ini 的 [Gesture] 默认值和 settings.json 中每个绑定的覆盖项构建状态机。"""
+        default = DEFAULT_TIMING
+        if config is not None and config.has_section("Gesture"):
+            section = config["Gesture"]
+            default = GestureTiming(
+                hold=section.getfloat("hold_ms", fallback=DEFAULT_TIMING.hold * 1000) / 1000.0,
+                cooldown=section.getfloat("cooldown_ms", fallback=DEFAULT_TIMING.cooldown * 1000) / 1000.0,
+                hold_frames=section.getint("hold_frames", fallback=DEFAULT_TIMING.hold_frames),
+            )
+        return cls(gesture_timings_from_actions(finger_actions, default), default_timing=default, clock=clock)
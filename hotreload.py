@@ -0,0 +1,178 @@
+import configparser
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+
+from actions import compile_action, compile_actions
+
+logger = logging.getLogger(__name__)
+
+# 一次热更新的内容。对应文件未变化的字段为 None。
+# finger_actions/action_plans 与 gesture_actions/gesture_plans（模板手势的绑定）总是一起替换；
+# config 为重新读取的 ConfigParser（手势时序等从中重建）。
+SettingsUpdate = namedtuple("SettingsUpdate",
+                            "finger_actions action_plans gesture_actions gesture_plans language config")
+
+
+def file_signature(path):
+    """(mtime_ns, inode, size)；文件不存在时为 None。替换式写入（写临时文件再 rename）会改变 inode。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_ino, st.st_size
+
+
+def load_bindings(path):
+    """读取并校验 settings.json，返回 ({1..5: 动作字典或 None}, {模板手势名: 动作字典})。
+
+    文件缺失的手指视为未设置；格式无效的动作记录警告后视为未设置（模板手势的无效绑定直接丢弃）。
+    JSON 解析失败、顶层或 "gestures" 不是对象时抛出 ValueError。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    if not isinstance(settings, dict):
+        raise ValueError("settings.json 顶层必须是对象")
+    bindings = {}
+    for i in range(1, 6):
+        action = settings.get(str(i))
+        if action is not None and compile_action(action) is None:
+            logger.warning(f"无效的设置项，手指 {i}: {action}")
+            action = None
+        bindings[i] = action
+    gestures = settings.get("gestures")
+    if gestures is None:
+        gestures = {}
+    elif not isinstance(gestures, dict):
+        raise ValueError("settings.json 中的 gestures 必须是对象")
+    gesture_bindings = {}
+    for name, action in gestures.items():
+        if compile_action(action) is None:
+            logger.warning(f"无效的设置项，手势 {name}: {action}")
+            continue
+        gesture_bindings[name] = action
+    return bindings, gesture_bindings
+
+
+class SettingsReloader:
+    """后台线程低频轮询 settings.json 与 config.ini 的 mtime/inode/大小。
+
+    文件变化后在后台线程中完成读取、校验和编译，再把完整的 SettingsUpdate 作为一个整体发布；
+    检测循环每帧调用 take()（无更新时只是一次属性读取），在帧与帧之间一次性替换绑定表，
+    不会看到更新到一半的表。读取失败（例如文件正在被写入）时保留旧配置，文件再次变化后重试；
+    同一个文件版本（mtime/inode/大小相同）只读取并记录一次失败，不会每次轮询都刷日志。
+    """
+
+    def __init__(self, settings_path="settings.json", config_path="config.ini", interval=1.0, languages=()):
+        self.settings_path = settings_path
+        self.config_path = config_path
+        self.interval = interval
+        self.languages = tuple(languages)  # 有效的语言代码，为空时不校验
+        self._signatures = {settings_path: file_signature(settings_path),
+                            config_path: file_signature(config_path)}
+        self._failed = {}  # 路径 -> 最近一次读取失败的文件签名
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.failures = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="SettingsReloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"检查配置文件更新时出错: {e}", exc_info=True)
+
+    def _changed(self, path):
+        signature = file_signature(path)
+        if signature is None or signature == self._signatures.get(path) or signature == self._failed.get(path):
+            return None
+        return signature
+
+    def poll(self):
+        """检查一次文件变化；有变化时发布更新并返回 True。"""
+        finger_actions = action_plans = gesture_actions = gesture_plans = language = config = None
+
+        signature = self._changed(self.settings_path)
+        if signature is not None:
+            try:
+                finger_actions, gesture_actions = load_bindings(self.settings_path)
+                action_plans = compile_actions(finger_actions)
+                gesture_plans = {name: compile_action(action) for name, action in gesture_actions.items()}
+                self._signatures[self.settings_path] = signature
+            except (OSError, ValueError) as e:  # json.JSONDecodeError 是 ValueError 的子类
+                self.failures += 1
+                self._failed[self.settings_path] = signature
+                finger_actions = None
+                logger.warning(f"重新加载 {self.settings_path} 失败，保留当前绑定: {e}")
+
+        signature = self._changed(self.config_path)
+        if signature is not None:
+            config = configparser.ConfigParser()
+            try:
+                config.read(self.config_path, encoding="utf-8")
+                self._signatures[self.config_path] = signature
+            except configparser.Error as e:
+                self.failures += 1
+                self._failed[self.config_path] = signature
+                config = None
+                logger.warning(f"重新加载 {self.config_path} 失败，保留当前配置: {e}")
+            if config is not None:
+                language = config.get("Settings", "language", fallback=None)
+                if language is not None and self.languages and language not in self.languages:
+                    logger.warning(f"config.ini 中的语言 {language} 无效，已忽略")
+                    language = None
+
+        if finger_actions is None and config is None:
+            return False
+        with self._lock:
+            previous = self._pending
+            if previous is not None and finger_actions is None:
+                finger_actions, action_plans = previous.finger_actions, previous.action_plans
+                gesture_actions, gesture_plans = previous.gesture_actions, previous.gesture_plans
+            if previous is not None and config is None:
+                language, config = previous.language, previous.config
+            self._pending = SettingsUpdate(finger_actions, action_plans, gesture_actions, gesture_plans, language,
+                                           config)
+            self.reloads += 1
+        return True
+
+    def sync(self):
+        """以当前文件为基准并丢弃待应用的更新（程序自身刚写入配置后调用，例如重新配置界面确认后）。"""
+        with self._lock:
+            self._pending = None
+            self._failed.clear()
+            for path in self._signatures:
+                self._signatures[path] = file_signature(path)
+
+    def take(self):
+        """取走待应用的更新；没有更新时返回 None。"""
+        if self._pending is None:
+            return None
+        with self._lock:
+            update, self._pending = self._pending, None
+        return update
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1.0)
+            self._thread = None
+        logger.info(f"配置热更新线程已停止: reloads={self.reloads}, failures={self.failures}")
+
+    @classmethod
+    def from_config(cls, config, languages=()):
+        """由 config.ini 的 [HotReload] 段构建；enabled = false 时返回 None。"""
+        if not config.getboolean("HotReload", "enabled", fallback=True):
+            return None
+        return cls(interval=config.getfloat("HotReload", "interval", fallback=1.0), languages=languages)
@@ -0,0 +1,89 @@
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IdleGate:
+    """无手时的空闲模式：降低推理频率，用低分辨率帧差检测运动来提前唤醒。
+
+    连续 idle_after_frames 帧没有检测到手后进入空闲模式；空闲时只每 idle_interval 帧做一次完整推理，
+    或在缩小后的灰度帧差超过阈值（有运动）时立即推理。检测到手后马上恢复逐帧推理。
+    """
+
+    def __init__(self, idle_after_frames=30, idle_interval=10, motion_threshold=12, motion_min_fraction=0.005,
+                 motion_size=(64, 36)):
+        self.idle_after_frames = idle_after_frames
+        self.idle_interval = max(1, idle_interval)
+        self.motion_threshold = motion_threshold  # 单个像素灰度变化阈值 (0-255)
+        self.motion_min_fraction = motion_min_fraction  # 变化像素占比超过该值视为有运动
+        self.motion_size = motion_size
+        self._no_hand_frames = 0
+        self._frames_since_inference = 0
+        self._prev_small = None
+        self._small = None
+        self._gray = None
+        self.idle = False
+        self.frames_total = 0
+        self.frames_skipped = 0
+        self.idle_entries = 0
+        self.motion_wakeups = 0
+
+    def _motion(self, frame_bgr):
+        self._small = cv2.resize(frame_bgr, self.motion_size, dst=self._small, interpolation=cv2.INTER_AREA)
+        self._gray = cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        prev, self._prev_small = self._prev_small, self._gray.copy()
+        if prev is None:
+            return False
+        changed = np.count_nonzero(cv2.absdiff(self._gray, prev) > self.motion_threshold)
+        return changed >= self.motion_min_fraction * self._gray.size
+
+    def should_infer(self, frame_bgr):
+        """返回本帧是否需要做完整的手部推理。"""
+        self.frames_total += 1
+        if not self.idle:
+            return True
+        self._frames_since_inference += 1
+        if self._motion(frame_bgr):
+            self.motion_wakeups += 1
+            return True
+        if self._frames_since_inference >= self.idle_interval:
+            return True
+        self.frames_skipped += 1
+        return False
+
+    def observe(self, hand_present):
+        """在每次完整推理后调用，更新空闲状态。"""
+        self._frames_since_inference = 0
+        if hand_present:
+            self._no_hand_frames = 0
+            if self.idle:
+                self.idle = False
+                self._prev_small = None
+            return
+        self._no_hand_frames += 1
+        if not self.idle and self._no_hand_frames >= self.idle_after_frames:
+            self.idle = True
+            self.idle_entries += 1
+
+    def stats(self):
+        return {
+            "frames": self.frames_total,
+            "skipped": self.frames_skipped,
+            "idle_entries": self.idle_entries,
+            "motion_wakeups": self.motion_wakeups,
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        """由 config.ini 的 [Idle] 段构建；默认关闭，enabled = true 时才启用，否则返回 None。"""
+        if not config.getboolean("Idle", "enabled", fallback=False):
+            return None
+        return cls(
+            idle_after_frames=config.getint("Idle", "idle_after_frames", fallback=30),
+            idle_interval=config.getint("Idle", "idle_interval", fallback=10),
+            motion_threshold=config.getint("Idle", "motion_threshold", fallback=12),
+            motion_min_fraction=config.getfloat("Idle", "motion_min_fraction", fallback=0.005),
+        )
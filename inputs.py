@@ -0,0 +1,319 @@
+"""输入注入后端。
+
+动作对象（actions.py）与连续控制（pointer.py）只调用这里的统一接口，具体实现由 config.ini 的 [Input] backend 选择：
+  - pyautogui：跨平台，默认；每次调用带 fail-safe 检查，pyautogui_pause = true 时还会在调用后 sleep PAUSE 秒；
+  - pynput：直接使用 pynput.keyboard/mouse.Controller（依赖中已有，导入比 pyautogui 轻），无额外停顿；
+  - uinput：Linux 下直接向 /dev/uinput 写内核输入事件，每个动作一次 write 系统调用，需要对 /dev/uinput 有写权限；
+  - null：不注入任何输入，只记录调用，用于测试和基准测试。
+
+滚动量的单位与 actions.SCROLL_STEP 一致（120 为一格）：pyautogui 后端原样传入，其余后端换算为格数，不足一格的部分累积到下次。
+"""
+import logging
+import os
+import struct
+import time
+from collections import deque
+
+from actions import SCROLL_STEP
+
+logger = logging.getLogger(__name__)
+
+# 按键名统一为 pyautogui 风格的小写名称；配置界面通过 pynput 捕获的名称（page_up、media_play_pause 等）在这里对应过来
+KEY_ALIASES = {
+    "page_up": "pageup", "page_down": "pagedown", "caps_lock": "capslock", "num_lock": "numlock",
+    "scroll_lock": "scrolllock", "print_screen": "printscreen", "escape": "esc", "return": "enter",
+    "control": "ctrl", "del": "delete", "cmd": "win", "super": "win", "meta": "win",
+    "media_play_pause": "playpause", "media_volume_up": "volumeup", "media_volume_down": "volumedown",
+    "media_volume_mute": "volumemute", "media_next": "nexttrack", "media_previous": "prevtrack",
+}
+
+
+def normalize_key(name):
+    name = name.lower() if len(name) > 1 else name
+    return KEY_ALIASES.get(name, name)
+
+
+class InputBackend:
+    """输入注入接口。press/click 有基于 key_down/key_up 的默认实现，子类可以改为一次批量注入。"""
+
+    name = "base"
+
+    def key_down(self, key):
+        raise NotImplementedError
+
+    def key_up(self, key):
+        raise NotImplementedError
+
+    def press(self, key, presses=1):
+        for _ in range(presses):
+            self.key_down(key)
+            self.key_up(key)
+
+    def click(self, button, clicks=1):
+        raise NotImplementedError
+
+    def scroll(self, amount):
+        """amount > 0 向上滚动，单位见模块说明。"""
+        raise NotImplementedError
+
+    def move_rel(self, dx, dy):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    name = "pyautogui"
+
+    def __init__(self, pause=True):
+        import pyautogui
+        self._pyautogui = pyautogui
+        self.pause = pause  # False 时传入 _pause=False，跳过每次调用后的 PAUSE 停顿
+
+    def key_down(self, key):
+        self._pyautogui.keyDown(normalize_key(key), _pause=self.pause)
+
+    def key_up(self, key):
+        self._pyautogui.keyUp(normalize_key(key), _pause=self.pause)
+
+    def press(self, key, presses=1):
+        self._pyautogui.press(normalize_key(key), presses=presses, _pause=self.pause)
+
+    def click(self, button, clicks=1):
+        self._pyautogui.click(button=button, clicks=clicks, _pause=self.pause)
+
+    def scroll(self, amount):
+        self._pyautogui.scroll(amount, _pause=self.pause)
+
+    def move_rel(self, dx, dy):
+        self._pyautogui.moveRel(dx, dy, _pause=self.pause)
+
+
+class _WheelAccumulator:
+    """把滚动单位换算为整数格，余数留到下一次。"""
+
+    def __init__(self):
+        self.remainder = 0
+
+    def steps(self, amount):
+        total = self.remainder + amount
+        steps = int(total / SCROLL_STEP)
+        self.remainder = total - steps * SCROLL_STEP
+        return steps
+
+
+class PynputBackend(InputBackend):
+    name = "pynput"
+
+    # 规范名 -> pynput.keyboard.Key 的属性名（同名的不必列出）
+    KEY_NAMES = {
+        "pageup": "page_up", "pagedown": "page_down", "capslock": "caps_lock", "numlock": "num_lock",
+        "scrolllock": "scroll_lock", "printscreen": "print_screen", "win": "cmd",
+        "playpause": "media_play_pause", "volumeup": "media_volume_up", "volumedown": "media_volume_down",
+        "volumemute": "media_volume_mute", "nexttrack": "media_next", "prevtrack": "media_previous",
+    }
+
+    def __init__(self):
+        from pynput import keyboard, mouse
+        self._keyboard = keyboard.Controller()
+        self._mouse = mouse.Controller()
+        self._key_type = keyboard.Key
+        self._key_code = keyboard.KeyCode
+        self._buttons = {"left": mouse.Button.left, "right": mouse.Button.right, "middle": mouse.Button.middle}
+        self._keys = {}  # 按键名 -> pynput 按键对象的缓存
+        self._wheel = _WheelAccumulator()
+
+    def _key(self, name):
+        key = self._keys.get(name)
+        if key is None:
+            canonical = normalize_key(name)
+            if len(canonical) == 1:
+                key = self._key_code.from_char(canonical)
+            else:
+                key = getattr(self._key_type, self.KEY_NAMES.get(canonical, canonical), None)
+                if key is None:
+                    raise ValueError(f"pynput 不支持的按键: {name}")
+            self._keys[name] = key
+        return key
+
+    def key_down(self, key):
+        self._keyboard.press(self._key(key))
+
+    def key_up(self, key):
+        self._keyboard.release(self._key(key))
+
+    def click(self, button, clicks=1):
+        self._mouse.click(self._buttons[button], clicks)
+
+    def scroll(self, amount):
+        steps = self._wheel.steps(amount)
+        if steps:
+            self._mouse.scroll(0, steps)
+
+    def move_rel(self, dx, dy):
+        self._mouse.move(dx, dy)
+
+
+# --- Linux uinput ---
+# 常量取自 <linux/input-event-codes.h> 与 <linux/uinput.h>
+EV_SYN, EV_KEY, EV_REL = 0x00, 0x01, 0x02
+SYN_REPORT = 0
+REL_X, REL_Y, REL_WHEEL = 0x00, 0x01, 0x08
+BTN_CODES = {"left": 0x110, "right": 0x111, "middle": 0x112}
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_SET_RELBIT = 0x40045566
+UI_DEV_SETUP = 0x405C5503
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+BUS_USB = 0x03
+
+_INPUT_EVENT = struct.Struct("llHHi")  # struct input_event: timeval(秒, 微秒), type, code, value；时间由内核填写
+
+UINPUT_KEY_CODES = {
+    "esc": 1, "-": 12, "=": 13, "backspace": 14, "tab": 15, "[": 26, "]": 27, "enter": 28, "ctrl": 29,
+    ";": 39, "'": 40, "`": 41, "shift": 42, "\\": 43, ",": 51, ".": 52, "/": 53, "alt": 56, "space": 57,
+    "capslock": 58, "numlock": 69, "scrolllock": 70, "f11": 87, "f12": 88, "printscreen": 99, "home": 102,
+    "up": 103, "pageup": 104, "left": 105, "right": 106, "end": 107, "down": 108, "pagedown": 109,
+    "insert": 110, "delete": 111, "volumemute": 113, "volumedown": 114, "volumeup": 115, "pause": 119,
+    "win": 125, "menu": 127, "nexttrack": 163, "playpause": 164, "prevtrack": 165, "stop": 166,
+}
+UINPUT_KEY_CODES.update({str(d): 2 + (d - 1) % 10 for d in range(10)})  # 1..9 -> 2..10, 0 -> 11
+UINPUT_KEY_CODES.update({f"f{i}": 58 + i for i in range(1, 11)})  # F1..F10 -> 59..68
+for _row, _first in (("qwertyuiop", 16), ("asdfghjkl", 30), ("zxcvbnm", 44)):
+    UINPUT_KEY_CODES.update({ch: _first + i for i, ch in enumerate(_row)})
+# 需要按住 Shift 输入的字符 -> 对应的未上档字符
+UINPUT_SHIFTED = dict(zip('!@#$%^&*()_+{}:"~|<>?', "1234567890-=[];'`\\,./"))
+
+
+class UinputBackend(InputBackend):
+    """通过 /dev/uinput 创建一个虚拟键盘+鼠标设备并直接写入事件（不依赖 python-evdev）。
+
+    一个动作的所有事件（含 SYN_REPORT）打包成一次 write。设备创建后桌面环境需要一小段时间识别，
+    因此构造函数会等待 settle 秒；建议在后台预热阶段创建。
+    """
+
+    name = "uinput"
+
+    def __init__(self, path="/dev/uinput", device_name="gesture-control", settle=0.2):
+        import fcntl
+        self._ioctl = fcntl.ioctl
+        self._fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            self._ioctl(self._fd, UI_SET_EVBIT, EV_KEY)
+            self._ioctl(self._fd, UI_SET_EVBIT, EV_REL)
+            self._ioctl(self._fd, UI_SET_EVBIT, EV_SYN)
+            for code in sorted(set(UINPUT_KEY_CODES.values()) | set(BTN_CODES.values())):
+                self._ioctl(self._fd, UI_SET_KEYBIT, code)
+            for code in (REL_X, REL_Y, REL_WHEEL):
+                self._ioctl(self._fd, UI_SET_RELBIT, code)
+            # struct uinput_setup: input_id(bustype, vendor, product, version), name[80], ff_effects_max
+            setup = struct.pack("HHHH80sI", BUS_USB, 0x1209, 0x0001, 1, device_name.encode()[:79], 0)
+            self._ioctl(self._fd, UI_DEV_SETUP, setup)
+            self._ioctl(self._fd, UI_DEV_CREATE)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._wheel = _WheelAccumulator()
+        if settle > 0:
+            time.sleep(settle)
+
+    def _write(self, events):
+        """events: [(type, code, value), ...]，每组之后由调用方放入 SYN_REPORT。"""
+        os.write(self._fd, b"".join(_INPUT_EVENT.pack(0, 0, t, c, v) for t, c, v in events))
+
+    @staticmethod
+    def _key_events(name, value):
+        canonical = normalize_key(name)
+        if len(canonical) == 1 and (canonical.isupper() or canonical in UINPUT_SHIFTED):
+            base = UINPUT_KEY_CODES[UINPUT_SHIFTED.get(canonical, canonical.lower())]
+            shift = UINPUT_KEY_CODES["shift"]
+            return [(EV_KEY, shift, 1), (EV_KEY, base, 1)] if value else [(EV_KEY, base, 0), (EV_KEY, shift, 0)]
+        code = UINPUT_KEY_CODES.get(canonical)
+        if code is None:
+            raise ValueError(f"uinput 不支持的按键: {name}")
+        return [(EV_KEY, code, value)]
+
+    def key_down(self, key):
+        self._write(self._key_events(key, 1) + [(EV_SYN, SYN_REPORT, 0)])
+
+    def key_up(self, key):
+        self._write(self._key_events(key, 0) + [(EV_SYN, SYN_REPORT, 0)])
+
+    def press(self, key, presses=1):
+        down = self._key_events(key, 1) + [(EV_SYN, SYN_REPORT, 0)]
+        up = self._key_events(key, 0) + [(EV_SYN, SYN_REPORT, 0)]
+        self._write((down + up) * presses)
+
+    def click(self, button, clicks=1):
+        code = BTN_CODES[button]
+        self._write([(EV_KEY, code, 1), (EV_SYN, SYN_REPORT, 0), (EV_KEY, code, 0), (EV_SYN, SYN_REPORT, 0)] * clicks)
+
+    def scroll(self, amount):
+        steps = self._wheel.steps(amount)
+        if steps:
+            self._write([(EV_REL, REL_WHEEL, steps), (EV_SYN, SYN_REPORT, 0)])
+
+    def move_rel(self, dx, dy):
+        self._write([(EV_REL, REL_X, dx), (EV_REL, REL_Y, dy), (EV_SYN, SYN_REPORT, 0)])
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                self._ioctl(self._fd, UI_DEV_DESTROY)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+
+
+class RecordingBackend(InputBackend):
+    """不注入输入，只把调用记录为 (方法名, 参数...) 元组，保留最近 max_events 条。"""
+
+    name = "null"
+
+    def __init__(self, max_events=10000):
+        self.events = deque(maxlen=max_events)
+
+    def key_down(self, key):
+        self.events.append(("key_down", key))
+
+    def key_up(self, key):
+        self.events.append(("key_up", key))
+
+    def press(self, key, presses=1):
+        self.events.append(("press", key, presses))
+
+    def click(self, button, clicks=1):
+        self.events.append(("click", button, clicks))
+
+    def scroll(self, amount):
+        self.events.append(("scroll", amount))
+
+    def move_rel(self, dx, dy):
+        self.events.append(("move_rel", dx, dy))
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "pynput": PynputBackend,
+    "uinput": UinputBackend,
+    "null": RecordingBackend,
+}
+
+
+def create_input_backend(config):
+    """按 config.ini 的 [Input] 段创建输入后端；所选后端不可用时（缺少依赖、无 /dev/uinput 权限等）回退到 pyautogui。"""
+    name = config.get("Input", "backend", fallback="pyautogui").strip().lower()
+    if name not in BACKENDS:
+        logger.warning(f"未知的输入后端 {name}，改用 pyautogui")
+        name = "pyautogui"
+    if name != "pyautogui":
+        try:
+            if name == "uinput":
+                return UinputBackend(config.get("Input", "uinput_path", fallback="/dev/uinput"))
+            return BACKENDS[name]()
+        except Exception as e:
+            print(f"输入后端 {name} 不可用，改用 pyautogui: {e}")
+            logger.error(f"输入后端 {name} 不可用，改用 pyautogui: {e}", exc_info=True)
+    return PyAutoGUIBackend(pause=config.getboolean("Input", "pyautogui_pause", fallback=True))
@@ -0,0 +1,129 @@
+"""基于 NumPy 数组的手部关键点表示与手指计数。
+
+每帧只从 multi_hand_landmarks 构建一次 float32 数组 (n_hands, 21, 3)，
+绘制、计数、日志等下游环节共用该数组，不再逐个访问 protobuf 字段。
+逐帧计数（每帧 1~2 只手）用标量的 count_fingers_hands：数据量太小，NumPy 每次调用的固定开销反而更慢；
+向量化的 count_fingers_array / finger_states 用于多帧批量处理（离线时间线、录制回放、基准测试）和滞回判定。
+"""
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+# 手的左右编码：与 MediaPipe 的 handedness 标签 "Left"/"Right" 对应
+HAND_LEFT = 1
+HAND_RIGHT = -1
+HAND_UNKNOWN = 0
+_LABEL_CODES = {"Left": HAND_LEFT, "Right": HAND_RIGHT}
+_MIRRORED_LABELS = {"Left": "Right", "Right": "Left"}
+
+# 四指 (食指、中指、无名指、小指) 的 MCP / TIP 索引
+_FINGER_MCP = np.array([5, 9, 13, 17])
+_FINGER_TIP = np.array([8, 12, 16, 20])
+
+# 与 mediapipe.solutions.hands.HAND_CONNECTIONS 相同的骨架连线
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+
+def landmarks_to_array(multi_hand_landmarks, out=None):
+    """把 MediaPipe 的 multi_hand_landmarks 转为 float32 数组 (n_hands, 21, 3)。"""
+    if not multi_hand_landmarks:
+        return np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    n_hands = len(multi_hand_landmarks)
+    values = [(lm.x, lm.y, lm.z) for hand in multi_hand_landmarks for lm in hand.landmark]
+    if out is None or out.shape[0] < n_hands:
+        return np.array(values, dtype=np.float32).reshape(n_hands, NUM_LANDMARKS, 3)
+    out = out[:n_hands]
+    out.reshape(-1, 3)[:] = values
+    return out
+
+
+def handedness_labels(multi_handedness, n_hands):
+    """返回每只手的 "Left"/"Right"/"Unknown" 标签列表。"""
+    labels = ["Unknown"] * n_hands
+    if multi_handedness:
+        for h, info in enumerate(multi_handedness[:n_hands]):
+            labels[h] = info.classification[0].label
+    return labels
+
+
+def mirror_hands(hands_xyz, labels):
+    """在关键点空间做水平镜像：x -> 1 - x（原地修改），并交换左右手标签。
+
+    MediaPipe 的左右手判断假定输入是镜像（自拍）画面，对未翻转的帧推理时标签正好相反，
+    镜像 x 并交换标签后与先翻转整帧再推理的结果一致，拇指判断无需改动。
+    """
+    np.subtract(1.0, hands_xyz[..., 0], out=hands_xyz[..., 0])
+    return [_MIRRORED_LABELS.get(label, label) for label in labels]
+
+
+def handedness_codes(labels):
+    """标签列表 -> int8 编码数组 (HAND_LEFT / HAND_RIGHT / HAND_UNKNOWN)。"""
+    return np.array([_LABEL_CODES.get(label, HAND_UNKNOWN) for label in labels], dtype=np.int8)
+
+
+def finger_measures(hands_xyz, codes):
+    """每根手指的判定量与阈值：伸出当且仅当 value > thresh。返回两个 float64 数组 (..., 5)。
+
+    依次为拇指、食指、中指、无名指、小指；阈值与 count_fingers_hands 完全一致。
+    """
+    pts = np.asarray(hands_xyz, dtype=np.float64)  # 用 float64 计算，保证与逐点的 Python 浮点结果一致
+    x = pts[..., 0]
+    y = pts[..., 1]
+    values = np.empty(pts.shape[:-2] + (5,), dtype=np.float64)
+    thresh = np.empty_like(values)
+
+    # 垂直阈值：手腕(0)到中指指根(9)的 Y 距离 / 2.8
+    np.subtract(y[..., _FINGER_MCP], y[..., _FINGER_TIP], out=values[..., 1:])
+    thresh[..., 1:] = (np.abs(y[..., 0] - y[..., 9]) / 2.8)[..., None]
+
+    # 拇指：食指指根(5)到小指指根(17)的 X 距离的 30%。
+    # 左手要求 x4 - x2 > 阈值，右手要求 x2 - x4 > 阈值，乘以编码 (+1/-1) 统一成一次比较；
+    # 未知手编码为 0，乘积为 0 不会大于非负阈值，因此不计拇指。
+    values[..., 0] = (x[..., 4] - x[..., 2]) * codes
+    thresh[..., 0] = np.abs(x[..., 5] - x[..., 17]) * 0.3
+    return values, thresh
+
+
+def finger_states(hands_xyz, codes, prev_states=None, hysteresis=0.0):
+    """向量化判断每根手指是否伸出。
+
+    hands_xyz: (..., 21, 3)，可以是一帧内的多只手 (n_hands, 21, 3)，也可以是多帧批量 (n_frames, n_hands, 21, 3)。
+    codes: 与 hands_xyz 前导维度相同的左右手编码。
+    返回布尔数组 (..., 5)，依次为拇指、食指、中指、无名指、小指。阈值与 count_fingers_hands 完全一致。
+    给出 prev_states 与 hysteresis 时使用滞回阈值：上一帧已伸出的手指降到 thresh * (1 - hysteresis) 以下才算收起，
+    未伸出的手指要超过 thresh * (1 + hysteresis) 才算伸出，阈值附近的抖动不会让计数来回跳动。
+    """
+    values, thresh = finger_measures(hands_xyz, codes)
+    if prev_states is not None and hysteresis:
+        thresh = thresh * np.where(prev_states, 1.0 - hysteresis, 1.0 + hysteresis)
+    return values > thresh
+
+
+def count_fingers_array(hands_xyz, codes):
+    """向量化手指计数，返回 int 数组，形状为 hands_xyz 的前导维度。"""
+    return finger_states(hands_xyz, codes).sum(axis=-1)
+
+
+def count_fingers_hands(hands_xyz, codes):
+    """逐帧路径的标量手指计数，返回 int 列表；结果与 count_fingers_array 完全一致（同样按 float64 比较）。"""
+    counts = []
+    for pts, code in zip(hands_xyz.tolist(), codes.tolist()):
+        vertical_thresh = abs(pts[0][1] - pts[9][1]) / 2.8
+        cnt = ((pts[5][1] - pts[8][1] > vertical_thresh) + (pts[9][1] - pts[12][1] > vertical_thresh)
+               + (pts[13][1] - pts[16][1] > vertical_thresh) + (pts[17][1] - pts[20][1] > vertical_thresh))
+        if code and (pts[4][0] - pts[2][0]) * code > abs(pts[5][0] - pts[17][0]) * 0.3:
+            cnt += 1
+        counts.append(cnt)
+    return counts
+
+
+def to_pixels(hands_xyz, width, height):
+    """归一化坐标 -> 像素坐标 int32 数组 (..., 21, 2)。"""
+    pts = np.asarray(hands_xyz)[..., :2] * (width, height)
+    return pts.astype(np.int32)
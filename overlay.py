@@ -0,0 +1,117 @@
+import logging
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import ImageFont, ImageDraw, Image
+
+from landmarks import HAND_CONNECTIONS, to_pixels
+
+logger = logging.getLogger(__name__)
+
+
+class TextOverlayRenderer:
+    """带缓存的文字叠加渲染器。
+
+    字体按字号缓存；每段文字按 (text, size, color) 预渲染成 BGRA 小图块（以预乘 alpha 的 BGR 与 1-alpha 两部分缓存），
+    绘制时只在文字所在的 ROI 内做 alpha 混合，不再整帧 BGR→RGB→PIL→BGR 来回转换。
+    color 与旧的 draw_chinese_text 一致，按 RGB 顺序解释。
+    """
+
+    def __init__(self, font_paths=("./fonts/simhei.ttf", "arial.ttf"), max_sprites=256, notify=None):
+        self.font_paths = list(font_paths)
+        self.max_sprites = max_sprites
+        self.notify = notify  # notify(event) 在首次出现 "font_fallback" / "font_missing" 时调用一次
+        self._fonts = {}  # size -> ImageFont 或 None（字体缺失）
+        self._sprites = OrderedDict()  # (text, size, color) -> (dx, dy, premultiplied_bgr, inv_alpha)
+        self._notified = set()
+
+    def _notify_once(self, event):
+        if event in self._notified:
+            return
+        self._notified.add(event)
+        logger.error(event)
+        if self.notify:
+            self.notify(event)
+
+    def get_font(self, size):
+        if size in self._fonts:
+            return self._fonts[size]
+        font = None
+        for idx, path in enumerate(self.font_paths):
+            try:
+                font = ImageFont.truetype(path, size)
+            except IOError:
+                continue
+            if idx > 0:
+                self._notify_once("font_fallback")
+            break
+        if font is None:
+            self._notify_once("font_missing")
+        self._fonts[size] = font
+        return font
+
+    def _render_sprite(self, text, size, color):
+        font = self.get_font(size)
+        if font is None:
+            return None
+        left, top, right, bottom = font.getbbox(text)
+        width, height = max(1, right - left), max(1, bottom - top)
+        sprite = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        ImageDraw.Draw(sprite).text((-left, -top), text, font=font, fill=tuple(color) + (255,))
+        rgba = np.asarray(sprite, dtype=np.float32)
+        alpha = rgba[:, :, 3:4] / 255.0
+        premultiplied_bgr = rgba[:, :, 2::-1] * alpha  # RGBA -> BGR 并预乘 alpha
+        return left, top, premultiplied_bgr, 1.0 - alpha
+
+    def get_sprite(self, text, size, color):
+        key = (text, size, tuple(color))
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            return sprite
+        sprite = self._render_sprite(text, size, color)
+        if sprite is None:
+            return None
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def draw(self, img, text, pos, font_size=30, color=(255, 0, 0)):
+        """把文字原地混合到 BGR 图像 img 上。字体缺失时返回 False。"""
+        if not text:
+            return True
+        sprite = self.get_sprite(text, font_size, color)
+        if sprite is None:
+            return False
+        dx, dy, premultiplied_bgr, inv_alpha = sprite
+        x0, y0 = pos[0] + dx, pos[1] + dy
+        h, w = inv_alpha.shape[:2]
+        # 裁剪到画面范围内
+        fx0, fy0 = max(x0, 0), max(y0, 0)
+        fx1, fy1 = min(x0 + w, img.shape[1]), min(y0 + h, img.shape[0])
+        if fx0 >= fx1 or fy0 >= fy1:
+            return True
+        sx0, sy0 = fx0 - x0, fy0 - y0
+        sx1, sy1 = sx0 + (fx1 - fx0), sy0 + (fy1 - fy0)
+        roi = img[fy0:fy1, fx0:fx1]
+        blended = roi * inv_alpha[sy0:sy1, sx0:sx1] + premultiplied_bgr[sy0:sy1, sx0:sx1]
+        np.clip(blended, 0, 255, out=blended)
+        roi[:] = blended.astype(np.uint8)
+        return True
+
+
+def draw_hand_landmarks(img, hands_xyz, point_color=(0, 0, 255), line_color=(224, 224, 224), thickness=2, radius=2):
+    """按 mediapipe drawing_utils 的默认样式绘制关键点与骨架，直接使用 (n_hands, 21, 3) 数组。"""
+    if len(hands_xyz) == 0:
+        return img
+    h, w = img.shape[:2]
+    for pts in to_pixels(hands_xyz, w, h).tolist():
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(img, tuple(pts[a]), tuple(pts[b]), line_color, thickness)
+        for p in pts:
+            center = tuple(p)
+            cv2.circle(img, center, radius + 1, (224, 224, 224), thickness)
+            cv2.circle(img, center, radius, point_color, thickness)
+    return img
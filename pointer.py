@@ -0,0 +1,238 @@
+"""连续控制模式：绑定为 {"type": "pointer", "value": "move" | "scroll"} 的手势确认后，
+手掌相对确认时位置的偏移量决定光标移动 / 滚轮滚动的速度（类似摇杆），逐帧更新。
+
+- 预测平滑：手掌中心经过 alpha-beta 滤波得到位置和速度，并按帧龄 + lead_ms 外推，抵消检测延迟；
+- 高频输出：检测循环只写入最新的目标速度（不排队），输出线程以 rate_hz 的频率积分速度，
+  每个周期最多调用一次 move_rel / scroll（输入后端见 inputs.py；pyautogui 后端这里总是跳过每次调用后的 PAUSE 停顿）。
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+from inputs import PyAutoGUIBackend
+
+logger = logging.getLogger(__name__)
+
+PALM_LANDMARKS = (0, 5, 9, 13, 17)  # 手腕与四个指根，手指姿势变化时位置基本不变
+
+
+def palm_center(hand_xyz, aspect=1.0):
+    """(21, 3) 关键点 -> 手掌中心 (x, y)，x 乘以画面宽高比，使横向与纵向的位移单位一致。"""
+    center = hand_xyz[PALM_LANDMARKS, :2].mean(axis=0).astype(np.float64)
+    center[0] *= aspect
+    return center
+
+
+class AlphaBetaPredictor:
+    """alpha-beta 滤波：平滑位置、估计速度，并预测 lead 秒之后的位置。"""
+
+    def __init__(self, alpha=0.5, beta=0.1):
+        self.alpha = alpha
+        self.beta = beta
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.v = None
+        self.t = None
+
+    def update(self, z, t):
+        z = np.asarray(z, dtype=np.float64)
+        if self.x is None or t <= self.t:
+            self.x, self.v, self.t = z.copy(), np.zeros_like(z), t
+            return self.x
+        dt = t - self.t
+        self.t = t
+        predicted = self.x + self.v * dt
+        residual = z - predicted
+        self.x = predicted + self.alpha * residual
+        self.v = self.v + (self.beta / dt) * residual
+        return self.x
+
+    def predict(self, lead):
+        return self.x + self.v * lead
+
+
+class PointerOutput:
+    """高频输出线程：按最新的目标速度积分，把小数部分累积到下一周期，只输出整数像素 / 滚动单位。
+
+    set_velocity() 只替换目标速度（天然合并），超过 stale_after 秒没有更新时速度视为 0，
+    检测卡顿或线程异常时光标不会一直漂移。速度为 0 时线程休眠，不会空转。
+    """
+
+    def __init__(self, backend, rate_hz=120.0, stale_after=0.25):
+        self.backend = backend
+        self.period = 1.0 / rate_hz
+        self.stale_after = stale_after
+        self._velocity = (0.0, 0.0, 0.0)  # (x 像素/秒, y 像素/秒, 滚动单位/秒)
+        self._updated = 0.0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._remainder = np.zeros(3)
+        self.ticks = 0
+        self.moves = 0
+        self.scrolls = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="PointerOutput", daemon=True)
+            self._thread.start()
+        return self
+
+    def set_velocity(self, vx=0.0, vy=0.0, vscroll=0.0):
+        with self._cond:
+            self._velocity = (vx, vy, vscroll)
+            self._updated = time.monotonic()
+            if vx or vy or vscroll:
+                self._cond.notify()
+
+    def _active(self):
+        return any(self._velocity) and time.monotonic() - self._updated <= self.stale_after
+
+    def _run(self):
+        last = time.monotonic()
+        while True:
+            with self._cond:
+                while self._running and not self._active():
+                    self._remainder[:] = 0.0
+                    self._cond.wait(self.stale_after)
+                    last = time.monotonic()
+                if not self._running:
+                    break
+                velocity = self._velocity
+            deadline = last + self.period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.monotonic()
+            self._remainder += np.asarray(velocity) * (now - last)
+            last = now
+            steps = np.trunc(self._remainder)
+            self._remainder -= steps
+            dx, dy, dscroll = (int(s) for s in steps)
+            self.ticks += 1
+            try:
+                if dx or dy:
+                    self.backend.move_rel(dx, dy)
+                    self.moves += 1
+                if dscroll:
+                    self.backend.scroll(dscroll)
+                    self.scrolls += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"连续控制输出出错: {e}")
+                self.set_velocity()
+
+    def stats(self):
+        return {"ticks": self.ticks, "moves": self.moves, "scrolls": self.scrolls, "errors": self.errors}
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info(f"连续控制输出线程已停止: {self.stats()}")
+
+
+class ContinuousController:
+    """把一只手的位置换算为光标 / 滚轮速度，交给 PointerOutput 输出。
+
+    engage() 在绑定了 pointer 动作的手势被确认时调用，以当时的手掌位置为原点；之后每帧 update()，
+    偏移量超过 deadzone 的部分乘以增益得到速度。手势变化时 mismatch() 计数，连续 release_frames 帧
+    不一致（或手离开画面）才释放，单帧误判不会打断控制。
+    """
+
+    def __init__(self, output, pointer_gain=3000.0, scroll_gain=6000.0, deadzone=0.03,
+                 alpha=0.5, beta=0.1, lead_ms=30.0, release_frames=3):
+        self.output = output
+        self.pointer_gain = pointer_gain  # 偏移 1.0（一个画面高度）对应的光标速度，像素/秒
+        self.scroll_gain = scroll_gain  # 偏移 1.0 对应的滚动速度，滚动单位/秒 (每格 actions.SCROLL_STEP)
+        self.deadzone = deadzone
+        self.lead = lead_ms / 1000.0
+        self.release_frames = release_frames
+        self.predictor = AlphaBetaPredictor(alpha, beta)
+        self.key = None  # 当前控制的手势（手指数或模板手势名），None 表示未接管
+        self.mode = None
+        self.anchor = None
+        self._mismatches = 0
+
+    @property
+    def engaged(self):
+        return self.key is not None
+
+    def engage(self, key, plan):
+        if self.key == key:
+            return
+        self.output.start()
+        self.key, self.mode = key, plan.mode
+        self.anchor = None
+        self._mismatches = 0
+        self.predictor.reset()
+        logger.info(f"连续控制开始: {key} -> {plan.source}")
+
+    def update(self, point, frame_time, now=None):
+        """输入本帧的手掌中心；frame_time 为采集时间戳 (time.monotonic())，用于外推到当前时刻。"""
+        if self.key is None:
+            return
+        self._mismatches = 0
+        now = time.monotonic() if now is None else now
+        self.predictor.update(point, frame_time)
+        lead = min(max(now - frame_time, 0.0) + self.lead, 0.2)
+        predicted = self.predictor.predict(lead) if self.anchor is not None else self.predictor.x
+        if self.anchor is None:
+            self.anchor = predicted.copy()
+        offset = predicted - self.anchor
+        distance = float(np.hypot(*offset))
+        if distance <= self.deadzone:
+            self.output.set_velocity()
+            return
+        offset *= (distance - self.deadzone) / distance
+        if self.mode == "scroll":
+            self.output.set_velocity(vscroll=-offset[1] * self.scroll_gain)  # 手向上 -> 向上滚动
+        else:
+            self.output.set_velocity(offset[0] * self.pointer_gain, offset[1] * self.pointer_gain)
+
+    def mismatch(self):
+        """本帧的手势不是正在控制的手势；连续 release_frames 帧后释放。"""
+        if self.key is None:
+            return
+        self._mismatches += 1
+        if self._mismatches >= self.release_frames:
+            self.release()
+
+    def release(self):
+        if self.key is None:
+            return
+        logger.info(f"连续控制结束: {self.key}")
+        self.key = self.mode = self.anchor = None
+        self.predictor.reset()
+        self.output.set_velocity()
+
+    def stop(self):
+        self.release()
+        self.output.stop()
+
+    @classmethod
+    def from_config(cls, config, backend):
+        """由 config.ini 的 [Pointer] 段构建；enabled = false 时返回 None（pointer 绑定被忽略）。"""
+        if not config.getboolean("Pointer", "enabled", fallback=True):
+            return None
+        if isinstance(backend, PyAutoGUIBackend) and backend.pause:
+            backend = PyAutoGUIBackend(pause=False)  # 高频输出不能承受每次调用后的 PAUSE 停顿
+        output = PointerOutput(backend, rate_hz=config.getfloat("Pointer", "rate_hz", fallback=120.0),
+                               stale_after=config.getfloat("Pointer", "stale_ms", fallback=250.0) / 1000.0)
+        return cls(output,
+                   pointer_gain=config.getfloat("Pointer", "pointer_gain", fallback=3000.0),
+                   scroll_gain=config.getfloat("Pointer", "scroll_gain", fallback=6000.0),
+                   deadzone=config.getfloat("Pointer", "deadzone", fallback=0.03),
+                   alpha=config.getfloat("Pointer", "alpha", fallback=0.5),
+                   beta=config.getfloat("Pointer", "beta", fallback=0.1),
+                   lead_ms=config.getfloat("Pointer", "lead_ms", fallback=30.0),
+                   release_frames=config.getint("Pointer", "release_frames", fallback=3))
@@ -0,0 +1,203 @@
+"""检测主循环的分阶段计时。
+
+StageProfiler 记录每个阶段的耗时，维护滚动窗口内的 p50/p95/p99 与 fps，可选在画面上显示 HUD、
+定期导出 JSON/CSV，并支持对接下来的 N 帧抓取一次 cProfile 快照。
+关闭时使用 NullProfiler，所有方法都是空操作，几乎没有开销。
+"""
+import cProfile
+import csv
+import io
+import json
+import logging
+import os
+import pstats
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("read", "flip", "cvtColor", "process", "count_fingers", "classify", "decision", "dispatch", "drawing",
+          "text_overlay", "display")
+
+
+class NullProfiler:
+    enabled = False
+    show_hud = False
+
+    def begin_frame(self):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def set_counters(self, counters):
+        pass
+
+    def request_cprofile(self, n_frames=None):
+        pass
+
+    def hud_lines(self):
+        return ()
+
+    def close(self):
+        pass
+
+
+class StageProfiler:
+    enabled = True
+
+    def __init__(self, window=300, show_hud=True, export_path=None, export_interval=10.0, cprofile_frames=100):
+        self.window = window
+        self.show_hud = show_hud
+        self.export_path = export_path  # 以 .csv 结尾时导出 CSV（追加），否则导出 JSON（覆盖）
+        self.export_interval = export_interval
+        self.cprofile_frames = cprofile_frames
+        self._samples = {stage: deque(maxlen=window) for stage in STAGES}
+        self._frame_times = deque(maxlen=window)  # 每帧总耗时
+        self._frame_ends = deque(maxlen=window)  # 每帧结束时刻，用于计算 fps
+        self._current = {}  # 本帧各阶段累计耗时，end_frame() 时写入滚动窗口
+        self.counters = {}  # 累计计数（例如 ROI / 整帧推理次数），随统计一起显示和导出
+        self._frame_start = 0.0
+        self._last = 0.0
+        self._next_export = time.monotonic() + export_interval
+        self._hud_cache = ()
+        self._hud_next_update = 0.0
+        self._cprofile = None
+        self._cprofile_remaining = 0
+        self._cprofile_pending = 0
+
+    # --- 计时 ---
+    def begin_frame(self):
+        if self._cprofile_pending and self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile_remaining, self._cprofile_pending = self._cprofile_pending, 0
+            self._cprofile.enable()
+        self._current.clear()
+        self._frame_start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        """把从上一个 mark（或帧开始）到现在的耗时累加到本帧的 stage 上；同一阶段可以在多处 mark。"""
+        now = time.perf_counter()
+        self._current[stage] = self._current.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def end_frame(self):
+        now = time.perf_counter()
+        for stage, elapsed in self._current.items():
+            self._samples[stage].append(elapsed)
+        self._current.clear()
+        self._frame_times.append(now - self._frame_start)
+        self._frame_ends.append(now)
+        if self._cprofile is not None:
+            self._cprofile_remaining -= 1
+            if self._cprofile_remaining <= 0:
+                self._finish_cprofile()
+        if self.export_path and time.monotonic() >= self._next_export:
+            self._next_export = time.monotonic() + self.export_interval
+            self.export()
+
+    def set_counters(self, counters):
+        """更新累计计数，例如检测器的 stats()。"""
+        self.counters.update(counters)
+
+    # --- 统计 ---
+    def fps(self):
+        if len(self._frame_ends) < 2:
+            return 0.0
+        span = self._frame_ends[-1] - self._frame_ends[0]
+        return (len(self._frame_ends) - 1) / span if span > 0 else 0.0
+
+    def summary(self):
+        """返回 {stage: {"p50_ms", "p95_ms", "p99_ms", "n"}}，另含 "frame" 总耗时与 "fps"。"""
+        result = {}
+        for stage, samples in list(self._samples.items()) + [("frame", self._frame_times)]:
+            if not samples:
+                continue
+            p50, p95, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 95, 99]) * 1000
+            result[stage] = {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3),
+                             "p99_ms": round(float(p99), 3), "n": len(samples)}
+        result["fps"] = round(self.fps(), 2)
+        if self.counters:
+            result["counters"] = dict(self.counters)
+        return result
+
+    def hud_lines(self):
+        """HUD 文本（每 0.5 秒刷新一次，避免每帧重新渲染文字）。"""
+        now = time.monotonic()
+        if now < self._hud_next_update:
+            return self._hud_cache
+        self._hud_next_update = now + 0.5
+        summary = self.summary()
+        lines = [f"fps {summary['fps']:.1f}"]
+        for stage in STAGES + ("frame",):
+            if stage in summary:
+                s = summary[stage]
+                lines.append(f"{stage:<13} {s['p50_ms']:6.2f} {s['p95_ms']:6.2f} {s['p99_ms']:6.2f} ms")
+        if self.counters:
+            lines.append(" ".join(f"{name} {value}" for name, value in self.counters.items()))
+        self._hud_cache = tuple(lines)
+        return self._hud_cache
+
+    # --- 导出 ---
+    def export(self, path=None):
+        path = path or self.export_path
+        summary = self.summary()
+        try:
+            if path.lower().endswith(".csv"):
+                new_file = not os.path.exists(path)
+                with open(path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    if new_file:
+                        writer.writerow(["time", "stage", "p50_ms", "p95_ms", "p99_ms", "n", "fps"])
+                    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                    for stage, s in summary.items():
+                        if stage not in ("fps", "counters"):
+                            writer.writerow([stamp, stage, s["p50_ms"], s["p95_ms"], s["p99_ms"], s["n"],
+                                             summary["fps"]])
+            else:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), **summary}, f, indent=2)
+        except OSError as e:
+            logger.error(f"导出性能统计失败: {e}")
+
+    # --- cProfile 快照 ---
+    def request_cprofile(self, n_frames=None):
+        """从下一帧开始对 n_frames 帧做 cProfile 采样，结束后写入 .prof 文件并在日志中记录热点函数。"""
+        if self._cprofile is None and not self._cprofile_pending:
+            self._cprofile_pending = n_frames or self.cprofile_frames
+            logger.info(f"开始抓取接下来 {self._cprofile_pending} 帧的 cProfile 快照")
+
+    def _finish_cprofile(self):
+        self._cprofile.disable()
+        path = time.strftime("profile_%Y%m%d_%H%M%S.prof")
+        self._cprofile.dump_stats(path)
+        stream = io.StringIO()
+        pstats.Stats(self._cprofile, stream=stream).sort_stats("cumulative").print_stats(20)
+        logger.info(f"cProfile 快照已保存到 {path}\n{stream.getvalue()}")
+        print(f"cProfile 快照已保存到 {path}")
+        self._cprofile = None
+
+    def close(self):
+        if self._cprofile is not None:
+            self._finish_cprofile()
+        if self.export_path:
+            self.export()
+        logger.info(f"分阶段耗时统计: {self.summary()}")
+
+
+def create_profiler(config, force=False):
+    """由 config.ini 的 [Profiler] 段构建；未启用时返回 NullProfiler。"""
+    if not (force or config.getboolean("Profiler", "enabled", fallback=False)):
+        return NullProfiler()
+    return StageProfiler(
+        window=config.getint("Profiler", "window", fallback=300),
+        show_hud=config.getboolean("Profiler", "hud", fallback=True),
+        export_path=config.get("Profiler", "export_path", fallback="") or None,
+        export_interval=config.getfloat("Profiler", "export_interval", fallback=10.0),
+        cprofile_frames=config.getint("Profiler", "cprofile_frames", fallback=100),
+    )
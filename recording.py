@@ -0,0 +1,336 @@
+"""关键点会话录制与回放。
+
+录制（检测循环中按 L 键、无界面模式下发送 SIGUSR2，或启动参数 --record）把检测器每帧的输出写入两个只追加的文件：
+  - <name>.lmk：原始 float32 关键点，每只手 21x3，只存出现的手；
+  - <name>.idx：64 字节文件头 + 每帧 16 字节的索引记录（时间戳、该帧第一只手在 .lmk 中的行号、手的数量、左右手编码）。
+两个文件按 grow_frames 帧为单位扩展（支持 posix_fallocate 的系统上同时预分配磁盘块，避免逐帧改变文件大小），
+数据每 flush_frames 帧组成一批，由后台写线程写入并更新文件头中的帧数，程序异常退出时最多丢失队列中尚未写入的几批。一小时 30 fps、始终有一只手的会话约 29 MB。
+
+回放用 np.memmap 映射文件，打开不需要读取数据；可以按原始节奏或最快速度把关键点交给手指计数和手势决策逻辑，
+不需要摄像头和 MediaPipe:
+    python recording.py replay recordings/session_20250520_101500 --realtime
+    python recording.py info recordings/session_20250520_101500
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GLMKIDX1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIddQ")  # magic, 版本, 每帧最多手数, 录制开始的墙钟时间, 画面宽高比, 已写入的帧数
+HEADER_SIZE = 64
+MAX_HANDS = 2
+INDEX_DTYPE = np.dtype([("t", "<f8"), ("first", "<u4"), ("n_hands", "u1"), ("codes", "i1", (MAX_HANDS,)),
+                        ("reserved", "u1")])  # 16 字节
+HAND_BYTES = NUM_LANDMARKS * 3 * 4
+
+
+class LandmarkRecorder:
+    """把每帧的 (时间戳, 关键点, 左右手编码) 追加写入 <path>.idx / <path>.lmk。
+
+    write() 只在调用线程中把数据复制进批缓冲区；每满 flush_frames 帧，整批交给有界队列，由后台写线程落盘，
+    磁盘慢时不会拖慢检测循环。队列满时整批丢弃并计数（与日志管线的 DroppingQueueHandler 相同），
+    回放时表现为时间戳上的一段空缺。
+    """
+
+    def __init__(self, path, aspect=1.0, grow_frames=9000, flush_frames=30, queue_batches=8):
+        self.path = path
+        self.aspect = aspect  # 画面宽高比，回放时模板分类的归一化需要
+        self.grow_frames = grow_frames
+        self.flush_frames = flush_frames
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 不带缓冲的二进制文件对象，按偏移量 seek + write（os.pwrite 在 Windows 上不存在）；只由写线程访问
+        self._index_file = open(path + ".idx", "w+b", buffering=0)
+        self._lmk_file = open(path + ".lmk", "w+b", buffering=0)
+        self.start_wall = time.time()
+        self._t0 = None
+        self.frames = 0  # 已写入文件的帧数（写线程更新）
+        self.hands = 0  # 已写入文件的手数（写线程更新）
+        self.dropped_frames = 0  # 因队列满被丢弃的帧数
+        self._queued_hands = 0  # 已交给写线程的手数，决定下一帧在 .lmk 中的行号
+        self._index_capacity = 0
+        self._lmk_capacity = 0
+        self._index_buf = np.zeros(flush_frames, dtype=INDEX_DTYPE)
+        self._lmk_buf = np.zeros((flush_frames * MAX_HANDS, NUM_LANDMARKS, 3), dtype=np.float32)
+        self._pending = 0
+        self._pending_hands = 0
+        self._write_header()
+        self._queue = queue.Queue(maxsize=queue_batches)
+        self._thread = threading.Thread(target=self._run, name="LandmarkRecorder", daemon=True)
+        self._thread.start()
+
+    def _write_header(self):
+        header = HEADER.pack(MAGIC, VERSION, MAX_HANDS, self.start_wall, self.aspect, self.frames)
+        self._write_at(self._index_file, header.ljust(HEADER_SIZE, b"\0"), 0)
+
+    @staticmethod
+    def _write_at(f, data, offset):
+        f.seek(offset)
+        f.write(data)
+
+    def write(self, t, hands_xyz, codes):
+        """记录一帧；t 为采集时间戳（秒，单调时钟），hands_xyz 为 (n, 21, 3)，超过 2 只手的部分忽略。"""
+        if self._t0 is None:
+            self._t0 = t
+        n = min(len(hands_xyz), MAX_HANDS)
+        row = self._index_buf[self._pending]
+        row["t"] = t - self._t0
+        row["first"] = self._queued_hands + self._pending_hands
+        row["n_hands"] = n
+        row["codes"] = 0
+        row["codes"][:n] = codes[:n]
+        if n:
+            self._lmk_buf[self._pending_hands:self._pending_hands + n] = hands_xyz[:n]
+            self._pending_hands += n
+        self._pending += 1
+        if self._pending >= self.flush_frames:
+            self.flush()
+
+    def flush(self, block=False):
+        """把缓冲区中的帧交给写线程；block 为 False 且队列已满时丢弃这一批。"""
+        if not self._pending:
+            return
+        batch = (self._index_buf[:self._pending].copy(), self._lmk_buf[:self._pending_hands].copy())
+        try:
+            self._queue.put(batch, block=block)
+            self._queued_hands += self._pending_hands
+        except queue.Full:
+            self.dropped_frames += self._pending
+        self._pending = self._pending_hands = 0
+
+    @staticmethod
+    def _grow(f, old_size, new_size):
+        """把文件扩展到 new_size；支持 posix_fallocate 的系统上同时分配磁盘块，否则只改变文件大小（稀疏文件）。"""
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), old_size, new_size - old_size)
+                return
+            except OSError:
+                pass  # 文件系统不支持时退回 truncate
+        f.truncate(new_size)
+
+    def _ensure_capacity(self, frames, hands):
+        if frames > self._index_capacity:
+            old = HEADER_SIZE + self._index_capacity * INDEX_DTYPE.itemsize
+            self._index_capacity = frames + self.grow_frames
+            self._grow(self._index_file, old, HEADER_SIZE + self._index_capacity * INDEX_DTYPE.itemsize)
+        if hands > self._lmk_capacity:
+            old = self._lmk_capacity * HAND_BYTES
+            self._lmk_capacity = hands + self.grow_frames
+            self._grow(self._lmk_file, old, self._lmk_capacity * HAND_BYTES)
+
+    def _write_batch(self, index_rows, hands_xyz):
+        self._ensure_capacity(self.frames + len(index_rows), self.hands + len(hands_xyz))
+        self._write_at(self._index_file, index_rows.tobytes(), HEADER_SIZE + self.frames * INDEX_DTYPE.itemsize)
+        if len(hands_xyz):
+            self._write_at(self._lmk_file, hands_xyz.tobytes(), self.hands * HAND_BYTES)
+        self.frames += len(index_rows)
+        self.hands += len(hands_xyz)
+        self._write_header()  # 数据写完后再更新帧数，读取方只会看到完整的帧
+
+    def _run(self):
+        failed = False
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if failed:
+                continue
+            try:
+                self._write_batch(*batch)
+            except OSError as e:
+                failed = True  # 磁盘已满等错误：记录一次，之后的数据全部丢弃
+                logger.error(f"关键点录制写入失败 {self.path}: {e}")
+
+    def close(self):
+        """写入剩余数据并把文件截断到实际大小。"""
+        if self._index_file is None:
+            return
+        self.flush(block=True)
+        self._queue.put(None)
+        self._thread.join()
+        self._index_file.truncate(HEADER_SIZE + self.frames * INDEX_DTYPE.itemsize)
+        self._lmk_file.truncate(self.hands * HAND_BYTES)
+        self._index_file.close()
+        self._lmk_file.close()
+        self._index_file = self._lmk_file = None
+        dropped = f", 队列满丢弃 {self.dropped_frames} 帧" if self.dropped_frames else ""
+        logger.info(f"关键点录制已保存 {self.path}: {self.frames} 帧, {self.hands} 只手{dropped}")
+
+    @classmethod
+    def start_session(cls, config, aspect=1.0):
+        """按 config.ini 的 [Recorder] 段在 directory 下新建一个以时间命名的会话。"""
+        directory = config.get("Recorder", "directory", fallback="recordings")
+        path = os.path.join(directory, time.strftime("session_%Y%m%d_%H%M%S"))
+        return cls(path, aspect, grow_frames=config.getint("Recorder", "grow_frames", fallback=9000),
+                   flush_frames=config.getint("Recorder", "flush_frames", fallback=30),
+                   queue_batches=config.getint("Recorder", "queue_batches", fallback=8))
+
+
+class LandmarkRecording:
+    """以内存映射方式打开一个录制会话（文件可以仍在录制中，只读取文件头记录的已完成帧）。"""
+
+    def __init__(self, path):
+        if path.endswith((".idx", ".lmk")):
+            path = path[:-4]
+        self.path = path
+        with open(path + ".idx", "rb") as f:
+            magic, version, max_hands, self.start_wall, self.aspect, n_frames = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or max_hands != MAX_HANDS:
+            raise ValueError(f"{path}.idx 不是有效的关键点录制文件")
+        self.index = np.memmap(path + ".idx", dtype=INDEX_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n_frames,)) \
+            if n_frames else np.zeros(0, dtype=INDEX_DTYPE)
+        n_hands = int(self.index["first"][-1]) + int(self.index["n_hands"][-1]) if n_frames else 0
+        self.landmarks = np.memmap(path + ".lmk", dtype=np.float32, mode="r", shape=(n_hands, NUM_LANDMARKS, 3)) \
+            if n_hands else np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration(self):
+        return float(self.index["t"][-1]) if len(self.index) else 0.0
+
+    def frame(self, i):
+        """第 i 帧的 (t, hands_xyz (n, 21, 3) 只读视图, codes (n,))。"""
+        row = self.index[i]
+        first, n = int(row["first"]), int(row["n_hands"])
+        return float(row["t"]), self.landmarks[first:first + n], row["codes"][:n]
+
+    def frames(self, realtime=False, speed=1.0):
+        """依次产生每帧；realtime 为 True 时按录制时的时间间隔（除以 speed）等待。"""
+        start = time.monotonic()
+        for i in range(len(self)):
+            t, hands_xyz, codes = self.frame(i)
+            if realtime:
+                delay = start + t / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield t, hands_xyz, codes
+
+    def finger_counts(self):
+        """一次性计算所有帧的手指数，返回 (n_frames, 2) int8，没有的手为 -1。"""
+        from landmarks import count_fingers_array
+        hand_codes = np.zeros(len(self.landmarks), dtype=np.int8)
+        frame_of_hand = np.repeat(np.arange(len(self.index)), self.index["n_hands"])
+        slot = np.arange(len(self.landmarks)) - self.index["first"][frame_of_hand].astype(np.int64)
+        hand_codes[:] = self.index["codes"][frame_of_hand, slot]
+        counts = np.full((len(self.index), MAX_HANDS), -1, dtype=np.int8)
+        counts[frame_of_hand, slot] = count_fingers_array(np.asarray(self.landmarks), hand_codes)
+        return counts
+
+    def info(self):
+        return {"path": self.path, "frames": len(self), "hands": len(self.landmarks), "aspect": round(self.aspect, 4),
+                "duration_s": round(self.duration, 2),
+                "fps": round((len(self) - 1) / self.duration, 2) if self.duration > 0 else 0.0,
+                "start": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.start_wall)),
+                "bytes": os.path.getsize(self.path + ".idx") + os.path.getsize(self.path + ".lmk")}
+
+
+def replay(recording, config, finger_actions, gesture_actions, realtime=False, speed=1.0, emit=print):
+    """把录制的关键点交给手指计数（以及 [Smoothing]/[Classifier] 配置的平滑与模板分类）和手势决策逻辑，
+    对每个事件调用 emit(dict)，返回处理的帧数。
+
+    最快速度且没有平滑/模板分类时，手指数对整个录制一次性向量化计算。
+    """
+    from classifier import GestureClassifier, normalize_landmarks
+    from landmarks import count_fingers_array
+    from smoothing import HandStabilizer
+    from timeline import TimelineBuilder, CODE_LABELS
+
+    stabilizer = HandStabilizer.from_config(config)
+    classifier = GestureClassifier.from_config(config)
+    builder = TimelineBuilder(recording.path, 1.0, config, finger_actions, gesture_actions)
+    n = len(recording)
+    if not realtime and stabilizer is None and classifier is None:
+        chunk = {"start": 0, "times": recording.index["t"], "counts": recording.finger_counts(),
+                 "codes": recording.index["codes"], "n_hands": recording.index["n_hands"], "templates": [None] * n}
+        for event in builder.feed(chunk):
+            emit(event)
+        return n
+
+    for i, (t, hands_xyz, codes) in enumerate(recording.frames(realtime, speed)):
+        hands_xyz = np.array(hands_xyz)  # 平滑会原地修改，复制出映射区
+        if stabilizer is not None:
+            labels = [CODE_LABELS.get(int(code), "Unknown") for code in codes]
+            counts = stabilizer.count(hands_xyz, labels, codes, t)
+        else:
+            counts = count_fingers_array(hands_xyz, codes)
+        template = None
+        if classifier is not None and len(hands_xyz) == 1:
+            template, _ = classifier.classify(normalize_landmarks(hands_xyz, codes, recording.aspect))[0]
+        row_counts = np.full((1, MAX_HANDS), -1, dtype=np.int8)
+        row_counts[0, :len(counts)] = counts
+        chunk = {"start": i, "times": [t], "counts": row_counts, "codes": recording.index["codes"][i:i + 1],
+                 "n_hands": recording.index["n_hands"][i:i + 1], "templates": [template]}
+        for event in builder.feed(chunk):
+            emit(event)
+    return n
+
+
+def main(argv=None):
+    import configparser
+    from timeline import load_offline_bindings
+
+    parser = argparse.ArgumentParser(description="查看和回放关键点录制会话")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="显示会话的帧数、时长和文件大小")
+    info.add_argument("path", help="会话路径（不含 .idx/.lmk 扩展名）")
+    play = sub.add_parser("replay", help="用手指计数和手势决策逻辑回放会话，输出 JSONL 事件")
+    play.add_argument("path", help="会话路径（不含 .idx/.lmk 扩展名）")
+    play.add_argument("--realtime", action="store_true", help="按录制时的节奏回放（默认最快速度）")
+    play.add_argument("--speed", type=float, default=1.0, help="按节奏回放时的倍速")
+    play.add_argument("--config", default="config.ini")
+    play.add_argument("--settings", default="settings.json")
+    play.add_argument("-o", "--output", default="-", help="输出的 JSONL 文件，- 表示标准输出")
+    args = parser.parse_args(argv)
+
+    recording = LandmarkRecording(args.path)
+    if args.command == "info":
+        print(json.dumps(recording.info(), ensure_ascii=False, indent=2))
+        return 0
+
+    config = configparser.ConfigParser()
+    if os.path.exists(args.config):
+        config.read(args.config, encoding="utf-8")
+    try:
+        finger_actions, gesture_actions = load_offline_bindings(args.settings)
+    except ValueError as e:
+        print(f"手势绑定文件 {args.settings} 无效: {e}")
+        return 1
+    out = open(args.output, "w", encoding="utf-8") if args.output != "-" else None
+    try:
+        def emit(event):
+            line = json.dumps(event, ensure_ascii=False)
+            if out is not None:
+                out.write(line + "\n")
+            else:
+                print(line, flush=args.realtime)
+
+        start = time.perf_counter()
+        frames = replay(recording, config, finger_actions, gesture_actions, args.realtime, args.speed, emit)
+        elapsed = time.perf_counter() - start
+    finally:
+        if out is not None:
+            out.close()
+    if out is not None:
+        rate = f"{frames / elapsed:.0f} 帧/秒" if elapsed > 0 else "-"
+        print(f"回放 {frames} 帧，耗时 {elapsed:.2f} s ({rate})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
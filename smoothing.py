@@ -0,0 +1,117 @@
+import logging
+import math
+
+import numpy as np
+
+from landmarks import finger_states
+
+logger = logging.getLogger(__name__)
+
+
+class OneEuroFilter:
+    """One Euro 自适应低通滤波，对整个数组逐元素向量化（例如一只手的 21x3 关键点）。
+
+    静止时截止频率接近 min_cutoff，抑制抖动；移动越快截止频率越高 (min_cutoff + beta * |速度|)，减少滞后。
+    速度单位为归一化坐标/秒。
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=5.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2.0 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def reset(self):
+        self._x = self._dx = self._t = None
+
+    def __call__(self, x, t):
+        """滤波并返回新的数组；t 为该帧的时间戳（秒）。"""
+        x = np.asarray(x, dtype=np.float32)
+        if self._x is None or t <= self._t:
+            self._x = x.copy()
+            self._dx = np.zeros_like(self._x)
+            self._t = t
+            return self._x
+        dt = t - self._t
+        self._t = t
+        a_d = self._alpha(self.d_cutoff, dt)
+        dx = (x - self._x) / dt
+        self._dx += a_d * (dx - self._dx)
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+        a = self._alpha(cutoff, dt)  # 逐元素的 alpha
+        self._x += a * (x - self._x)
+        return self._x
+
+
+class HandStabilizer:
+    """每只手一个 One Euro 滤波器 + 手指判定滞回，输出更稳定的手指数。
+
+    手按左右标签对应到上一帧的状态（标签重复或未知时按出现顺序）；本帧没有出现的手清除其状态。
+    关键点会被原地替换为平滑后的值，后续的绘制、模板分类也使用平滑结果。
+    smoothing = False 时只做滞回，不改动关键点。
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=5.0, d_cutoff=1.0, hysteresis=0.15, smoothing=True):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.hysteresis = hysteresis
+        self.smoothing = smoothing
+        self._hands = {}  # key -> (OneEuroFilter, 上一帧的手指状态 (5,) 或 None)
+
+    def reset(self):
+        self._hands.clear()
+
+    @staticmethod
+    def _keys(labels):
+        if len(set(labels)) == len(labels) and "Unknown" not in labels:
+            return list(labels)
+        return [f"#{i}" for i in range(len(labels))]
+
+    def count(self, hands_xyz, labels, codes, t):
+        """平滑 hands_xyz (n_hands, 21, 3)（原地）并返回带滞回的手指数数组 (n_hands,)。"""
+        n_hands = len(hands_xyz)
+        if n_hands == 0:
+            self._hands.clear()
+            return np.zeros(0, dtype=np.int64)
+        keys = self._keys(labels)
+        hands = {}
+        prev_states = np.zeros((n_hands, 5), dtype=bool)
+        have_prev = np.zeros(n_hands, dtype=bool)
+        for i, key in enumerate(keys):
+            filt, states = self._hands.get(key, (None, None))
+            if filt is None:
+                filt = OneEuroFilter(self.min_cutoff, self.beta, self.d_cutoff)
+            if self.smoothing:
+                hands_xyz[i] = filt(hands_xyz[i], t)
+            if states is not None:
+                prev_states[i] = states
+                have_prev[i] = True
+            hands[key] = filt
+        states = finger_states(hands_xyz, codes)
+        if have_prev.any() and self.hysteresis:
+            with_hysteresis = finger_states(hands_xyz, codes, prev_states, self.hysteresis)
+            states[have_prev] = with_hysteresis[have_prev]
+        self._hands = {key: (hands[key], states[i]) for i, key in enumerate(keys)}
+        return states.sum(axis=-1)
+
+    @classmethod
+    def from_config(cls, config):
+        """由 config.ini 的 [Smoothing] 段构建；enabled = false 时返回 None。"""
+        if not config.getboolean("Smoothing", "enabled", fallback=False):
+            return None
+        return cls(
+            min_cutoff=config.getfloat("Smoothing", "min_cutoff", fallback=1.0),
+            beta=config.getfloat("Smoothing", "beta", fallback=5.0),
+            d_cutoff=config.getfloat("Smoothing", "d_cutoff", fallback=1.0),
+            hysteresis=config.getfloat("Smoothing", "hysteresis", fallback=0.15),
+            smoothing=config.getboolean("Smoothing", "one_euro", fallback=True),
+        )
+
@@ -0,0 +1,101 @@
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """记录启动各阶段相对进程启动的耗时：模块导入、配置界面就绪、首帧、首次检测。"""
+
+    MILESTONES = ("import", "gui_ready", "first_frame", "first_detection")
+
+    def __init__(self, t0):
+        self.t0 = t0  # time.perf_counter() 的起点，应在主模块最开始取得
+        self.marks = {}
+        self._reported = False
+
+    def mark(self, name):
+        """记录里程碑（只记第一次）；首次检测完成后输出一次汇总。"""
+        if name in self.marks:
+            return
+        self.marks[name] = time.perf_counter() - self.t0
+        if name == "first_detection":
+            self.report()
+
+    def summary(self):
+        return {name: round(self.marks[name] * 1000, 1) for name in self.MILESTONES if name in self.marks}
+
+    def report(self):
+        if self._reported:
+            return
+        self._reported = True
+        text = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.summary().items())
+        print(f"启动耗时: {text}")
+        logger.info(f"启动耗时 (ms): {self.summary()}")
+
+
+class DetectionWarmup:
+    """后台预热：在配置界面显示期间导入 cv2/mediapipe、创建输入后端、打开摄像头、构建检测器，
+    并对一张空白帧做一次推理，点击开始后检测循环可以直接使用已就绪的摄像头、检测器和输入后端。
+    """
+
+    def __init__(self, config, warmup_size=(640, 480)):
+        self.config = config
+        self.warmup_size = warmup_size
+        self._done = threading.Event()
+        self._thread = None
+        self._cap = None
+        self._detector = None
+        self._backend = None
+        self.elapsed = None  # 预热总耗时（秒）
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="DetectionWarmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            import numpy as np
+            from camera import CameraProfile
+            from detectors import create_hand_detector
+            from inputs import create_input_backend
+
+            self._backend = create_input_backend(self.config)  # uinput 设备需要提前创建，留出被桌面识别的时间
+            self._cap = CameraProfile.from_config(self.config).open()  # [Camera] 段的后端、分辨率、像素格式与缓冲区
+            self._detector = create_hand_detector(self.config)
+            width, height = self.warmup_size
+            self._detector.process(np.zeros((height, width, 3), dtype=np.uint8))  # 触发模型加载与图初始化
+            # 预先导入 pynput，配置界面捕获按键时不再卡顿
+            importlib.import_module("pynput.keyboard")
+            importlib.import_module("pynput.mouse")
+        except Exception as e:
+            logger.error(f"后台预热失败，将在开始检测时重新初始化: {e}", exc_info=True)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            logger.info(f"后台预热完成，耗时 {self.elapsed * 1000:.0f} ms")
+            self._done.set()
+
+    def take(self, timeout=None):
+        """等待预热结束并取走 (cap, detector, input_backend)，之后由调用方负责释放；失败的部分为 None。"""
+        self._done.wait(timeout)
+        cap, detector, backend = self._cap, self._detector, self._backend
+        self._cap = self._detector = self._backend = None
+        if cap is not None and not cap.isOpened():
+            cap.release()
+            cap = None
+        return cap, detector, backend
+
+    def close(self):
+        """未被取走时释放摄像头、检测器和输入后端（例如配置界面被取消）。"""
+        cap, detector, backend = self.take()
+        if cap is not None:
+            cap.release()
+        if detector is not None:
+            detector.close()
+        if backend is not None:
+            backend.close()
@@ -0,0 +1,373 @@
+"""离线视频 -> 手势时间线。
+
+用与实时检测相同的流水线（翻转/镜像、Hands 推理、手指计数、可选的平滑与模板分类、手势确认与冷却）处理录制好的视频，
+输出按时间排序的 JSONL：手的变化 (hand)、手指数/模板手势变化 (gesture)、会被触发的动作 (action)、
+按住/连续控制的结束 (release) 以及双手保持 3 秒的退出手势 (exit)，用于回看录像和调节阈值。
+
+长视频按 --chunk-seconds 切分，交给进程池并行推理（可用满所有核心，每段新建检测器）；
+每段从前 --overlap-seconds 开始读取，重叠部分只用于让跟踪状态预热，不计入结果。
+推理结果按顺序合并后，由父进程依次驱动手势状态机（状态依赖前后帧，不能分段计算）。
+
+用法:
+    python timeline.py recordings/ session.mp4 --output timeline.jsonl --workers 8
+"""
+import argparse
+import configparser
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from actions import compile_action, compile_actions
+from gestures import GestureStateMachine
+from hotreload import load_bindings
+from landmarks import HAND_LEFT, HAND_RIGHT
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+CODE_LABELS = {HAND_LEFT: "Left", HAND_RIGHT: "Right"}
+EXIT_HOLD_SECONDS = 3.0  # 与检测循环一致：双手保持 3 秒退出
+
+_worker = None  # 每个工作进程的 (config, classifier)
+
+
+def find_videos(paths):
+    """展开文件与目录（目录按文件名排序，只取常见视频扩展名）。"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(os.path.join(path, name))
+        else:
+            videos.append(path)
+    return videos
+
+
+def plan_chunks(n_frames, fps, chunk_seconds, overlap_seconds):
+    """返回 [(warm_start, start, end), ...]；帧数未知 (<= 0) 时整段作为一块读到结尾 (end = None)。"""
+    if n_frames <= 0:
+        return [(0, 0, None)]
+    chunk = max(1, int(round(chunk_seconds * fps)))
+    overlap = max(0, int(round(overlap_seconds * fps)))
+    return [(max(0, start - overlap), start, min(start + chunk, n_frames)) for start in range(0, n_frames, chunk)]
+
+
+def load_offline_bindings(path):
+    """读取手势绑定；与 load_settings 一样，settings.json 不存在时所有手势视为未设置。JSON 无效时抛出 ValueError。"""
+    if not os.path.exists(path):
+        logger.warning(f"未找到手势绑定文件 {path}，所有手势均视为未设置")
+        return {i: None for i in range(1, 6)}, {}
+    return load_bindings(path)
+
+
+def _init_worker(config_path):
+    global _worker
+    from classifier import GestureClassifier
+
+    config = load_config(config_path)
+    if config.get("Detection", "backend", fallback="solutions").strip().lower() != "solutions":
+        # LIVE_STREAM 后端按墙钟时间丢帧，不适合离线逐帧处理
+        config.set("Detection", "backend", "solutions")
+    _worker = (config, GestureClassifier.from_config(config))
+
+
+def process_chunk(path, warm_start, start, end):
+    """在工作进程中推理 [warm_start, end) 帧，返回 [start, end) 部分的逐帧结果。
+
+    同一进程先后处理的分段可能来自不相邻的位置或不同的视频，Hands 的跟踪状态不能沿用，
+    因此每段新建检测器（模型加载约百毫秒，相对一段 60 秒的视频可以忽略）。
+
+    返回 dict: start, counts (n, 2) int8（没有的手为 -1）, codes (n, 2) int8, n_hands (n,) int8,
+    templates（单手帧的模板手势名或 None）, frames_read, elapsed。
+    """
+    import cv2
+    from frames import FrameBuffers
+    from landmarks import landmarks_to_array, handedness_labels, handedness_codes, count_fingers_array, mirror_hands
+    from classifier import normalize_landmarks
+    from detectors import create_hand_detector
+    from smoothing import HandStabilizer
+
+    config, classifier = _worker
+    t0 = time.perf_counter()
+    detector = create_hand_detector(config)
+    frame_buffers = FrameBuffers.from_config(config)
+    stabilizer = HandStabilizer.from_config(config)
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    position = 0
+    if warm_start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if position != warm_start:  # 部分编码格式不支持精确定位，退回到从头逐帧跳过
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            position = 0
+            while position < warm_start and cap.grab():
+                position += 1
+
+    counts, codes, n_hands, templates = [], [], [], []
+    frames_read = 0
+    try:
+        while end is None or position < end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames_read += 1
+            frm = frame_buffers.inference_frame(frame)
+            res = detector.process(frame_buffers.to_rgb(frm))
+            hands_xyz = landmarks_to_array(res.multi_hand_landmarks)[:2]
+            labels = handedness_labels(res.multi_handedness, len(hands_xyz))
+            if frame_buffers.mirror_landmarks and len(hands_xyz):
+                labels = mirror_hands(hands_xyz, labels)
+            hand_codes = handedness_codes(labels)
+            if stabilizer is not None:
+                finger_counts = stabilizer.count(hands_xyz, labels, hand_codes, position / fps)
+            else:
+                finger_counts = count_fingers_array(hands_xyz, hand_codes)
+            if position >= start:
+                row_counts = np.full(2, -1, dtype=np.int8)
+                row_codes = np.zeros(2, dtype=np.int8)
+                row_counts[:len(finger_counts)] = finger_counts
+                row_codes[:len(hand_codes)] = hand_codes
+                counts.append(row_counts)
+                codes.append(row_codes)
+                n_hands.append(len(hands_xyz))
+                name = None
+                if classifier is not None and len(hands_xyz) == 1:
+                    name, _ = classifier.classify(
+                        normalize_landmarks(hands_xyz[:1], hand_codes[:1], frm.shape[1] / frm.shape[0]))[0]
+                templates.append(name)
+            position += 1
+    finally:
+        cap.release()
+        detector.close()
+    return {
+        "start": start,
+        "counts": np.array(counts, dtype=np.int8).reshape(-1, 2),
+        "codes": np.array(codes, dtype=np.int8).reshape(-1, 2),
+        "n_hands": np.array(n_hands, dtype=np.int8),
+        "templates": templates,
+        "frames_read": frames_read,
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+class TimelineBuilder:
+    """按帧顺序回放推理结果，重现检测循环的决策（与 run_detection_loop 的单手/双手/无手分支一致），生成事件。
+
+    时间使用视频时间（帧号 / fps），手势状态机的时钟也由它驱动，因此结果与处理速度无关。
+    """
+
+    def __init__(self, video, fps, config, finger_actions, gesture_actions, per_frame=False):
+        self.video = video
+        self.fps = fps
+        self.per_frame = per_frame
+        self.action_plans = compile_actions(finger_actions)
+        self.gesture_plans = {name: compile_action(action) for name, action in gesture_actions.items()}
+        self.gesture_sm = GestureStateMachine.from_config(config, {**finger_actions, **gesture_actions},
+                                                          clock=lambda: 0.0)
+        self.last_labels = []
+        self.last_gesture = None
+        self.engaged = None  # 按住/连续控制中的 (手势, 动作)
+        self._mismatches = 0  # 按住/连续控制期间连续不一致的帧数
+        # 与检测循环一致：按住看 [Gesture] hold_release_frames，连续控制看 [Pointer] release_frames
+        self.hold_release_frames = config.getint("Gesture", "hold_release_frames", fallback=1)
+        self.pointer_release_frames = config.getint("Pointer", "release_frames", fallback=3)
+        self.two_hands_since = None
+        self.exit_reported = False
+        self.frame = 0
+        self.now = 0.0
+
+    def _event(self, kind, **fields):
+        return {"video": self.video, "frame": self.frame, "t": round(self.now, 3), "event": kind, **fields}
+
+    def _release(self, events):
+        if self.engaged is not None:
+            key, plan = self.engaged
+            events.append(self._event("release", gesture=key, action=plan.source))
+            self.engaged = None
+        self._mismatches = 0
+
+    def _mismatch(self, events):
+        """本帧不是正在按住/连续控制的手势；连续达到释放帧数后释放。"""
+        if self.engaged is None:
+            return
+        self._mismatches += 1
+        limit = self.hold_release_frames if self.engaged[1].hold else self.pointer_release_frames
+        if self._mismatches >= limit:
+            self._release(events)
+
+    def feed(self, chunk):
+        """处理一个 process_chunk() 的结果，返回事件列表。chunk 带 "times" 时使用其中的时间戳（秒）而不是帧号 / fps。"""
+        events = []
+        times = chunk.get("times")
+        for i in range(len(chunk["n_hands"])):
+            self.frame = chunk["start"] + i
+            now = self.now = float(times[i]) if times is not None else self.frame / self.fps
+            n_hands = int(chunk["n_hands"][i])
+            labels = [CODE_LABELS.get(int(code), "Unknown") for code in chunk["codes"][i][:n_hands]]
+            counts = [int(c) for c in chunk["counts"][i][:n_hands]]
+            template = chunk["templates"][i]
+            if self.per_frame:
+                events.append(self._event("frame", hands=n_hands, labels=labels, fingers=counts, template=template))
+            if labels != self.last_labels:
+                events.append(self._event("hand", hands=n_hands, labels=labels))
+                self.last_labels = labels
+
+            if n_hands == 2:
+                self.gesture_sm.reset()
+                self._release(events)
+                self.last_gesture = None
+                if self.two_hands_since is None:
+                    self.two_hands_since = now
+                if not self.exit_reported and now - self.two_hands_since >= EXIT_HOLD_SECONDS:
+                    events.append(self._event("exit"))
+                    self.exit_reported = True
+                continue
+            self.two_hands_since = None
+            self.exit_reported = False
+            if n_hands == 0:
+                self.gesture_sm.no_hands()
+                if self.engaged is not None and self.engaged[1].hold:
+                    self._release(events)  # 手离开画面立即松开按住的键
+                else:
+                    self._mismatch(events)  # 连续控制短暂丢失检测不立即释放
+                self.last_gesture = None
+                continue
+
+            cnt = counts[0]
+            gesture_key, plan = cnt, self.action_plans[cnt]
+            if template is not None and self.gesture_plans.get(template) is not None:
+                gesture_key, plan = template, self.gesture_plans[template]
+            if gesture_key != self.last_gesture:
+                events.append(self._event("gesture", fingers=cnt, template=template, hand=labels[0]))
+                self.last_gesture = gesture_key
+            if self.engaged is not None:
+                if self.engaged[0] == gesture_key:
+                    self._mismatches = 0
+                else:
+                    self._mismatch(events)
+            if self.gesture_sm.update(gesture_key, has_action=plan is not None, now=now):
+                if self.engaged is not None and self.engaged[0] != gesture_key:
+                    self._release(events)  # 新手势已被确认
+                mode = "hold" if plan.hold else "continuous" if plan.continuous else "press"
+                events.append(self._event("action", fingers=cnt, gesture=gesture_key, hand=labels[0],
+                                          action=plan.source, mode=mode))
+                if mode != "press":
+                    self.engaged = (gesture_key, plan)
+                    self._mismatches = 0
+        return events
+
+
+def load_config(path):
+    config = configparser.ConfigParser()
+    if os.path.exists(path):
+        config.read(path, encoding="utf-8")
+    return config
+
+
+def probe_video(path):
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+
+
+def build_timeline(videos, output, config_path="config.ini", bindings=None, workers=None,
+                   chunk_seconds=60.0, overlap_seconds=2.0, per_frame=False):
+    """并行处理所有视频并把时间线写入 output（"-" 为标准输出），返回每个视频的统计。
+
+    bindings 为 (finger_actions, gesture_actions)，默认读取 settings.json。
+    """
+    config = load_config(config_path)
+    finger_actions, gesture_actions = bindings or load_offline_bindings("settings.json")
+    workers = workers or os.cpu_count() or 1
+    stats = []
+    start_time = time.perf_counter()
+    # spawn：工作进程不继承父进程中 OpenCV/MediaPipe 的线程状态
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(config_path,)) as pool:
+        jobs = []  # 所有分段一次性提交，按视频和分段顺序依次取结果，取的同时其余分段仍在并行推理
+        for video in videos:
+            info = probe_video(video)
+            if info is None:
+                print(f"无法打开视频 {video}，已跳过")
+                logger.error(f"无法打开视频 {video}")
+                continue
+            n_frames, fps = info
+            futures = [pool.submit(process_chunk, video, warm, start, end)
+                       for warm, start, end in plan_chunks(n_frames, fps, chunk_seconds, overlap_seconds)]
+            jobs.append((video, fps, futures))
+
+        out = open(output, "w", encoding="utf-8") if output != "-" else None
+        try:
+            for video, fps, futures in jobs:
+                builder = TimelineBuilder(video, fps, config, finger_actions, gesture_actions, per_frame)
+                frames = frames_read = n_events = 0
+                inference = 0.0
+                for future in futures:
+                    chunk = future.result()
+                    frames += len(chunk["n_hands"])
+                    frames_read += chunk["frames_read"]
+                    inference += chunk["elapsed"]
+                    for event in builder.feed(chunk):
+                        line = json.dumps(event, ensure_ascii=False)
+                        if out is not None:
+                            out.write(line + "\n")
+                        else:
+                            print(line)
+                        n_events += 1
+                stats.append({"video": video, "frames": frames, "chunks": len(futures), "events": n_events,
+                              "overlap_frames": frames_read - frames, "worker_seconds": round(inference, 2)})
+                logger.info(f"时间线完成: {stats[-1]}")
+        finally:
+            if out is not None:
+                out.close()
+    elapsed = time.perf_counter() - start_time
+    total_frames = sum(s["frames"] for s in stats)
+    logger.info(f"共处理 {total_frames} 帧，耗时 {elapsed:.1f} s，{workers} 个进程")
+    return stats, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线处理视频文件，生成手势与动作的 JSONL 时间线")
+    parser.add_argument("inputs", nargs="+", help="视频文件或包含视频的目录")
+    parser.add_argument("-o", "--output", default="timeline.jsonl", help="输出的 JSONL 文件，- 表示标准输出")
+    parser.add_argument("--config", default="config.ini", help="检测、平滑、模板分类和手势时序参数")
+    parser.add_argument("--settings", default="settings.json", help="手势绑定")
+    parser.add_argument("--workers", type=int, default=0, help="进程数，默认等于 CPU 核心数")
+    parser.add_argument("--chunk-seconds", type=float, default=60.0, help="每段视频的长度（秒）")
+    parser.add_argument("--overlap-seconds", type=float, default=2.0, help="每段之前用于跟踪预热的重叠长度（秒）")
+    parser.add_argument("--per-frame", action="store_true", help="额外输出每一帧的手指数 (frame 事件)")
+    args = parser.parse_args(argv)
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("没有找到视频文件")
+        return 1
+    try:
+        bindings = load_offline_bindings(args.settings)
+    except ValueError as e:
+        print(f"手势绑定文件 {args.settings} 无效: {e}")
+        return 1
+    stats, elapsed = build_timeline(videos, args.output, args.config, bindings, args.workers,
+                                    args.chunk_seconds, args.overlap_seconds, args.per_frame)
+    total_frames = sum(s["frames"] for s in stats)
+    for s in stats:
+        print(f"{s['video']}: {s['frames']} 帧, {s['chunks']} 段, {s['events']} 个事件")
+    if elapsed > 0:
+        print(f"共 {total_frames} 帧，耗时 {elapsed:.1f} s ({total_frames / elapsed:.0f} 帧/秒)")
+    return 0 if stats else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
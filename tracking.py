@@ -0,0 +1,105 @@
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RoiHandTracker:
+    """跟踪 ROI 推理：围绕上一帧的手部包围盒裁剪出正方形区域，统一缩放到 input_size x input_size 后再推理。
+
+    ROI 与整帧使用两个独立的静态图像检测器 (static_image_mode=True)：有状态的 Hands 图会在上一帧的归一化坐标中
+    预测下一帧的手部区域，位置和大小逐帧变化的裁剪图会破坏它的跟踪，所以两个检测器都不保留帧间状态，
+    帧间跟踪由这里的包围盒完成。
+    结果中的关键点会原地映射回整帧归一化坐标，手指计数与绘制无需改动。
+    以下情况回退到整帧检测：没有上一帧的包围盒（跟踪丢失）、上一帧检测到两只手、
+    裁剪区域超过画面短边的 max_roi_fraction、或距离上次整帧检测已超过 redetect_interval 帧（以便发现第二只手）。
+    对外接口与 Hands 相同（process / close），可直接替换 hand_obj。
+    """
+
+    def __init__(self, full_detector, roi_detector, input_size=256, padding=0.25, redetect_interval=15,
+                 max_roi_fraction=0.9):
+        self.full_detector = full_detector
+        self.roi_detector = roi_detector
+        self.input_size = input_size
+        self.padding = padding  # 包围盒每边外扩的比例（相对于包围盒长边）
+        self.redetect_interval = redetect_interval
+        self.max_roi_fraction = max_roi_fraction
+        self._box = None  # 上一帧的手部包围盒 (x0, y0, x1, y1)，像素坐标
+        self._frames_since_full = 0
+        self._crop = np.empty((input_size, input_size, 3), dtype=np.uint8)  # 缩放后的裁剪图，逐帧复用
+        self.roi_frames = 0
+        self.full_frames = 0
+
+    def reset(self):
+        self._box = None
+        self._frames_since_full = 0
+
+    def _roi(self, width, height):
+        """返回正方形 ROI (x0, y0, side)；靠近画面边缘时整体平移而不截断，保持宽高比不变。"""
+        if self._box is None or self._frames_since_full >= self.redetect_interval:
+            return None
+        x0, y0, x1, y1 = self._box
+        side = int(max(x1 - x0, y1 - y0) * (1.0 + 2.0 * self.padding))
+        if side < 16 or side > self.max_roi_fraction * min(width, height):
+            return None
+        cx, cy = (x0 + x1) / 2.0, (y0 + y1) / 2.0
+        rx0 = int(min(max(0, cx - side / 2.0), width - side))
+        ry0 = int(min(max(0, cy - side / 2.0), height - side))
+        return rx0, ry0, side
+
+    def process(self, rgb_frame):
+        height, width = rgb_frame.shape[:2]
+        roi = self._roi(width, height)
+        if roi is not None:
+            rx0, ry0, side = roi
+            crop = rgb_frame[ry0:ry0 + side, rx0:rx0 + side]
+            interpolation = cv2.INTER_AREA if side > self.input_size else cv2.INTER_LINEAR
+            cv2.resize(crop, (self.input_size, self.input_size), dst=self._crop, interpolation=interpolation)
+            res = self.roi_detector.process(self._crop)
+            if res.multi_hand_landmarks:
+                self.roi_frames += 1
+                self._frames_since_full += 1
+                self._map_back(res, rx0, ry0, side, width, height)
+                return res
+            # ROI 中丢失了手：本帧立即回退到整帧检测
+
+        res = self.full_detector.process(rgb_frame)
+        self.full_frames += 1
+        self._frames_since_full = 0
+        self._map_back(res, None, None, None, width, height)
+        return res
+
+    def _map_back(self, res, rx0, ry0, side, width, height):
+        """把 ROI 内的归一化坐标原地映射回整帧（rx0 为 None 表示整帧结果），并更新下一帧使用的包围盒。"""
+        hands = res.multi_hand_landmarks
+        if not hands:
+            self._box = None
+            return
+        full_frame = rx0 is None
+        if not full_frame:
+            sx, sy = side / width, side / height
+            ox, oy = rx0 / width, ry0 / height
+        min_x = min_y = float("inf")
+        max_x = max_y = float("-inf")
+        for hand in hands:
+            for lm in hand.landmark:
+                if not full_frame:
+                    lm.x = ox + lm.x * sx
+                    lm.y = oy + lm.y * sy
+                    lm.z = lm.z * sx
+                min_x, max_x = min(min_x, lm.x), max(max_x, lm.x)
+                min_y, max_y = min(min_y, lm.y), max(max_y, lm.y)
+        if len(hands) > 1:
+            self._box = None  # 两只手时保持整帧检测
+            return
+        self._box = (min_x * width, min_y * height, max_x * width, max_y * height)
+
+    def stats(self):
+        return {"roi_frames": self.roi_frames, "full_frames": self.full_frames}
+
+    def close(self):
+        logger.info(f"ROI 跟踪统计: {self.stats()}")
+        self.full_detector.close()
+        self.roi_detector.close()